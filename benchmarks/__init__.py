@@ -0,0 +1,3 @@
+"""
+Micro-benchmarks for the Extend voice assistant.
+"""
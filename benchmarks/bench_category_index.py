@@ -0,0 +1,51 @@
+"""
+Times category resolution with CategoryIndex, cold and with warm word lookups.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_category_index
+"""
+import timeit
+
+from src.category_index import CategoryIndex
+
+CATEGORY_NAMES = [
+    "Travel", "Meals & Entertainment", "Office Supplies", "Office Rent", "Utilities",
+    "Software", "Marketing", "Fuel", "Professional Services", "Training",
+]
+
+UTTERANCES = [
+    "How much did I spend on travel last month?",
+    "How much did I spend on travle last month?",
+    "Show restaurent charges this week",
+    "What did the enter tainment budget cost in Q3?",
+    "Show my transactions this month",
+    "Utilties since January",
+]
+
+
+def main(copies=10):
+    categories = [
+        {"id": "cat_{}_{}".format(copy, position), "name": name}
+        for copy in range(copies) for position, name in enumerate(CATEGORY_NAMES)
+    ]
+    build = min(timeit.repeat(lambda: CategoryIndex(categories), number=20, repeat=3)) / 20
+    print("index over {} categories built in {:.2f} ms".format(len(categories), build * 1e3))
+
+    index = CategoryIndex(categories)
+
+    def cold_resolve(utterance):
+        index._lookups.clear()
+        return index.resolve(utterance)
+
+    for utterance in UTTERANCES:
+        cold = min(timeit.repeat(lambda: cold_resolve(utterance), number=200, repeat=5)) / 200
+        warm = min(timeit.repeat(lambda: index.resolve(utterance), number=1000, repeat=5)) / 1000
+        category = index.resolve(utterance)
+        print("{:<50} {:<24} cold {:7.1f} us  warm {:6.1f} us".format(
+            utterance, category["name"] if category else "-", cold * 1e6, warm * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compares the compiled IntentRouter with the substring cascade it replaced.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_intent_router
+"""
+import timeit
+
+from src.intent_router import DEFAULT_ROUTER, KEYWORDS, IntentRouter
+
+# Utterances taken from the README examples and call transcripts
+UTTERANCES = [
+    "Show me my virtual cards",
+    "List my virtual cards",
+    "What's the balance on my card ending in 1234?",
+    "How many virtual cards do I have?",
+    "How much did I spend last week?",
+    "How much have I spent this month?",
+    "How much have I spent on travel today?",
+    "What was my total spending yesterday?",
+    "Show my recent transactions",
+    "List transactions from last month",
+    "What did I spend on food this week?",
+    "What are my expense categories?",
+    "List my categories",
+    "Which category is office supplies in?",
+    "Upload a receipt for my last transaction",
+    "Upload receipt for travel expense",
+    "Match my receipts",
+    "Can you automatch my receipts?",
+    "I need to submit an expense report for the conference",
+    "What's the weather like?",
+    "Thanks, that's all for now",
+    "Um so how much did we spend on entertainment this month on the marketing card",
+]
+
+
+def legacy_route(command):
+    """
+    The original CommandProcessor cascade, kept for comparison
+    """
+    command = command.lower()
+    if "virtual card" in command or "virtual cards" in command:
+        return "virtual_cards"
+    elif "transaction" in command or "transactions" in command or "spent" in command or "spending" in command:
+        return "transactions"
+    elif "category" in command or "categories" in command or "expense" in command:
+        return "expense_categories"
+    elif "receipt" in command or "upload" in command:
+        return "receipts"
+    return None
+
+
+def legacy_action(command):
+    """
+    The slot scans each legacy handler repeated after routing
+    """
+    command = command.lower()
+    if "match" in command:
+        return "match"
+    if "how much" in command:
+        return "total"
+    if "list" in command or "show" in command or "what" in command:
+        return "list"
+    return None
+
+
+def legacy(command):
+    return legacy_route(command), legacy_action(command)
+
+
+def compiled(command):
+    route = DEFAULT_ROUTER.route(command)
+    return route.intent, route.action
+
+
+def measure(func, number=2000, repeat=5):
+    timer = timeit.Timer(lambda: [func(utterance) for utterance in UTTERANCES])
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / (number * len(UTTERANCES)) * 1e6
+
+
+def scaling(sizes=(30, 300, 3000)):
+    """
+    Cost of a growing keyword table: substring scans grow with it, the trie does not
+    """
+    rows = []
+    for size in sizes:
+        keywords = dict(KEYWORDS)
+        for index in range(size - len(KEYWORDS)):
+            keywords["merchant{} purchase".format(index)] = ({"transactions": 1}, {})
+        router = IntentRouter(keywords)
+        phrases = list(keywords)
+
+        def scan(command):
+            command = command.lower()
+            return [phrase for phrase in phrases if phrase in command]
+
+        rows.append((len(keywords), measure(scan, number=50), measure(router.route, number=50)))
+    return rows
+
+
+def main():
+    print("{:<72} {:<20} {}".format("utterance", "legacy", "compiled"))
+    for utterance in UTTERANCES:
+        old, new = legacy_route(utterance), DEFAULT_ROUTER.route(utterance).intent
+        marker = "" if old == new else "  *"
+        print("{:<72} {:<20} {}{}".format(utterance[:72], str(old), new, marker))
+
+    legacy_us = measure(legacy)
+    compiled_us = measure(compiled)
+    print()
+    print("legacy cascade:   {:.2f} us/utterance".format(legacy_us))
+    print("compiled router:  {:.2f} us/utterance".format(compiled_us))
+    print("(* marks utterances the routers disagree on)")
+    print()
+    print("{:>10} {:>16} {:>16}".format("keywords", "substring us", "trie us"))
+    for size, scan_us, trie_us in scaling():
+        print("{:>10} {:>16.2f} {:>16.2f}".format(size, scan_us, trie_us))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Measures process_command latency and throughput per intent against a large synthetic account.
+
+A fake Extend API (benchmarks.fake_extend) runs in a child process with
+100,000 transactions and 2,000 cards by default, and is read over real
+HTTP. Simulated callers share one ExtendIntegration through a
+SessionManager, as in production, and ask each intent's commands in turn.
+With --cold, caches are cleared before every turn and turns run one at a
+time, so each one pays for its Extend requests; otherwise callers run
+concurrently over warm caches. With --store, a SQLite transaction store is
+synced first and spending totals come from its rollups.
+
+Results (p50/p99/mean latency and throughput per intent, plus the settings
+used) are written as JSON; pass --compare with an earlier results file to
+see the change.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_intents [--transactions N] [--cards N] [--cold] [--compare old.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.fake_extend import LATENCY, FakeExtendProcess, HttpExtendClient
+from src.extend_integration import ExtendIntegration
+from src.scheduler import RequestScheduler
+from src.session_manager import SessionManager
+
+# Commands asked per intent, in turn
+INTENT_COMMANDS = {
+    "virtual_cards": [
+        "List my virtual cards",
+        "What's the balance on my card ending in 0042?",
+        "Which active cards are over $5,000?",
+        "Next five cards",
+    ],
+    "transactions": [
+        "How much did I spend today?",
+        "Show my recent transactions",
+        "Show my transactions from today",
+        "How much did I spend on travel this week?",
+        "How much did I spend by category this week?",
+    ],
+    "expense_categories": [
+        "List my expense categories",
+    ],
+    "receipts": [
+        "Upload a receipt",
+    ],
+}
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_intent(sessions, commands, turns, concurrency, cold):
+    """
+    Answers `turns` commands from `concurrency` callers and returns latencies, failures and wall time
+    """
+    latencies = []
+    failures = 0
+    integration = sessions.extend_integration
+
+    async def caller(number):
+        nonlocal failures
+        call_id = "caller_{}".format(number)
+        for turn in range(number, turns, concurrency):
+            if cold:
+                integration.invalidate_cache()
+            start = time.perf_counter()
+            try:
+                await sessions.process_command(call_id, commands[turn % len(commands)])
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+        sessions.close(call_id)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(caller(number) for number in range(concurrency)))
+    return latencies, failures, time.perf_counter() - wall_start
+
+
+async def measure(base_url, options):
+    os.environ.setdefault("EXTEND_API_KEY", "benchmark")
+    os.environ.setdefault("EXTEND_API_SECRET", "benchmark")
+    store_dir = tempfile.TemporaryDirectory() if options.store else None
+    scheduler = RequestScheduler(rate=options.rate, burst=int(options.rate * 2)) if options.rate else None
+    integration = ExtendIntegration(
+        transaction_store_path=os.path.join(store_dir.name, "transactions.db") if store_dir else None,
+        scheduler=scheduler,
+    )
+    client = integration.client = HttpExtendClient(base_url)
+    concurrency = 1 if options.cold else options.concurrency
+    sessions = SessionManager(integration, max_sessions=concurrency, speculate=False)
+    results = {}
+    try:
+        if store_dir:
+            start = time.perf_counter()
+            written = await integration.sync_transactions()
+            results["store_sync"] = {"transactions": written, "seconds": time.perf_counter() - start}
+
+        for intent, commands in INTENT_COMMANDS.items():
+            if not options.cold:
+                # One untimed pass fills the caches the timed turns are meant to reuse
+                await run_intent(sessions, commands, len(commands), 1, cold=False)
+            latencies, failures, wall = await run_intent(sessions, commands, options.turns, concurrency, options.cold)
+            latencies.sort()
+            results[intent] = {
+                "turns": len(latencies),
+                "failures": failures,
+                "p50_ms": percentile(latencies, 0.5) * 1e3 if latencies else None,
+                "p99_ms": percentile(latencies, 0.99) * 1e3 if latencies else None,
+                "mean_ms": statistics.fmean(latencies) * 1e3 if latencies else None,
+                "throughput_per_s": len(latencies) / wall if wall else None,
+            }
+        results["api"] = dict(await client.stats(), scheduler=integration.scheduler.stats())
+    finally:
+        await client.close()
+        if integration.store is not None:
+            integration.store.close()
+        if store_dir:
+            store_dir.cleanup()
+    return results
+
+
+def compare(results, baseline):
+    """
+    Prints the relative change of each intent's p50 and p99 against an earlier run
+    """
+    print()
+    print("change vs {}".format(baseline["started_at"]))
+    for intent in INTENT_COMMANDS:
+        new, old = results["intents"].get(intent), baseline.get("intents", {}).get(intent)
+        if not new or not old:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p99_ms"):
+            if new[metric] is not None and old[metric]:
+                changes.append("{} {:+.1%}".format(metric[:3], new[metric] / old[metric] - 1))
+        print("{:<20} {}".format(intent, "  ".join(changes)))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--transactions", type=int, default=100000, help="synthetic transactions in the account")
+    parser.add_argument("--cards", type=int, default=2000, help="synthetic virtual cards in the account")
+    parser.add_argument("--days", type=int, default=365, help="days of history the transactions cover")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="seconds the fake API takes per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 429 or 503")
+    parser.add_argument("--turns", type=int, default=200, help="turns timed per intent")
+    parser.add_argument("--concurrency", type=int, default=20, help="simultaneous callers (1 with --cold)")
+    parser.add_argument("--rate", type=float, default=None, help="scheduler requests per second (default: production)")
+    parser.add_argument("--cold", action="store_true", help="clear caches before every turn")
+    parser.add_argument("--store", action="store_true", help="sync a local transaction store first")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/intents-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(sys.argv[1:] if argv is None else argv)
+    started_at = datetime.now().isoformat(timespec="seconds")
+    server = FakeExtendProcess(
+        account_options={"cards": options.cards, "transactions": options.transactions, "days": options.days},
+        server_options={"latency": options.latency, "error_rate": options.error_rate},
+    )
+    with server:
+        results = asyncio.run(measure(server.base_url, options))
+
+    report = {
+        "started_at": started_at,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": vars(options),
+        "intents": {intent: results[intent] for intent in INTENT_COMMANDS},
+        "api": results["api"],
+        "store_sync": results.get("store_sync"),
+    }
+
+    print("{} transactions, {} cards, {:.0f} ms API latency, {} mode".format(
+        options.transactions, options.cards, options.latency * 1e3, "cold" if options.cold else "warm"))
+    print()
+    print("{:<20} {:>7} {:>9} {:>9} {:>9} {:>12}".format("intent", "turns", "p50 ms", "p99 ms", "mean ms", "turns/s"))
+    for intent, result in report["intents"].items():
+        if result["p50_ms"] is None:
+            print("{:<20} {:>7} {:>9}".format(intent, 0, "failed"))
+            continue
+        print("{:<20} {:>7} {:>9.2f} {:>9.2f} {:>9.2f} {:>12.1f}".format(
+            intent, result["turns"], result["p50_ms"], result["p99_ms"], result["mean_ms"], result["throughput_per_s"]))
+    print()
+    print("API requests {requests}, injected errors {errors}".format(**report["api"]))
+    if report["store_sync"]:
+        print("store sync {transactions} transactions in {seconds:.1f} s".format(**report["store_sync"]))
+
+    output = options.output or os.path.join(RESULTS_DIR, "intents-{}.json".format(started_at.replace(":", "")))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print("results written to {}".format(output))
+
+    if options.compare:
+        with open(options.compare) as file:
+            compare(report, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
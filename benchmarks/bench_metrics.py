@@ -0,0 +1,68 @@
+"""
+Measures the cost of latency instrumentation, enabled and disabled.
+
+Reports the cost of a single span, then the CPU time per turn of the
+bench_sessions script answered against an in-process fake Extend client with
+no latency, so the difference between the two runs is the instrumentation.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_metrics [turns]
+"""
+import asyncio
+import os
+import sys
+import time
+import timeit
+
+from benchmarks.bench_sessions import SCRIPT, FakeExtendClient
+from src.command_processor import CommandProcessor
+from src.extend_integration import ExtendIntegration
+from src.metrics import Metrics
+
+
+def span_cost(metrics, number=200000):
+    """
+    Returns microseconds per span entered and exited
+    """
+    def run():
+        with metrics.span("fetch", "transactions"):
+            pass
+    return min(timeit.repeat(run, number=number, repeat=5)) / number * 1e6
+
+
+async def turn_cost(metrics, turns):
+    """
+    Returns CPU microseconds per turn answered with the given metrics
+    """
+    integration = ExtendIntegration(metrics=metrics)
+    integration.client = FakeExtendClient(latency=0)
+    processor = CommandProcessor(integration, metrics=metrics)
+    # Warm the caches so every run measures the same work
+    for command in SCRIPT:
+        await processor.process_command(command)
+
+    start = time.process_time()
+    for turn in range(turns):
+        await processor.process_command(SCRIPT[turn % len(SCRIPT)])
+    return (time.process_time() - start) / turns * 1e6
+
+
+def main(turns=20000):
+    os.environ.setdefault("EXTEND_API_KEY", "benchmark")
+    os.environ.setdefault("EXTEND_API_SECRET", "benchmark")
+    enabled = Metrics(enabled=True, slow_turn_threshold=float("inf"))
+    disabled = Metrics(enabled=False)
+
+    print("{:<10} {:>12} {:>14}".format("metrics", "us per span", "cpu us/turn"))
+    results = {}
+    for label, metrics in (("disabled", disabled), ("enabled", enabled)):
+        results[label] = asyncio.run(turn_cost(metrics, turns))
+        print("{:<10} {:>12.3f} {:>14.1f}".format(label, span_cost(metrics), results[label]))
+    overhead = results["enabled"] - results["disabled"]
+    print()
+    print("instrumentation adds {:.1f} us ({:.1%}) per turn".format(overhead, overhead / results["disabled"]))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,133 @@
+"""
+Measures how many concurrent calls one process (one core) can serve.
+
+Every simulated caller gets its own session from a SessionManager sharing one
+ExtendIntegration, whose Extend client is replaced by an in-process fake with
+fixed network latency. Callers speak a short script of commands, so the
+measured CPU time per turn covers routing, caching, single-flight, the
+scheduler and formatting, but no real network I/O.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sessions [calls ...]
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date
+
+from src.extend_integration import ExtendIntegration
+from src.session_manager import SessionManager
+
+# Seconds the fake Extend API takes to answer
+API_LATENCY = 0.05
+
+# Seconds a real caller typically spends between turns (listening, thinking, speaking)
+TURN_INTERVAL = 10.0
+
+SCRIPT = [
+    "List my virtual cards",
+    "How much did I spend today?",
+    "Show my recent transactions",
+    "What's the balance on the card ending in 1003?",
+    "How much did I spend on travel this month?",
+    "List my expense categories",
+]
+
+
+class _Endpoint:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+class FakeExtendClient:
+    """
+    In-process stand-in for the Extend client with fixed latency
+    """
+
+    def __init__(self, latency=API_LATENCY, seed=7):
+        rng = random.Random(seed)
+        today = date.today().isoformat()
+        self.latency = latency
+        self.requests = 0
+        self.cards = [
+            {"id": "vc_{}".format(i), "lastFour": "{:04d}".format(1000 + i), "balance": rng.randint(0, 500000), "status": "ACTIVE"}
+            for i in range(40)
+        ]
+        self.rows = [
+            {"id": "txn_{}".format(i), "amount": rng.randint(100, 50000), "date": today,
+             "description": "Purchase {}".format(i), "category": rng.choice(["Travel", "Meals", "Software"])}
+            for i in range(30)
+        ]
+        self.categories = [{"id": "cat_{}".format(i), "name": name} for i, name in enumerate(["Travel", "Meals", "Software"])]
+        self.virtual_cards = _Endpoint(get_virtual_cards=lambda: self._respond({"virtualCards": self.cards}))
+        self.transactions = _Endpoint(get_transactions=self._get_transactions)
+        self.expense_management = _Endpoint(
+            get_expense_categories=lambda: self._respond({"expenseCategories": self.categories})
+        )
+
+    def _get_transactions(self, filters=None):
+        category = (filters or {}).get("category")
+        matching = [row for row in self.rows if category is None or row["category"] == category]
+        return self._respond({"report": {"transactions": matching, "pagination": {"numberOfPages": 1}}})
+
+    async def _respond(self, payload):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return payload
+
+
+async def run_call(sessions, call_id, latencies):
+    for command in SCRIPT:
+        start = time.perf_counter()
+        await sessions.process_command(call_id, command)
+        latencies.append(time.perf_counter() - start)
+    sessions.close(call_id)
+
+
+async def measure(calls):
+    os.environ.setdefault("EXTEND_API_KEY", "benchmark")
+    os.environ.setdefault("EXTEND_API_SECRET", "benchmark")
+    integration = ExtendIntegration()
+    integration.client = FakeExtendClient()
+    sessions = SessionManager(integration, max_sessions=calls)
+    latencies = []
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run_call(sessions, "call_{}".format(i), latencies) for i in range(calls)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    turns = len(latencies)
+    latencies.sort()
+    return {
+        "calls": calls,
+        "turns": turns,
+        "api_requests": integration.client.requests,
+        "cpu_ms_per_turn": cpu / turns * 1e3,
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p99_ms": latencies[min(turns - 1, int(turns * 0.99))] * 1e3,
+        "wall_s": wall,
+    }
+
+
+def main(call_counts=(10, 100, 500)):
+    print("fake API latency {:.0f} ms, one turn per caller every {:.0f} s".format(API_LATENCY * 1e3, TURN_INTERVAL))
+    print()
+    print("{:>6} {:>7} {:>9} {:>12} {:>9} {:>9} {:>14}".format(
+        "calls", "turns", "requests", "cpu ms/turn", "p50 ms", "p99 ms", "calls per core"))
+    for calls in call_counts:
+        result = asyncio.run(measure(calls))
+        # One core is saturated when CPU time per turn x turns per second reaches 1
+        per_core = TURN_INTERVAL / (result["cpu_ms_per_turn"] / 1e3)
+        print("{:>6} {:>7} {:>9} {:>12.3f} {:>9.1f} {:>9.1f} {:>14,.0f}".format(
+            calls, result["turns"], result["api_requests"], result["cpu_ms_per_turn"],
+            result["p50_ms"], result["p99_ms"], per_core))
+
+
+if __name__ == "__main__":
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (10, 100, 500))
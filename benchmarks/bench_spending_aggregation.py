@@ -0,0 +1,88 @@
+"""
+Compares the columnar SpendingFrame with dict-based Python aggregation.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_spending_aggregation [transactions]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from src.spending_aggregation import SpendingFrame
+
+
+def synthetic_transactions(count, seed=42):
+    """
+    Generates transaction dicts shaped like Extend API results
+    """
+    rng = random.Random(seed)
+    categories = ["Travel", "Meals", "Office Supplies", "Software", "Fuel", "Marketing", None]
+    merchants = ["Merchant {}".format(index) for index in range(2000)]
+    cards = ["vc_{}".format(index) for index in range(500)]
+    start = date(2024, 1, 1)
+    return [
+        {
+            "id": "txn_{}".format(index),
+            "amount": rng.randint(100, 250000),
+            "date": (start + timedelta(days=rng.randint(0, 364))).isoformat(),
+            "category": rng.choice(categories),
+            "merchantName": rng.choice(merchants),
+            "virtualCardId": rng.choice(cards),
+        }
+        for index in range(count)
+    ]
+
+
+def dict_total(transactions):
+    return sum(transaction.get("amount", 0) for transaction in transactions)
+
+
+def dict_group_by(transactions, field):
+    totals = {}
+    for transaction in transactions:
+        key = transaction.get(field)
+        totals[key] = totals.get(key, 0) + transaction.get("amount", 0)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def dict_group_by_week(transactions):
+    totals = {}
+    for transaction in transactions:
+        day = date.fromisoformat(transaction["date"][:10])
+        week = day - timedelta(days=day.weekday())
+        totals[week] = totals.get(week, 0) + transaction.get("amount", 0)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main(count=200000):
+    transactions = synthetic_transactions(count)
+    frame = SpendingFrame.from_transactions(transactions)
+    print("{} transactions".format(count))
+    print("build frame from dicts: {:8.1f} ms".format(timed(lambda: SpendingFrame.from_transactions(transactions))))
+    print()
+    print("{:<22} {:>12} {:>12}".format("operation", "dicts ms", "frame ms"))
+    rows = [
+        ("total", lambda: dict_total(transactions), frame.total),
+        ("group by category", lambda: dict_group_by(transactions, "category"), lambda: frame.group_by("category")),
+        ("group by merchant", lambda: dict_group_by(transactions, "merchantName"), lambda: frame.group_by("merchant")),
+        ("top 5 merchants", lambda: dict_group_by(transactions, "merchantName")[:5], lambda: frame.top_k("merchant", 5)),
+        ("group by card", lambda: dict_group_by(transactions, "virtualCardId"), lambda: frame.group_by("card")),
+        ("group by week", lambda: dict_group_by_week(transactions), lambda: frame.group_by("week")),
+    ]
+    for name, with_dicts, with_frame in rows:
+        print("{:<22} {:>12.2f} {:>12.2f}".format(name, timed(with_dicts), timed(with_frame)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
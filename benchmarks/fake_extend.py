@@ -0,0 +1,279 @@
+"""
+A local fake of the Extend API for benchmarks, serving synthetic accounts over HTTP.
+
+FakeExtendServer answers the endpoints ExtendIntegration reads (virtual
+cards, the transactions report and expense categories) from a generated
+account, with configurable latency, page size and injected errors.
+HttpExtendClient has the shape of the Extend client the integration
+expects but talks to the fake server over real HTTP, so benchmarks cover
+connection handling, JSON decoding, pagination and retries.
+
+Serve an account on its own, e.g. to point other tools at it:
+
+    python -m benchmarks.fake_extend [port]
+"""
+import asyncio
+import bisect
+import multiprocessing
+import random
+import sys
+from datetime import date, timedelta
+
+from aiohttp import ClientSession, TCPConnector, web
+
+from src.tool_server import dumps, loads
+
+# Seconds the fake API takes to answer each request, plus up to LATENCY_JITTER more
+LATENCY = 0.02
+LATENCY_JITTER = 0.01
+
+# Transactions per page when a request does not ask for a page size
+DEFAULT_PER_PAGE = 50
+
+CATEGORIES = ["Travel", "Meals", "Software", "Office Supplies", "Advertising", "Lodging", "Fuel", "Shipping"]
+MERCHANTS = ["Delta", "United", "Uber", "Lyft", "Marriott", "Hilton", "Shell", "Staples", "AWS", "Google", "FedEx", "Chipotle"]
+TEAMS = ["Marketing", "Engineering", "Sales", "Travel", "Operations", "Design", "Support", "Finance"]
+
+
+def generate_account(cards=2000, transactions=100000, days=365, seed=7, today=None):
+    """
+    Returns a synthetic account: virtual cards, expense categories and
+    transactions spread over the last `days` days, the same for the same seed
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    virtual_cards = [
+        {
+            "id": "vc_{}".format(i),
+            "displayName": "{} card {}".format(TEAMS[i % len(TEAMS)], i),
+            "recipientName": "Employee {}".format(i),
+            "lastFour": "{:04d}".format(i % 10000),
+            "balance": rng.randint(0, 1000000),
+            "status": rng.choices(["ACTIVE", "CLOSED", "PAUSED"], weights=[8, 1, 1])[0],
+        }
+        for i in range(cards)
+    ]
+    rows = []
+    for i in range(transactions):
+        merchant = rng.choice(MERCHANTS)
+        rows.append({
+            "id": "txn_{}".format(i),
+            "amount": rng.randint(100, 250000),
+            "date": (today - timedelta(days=rng.randrange(days))).isoformat(),
+            "description": "{} purchase".format(merchant),
+            "merchantName": merchant,
+            "category": rng.choice(CATEGORIES),
+            "virtualCardId": "vc_{}".format(rng.randrange(cards)) if cards else None,
+            "status": "PENDING" if rng.random() < 0.05 else "CLEARED",
+        })
+    return {
+        "virtualCards": virtual_cards,
+        "expenseCategories": [{"id": "cat_{}".format(i), "name": name} for i, name in enumerate(CATEGORIES)],
+        "transactions": rows,
+    }
+
+
+class _DateIndex:
+    """
+    Transactions sorted by date, so a date range is two binary searches
+    """
+
+    def __init__(self, transactions):
+        self.rows = sorted(transactions, key=lambda row: row["date"])
+        self.dates = [row["date"] for row in self.rows]
+
+    def between(self, start=None, end=None):
+        low = bisect.bisect_left(self.dates, start) if start else 0
+        high = bisect.bisect_right(self.dates, end) if end else len(self.rows)
+        return low, max(low, high)
+
+
+class FakeExtendServer:
+    """
+    Serves an account the way the Extend API does, newest transactions first.
+
+    Each request waits `latency` seconds (plus random jitter). A share
+    `error_rate` of requests fails with 503, or with 429 and a Retry-After
+    header, so the client's retries and backoff are exercised.
+    """
+
+    def __init__(self, account, latency=LATENCY, jitter=LATENCY_JITTER, error_rate=0.0, seed=0):
+        self.account = account
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._all = _DateIndex(account["transactions"])
+        self._by_category = {}
+        for row in account["transactions"]:
+            self._by_category.setdefault((row.get("category") or "").lower(), []).append(row)
+        self._by_category = {category: _DateIndex(rows) for category, rows in self._by_category.items()}
+        self.requests = 0
+        self.errors = 0
+        self._runner = None
+
+    def build_app(self):
+        app = web.Application()
+        app.router.add_get("/virtualcards", self.handle_virtual_cards)
+        app.router.add_get("/reports/transactions/v2", self.handle_transactions)
+        app.router.add_get("/expensecategories", self.handle_expense_categories)
+        app.router.add_get("/_stats", self.handle_stats)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Starts serving and returns the port
+        """
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_virtual_cards(self, request):
+        return await self._respond(lambda: {"virtualCards": self.account["virtualCards"]})
+
+    async def handle_expense_categories(self, request):
+        return await self._respond(lambda: {"expenseCategories": self.account["expenseCategories"]})
+
+    async def handle_transactions(self, request):
+        return await self._respond(lambda: self._transactions_report(request.query))
+
+    async def handle_stats(self, request):
+        return web.Response(body=dumps({"requests": self.requests, "errors": self.errors}), content_type="application/json")
+
+    def _transactions_report(self, query):
+        category = (query.get("category") or "").lower()
+        index = self._by_category.get(category) if category else self._all
+        low, high = index.between(query.get("startDate"), query.get("endDate")) if index else (0, 0)
+        page = max(1, int(query.get("page", 1)))
+        per_page = max(1, int(query.get("perPage", DEFAULT_PER_PAGE)))
+        # Pages are cut from the newest end of the range
+        stop = max(low, high - (page - 1) * per_page)
+        start = max(low, stop - per_page)
+        rows = index.rows[start:stop][::-1] if index else []
+        count = high - low
+        has_more = start > low
+        return {
+            "report": {
+                "transactions": rows,
+                # Like the real API, totalItems is only one more than the page while another page exists
+                "pagination": {"page": page, "pageItemCount": per_page,
+                               "totalItems": len(rows) + 1 if has_more else (page - 1) * per_page + len(rows),
+                               "numberOfPages": -(-count // per_page)},
+            }
+        }
+
+    async def _respond(self, build):
+        self.requests += 1
+        await asyncio.sleep(self.latency + self._rng.random() * self.jitter)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            if self._rng.random() < 0.5:
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            return web.Response(status=503)
+        return web.Response(body=dumps(build()), content_type="application/json")
+
+
+class _Endpoint:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+class HttpExtendClient:
+    """
+    Stand-in for the Extend client that reads from a FakeExtendServer over HTTP
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._session = None
+        self.virtual_cards = _Endpoint(get_virtual_cards=lambda: self._get("/virtualcards"))
+        self.transactions = _Endpoint(
+            get_transactions=lambda filters=None: self._get("/reports/transactions/v2", filters)
+        )
+        self.expense_management = _Endpoint(get_expense_categories=lambda: self._get("/expensecategories"))
+
+    async def _get(self, path, params=None):
+        if self._session is None:
+            self._session = ClientSession(connector=TCPConnector(limit=64))
+        query = {name: str(value) for name, value in (params or {}).items() if value is not None}
+        async with self._session.get(self.base_url + path, params=query) as response:
+            # Raises ClientResponseError, whose status and headers drive the scheduler's retries
+            response.raise_for_status()
+            return loads(await response.read())
+
+    async def stats(self):
+        """
+        Returns the server's request and injected error counts
+        """
+        return await self._get("/_stats")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def _serve(ports, account_options, server_options, port):
+    async def run():
+        server = FakeExtendServer(generate_account(**account_options), **server_options)
+        ports.put(await server.start(port=port))
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+class FakeExtendProcess:
+    """
+    Runs a FakeExtendServer in a child process, so generating and serving the
+    account does not share a CPU or event loop with the code being measured
+    """
+
+    def __init__(self, account_options=None, server_options=None, port=0):
+        self.account_options = account_options or {}
+        self.server_options = server_options or {}
+        self.port = port
+        self.base_url = None
+        self._process = None
+
+    def start(self, timeout=120):
+        """
+        Starts the server and returns its base URL once it is listening
+        """
+        context = multiprocessing.get_context("spawn")
+        ports = context.Queue()
+        self._process = context.Process(
+            target=_serve, args=(ports, self.account_options, self.server_options, self.port), daemon=True
+        )
+        self._process.start()
+        self.port = ports.get(timeout=timeout)
+        self.base_url = "http://127.0.0.1:{}".format(self.port)
+        return self.base_url
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8090
+    print("Serving a synthetic Extend account on http://127.0.0.1:{}".format(port))
+    _serve(multiprocessing.Queue(), {}, {}, port)
@@ -1,7 +1,26 @@
-from .main import ExtendVoice
-from .voice_handler import VoiceHandler
-from .extend_integration import ExtendIntegration
-from .command_processor import CommandProcessor
-from .response_generator import ResponseGenerator
+import importlib
 
-__all__ = ['ExtendVoice', 'VoiceHandler', 'ExtendIntegration', 'CommandProcessor', 'ResponseGenerator'] 
\ No newline at end of file
+# Public names and the submodules defining them. Submodules (and the SDKs they
+# pull in) are only imported when a name is first accessed, keeping
+# `import src` cheap for workers that never touch most of them.
+_EXPORTS = {
+    'ExtendVoice': '.main',
+    'VoiceHandler': '.voice_handler',
+    'ExtendIntegration': '.extend_integration',
+    'CommandProcessor': '.command_processor',
+    'ResponseGenerator': '.response_generator',
+    'ToolServer': '.tool_server',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
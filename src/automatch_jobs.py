@@ -0,0 +1,173 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for more uploads before triggering an automatch run
+DEFAULT_DEBOUNCE = 2.0
+
+# Longest a trigger can be deferred by a steady stream of uploads
+DEFAULT_MAX_DEBOUNCE = 10.0
+
+# Status polling starts fast and backs off while the job is still running
+DEFAULT_POLL_INTERVAL = 0.5
+DEFAULT_MAX_POLL_INTERVAL = 8.0
+POLL_BACKOFF = 1.5
+
+# Give up waiting on a job after this many seconds
+DEFAULT_JOB_TIMEOUT = 300.0
+
+SUCCESS_STATUSES = {"completed", "complete", "succeeded", "success", "done"}
+FAILURE_STATUSES = {"failed", "error", "cancelled", "canceled"}
+
+
+class AutomatchError(Exception):
+    """
+    Raised when an automatch job fails or does not finish in time
+    """
+
+
+class AutomatchJob:
+    """
+    Handle for one automatch run.
+
+    Await the job (or `wait()`) for its final status, or register a callback
+    with `add_done_callback`.
+    """
+
+    def __init__(self):
+        self.job_id = None
+        self.status = "pending"
+        self.result = None
+        self.requests = 1
+        self._future = asyncio.get_running_loop().create_future()
+
+    def __await__(self):
+        return self.wait().__await__()
+
+    def done(self):
+        return self._future.done()
+
+    def cancelled(self):
+        return self._future.cancelled()
+
+    def succeeded(self):
+        return self._future.done() and not self._future.cancelled() and self._future.exception() is None
+
+    async def wait(self, timeout=None):
+        """
+        Waits for the job to finish and returns its final status response
+        """
+        return await asyncio.wait_for(asyncio.shield(self._future), timeout)
+
+    def add_done_callback(self, callback):
+        """
+        Calls callback(job) once the job has finished, failed or been cancelled
+        """
+        self._future.add_done_callback(lambda _: callback(self))
+
+    def _finish(self, result=None, error=None):
+        if self._future.done():
+            return
+        if error is not None:
+            self._future.set_exception(error)
+            # Callers that only use callbacks should not trigger "exception never retrieved"
+            self._future.exception()
+        else:
+            self.result = result
+            self._future.set_result(result)
+
+
+class AutomatchJobManager:
+    """
+    Batches automatch triggers and tracks the resulting jobs to completion.
+
+    Requests made within the debounce window of each other share one job, so
+    a burst of receipt uploads triggers a single automatch run. Once started,
+    the job's status is polled with a growing interval until it finishes.
+    """
+
+    def __init__(self, integration, debounce=DEFAULT_DEBOUNCE, max_debounce=DEFAULT_MAX_DEBOUNCE,
+                 poll_interval=DEFAULT_POLL_INTERVAL, max_poll_interval=DEFAULT_MAX_POLL_INTERVAL,
+                 timeout=DEFAULT_JOB_TIMEOUT):
+        self.integration = integration
+        self.debounce = debounce
+        self.max_debounce = max_debounce
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self._pending = None
+        self._pending_since = None
+        self._trigger_handle = None
+        self._tasks = set()
+
+    def request(self):
+        """
+        Asks for an automatch run and returns the AutomatchJob that will serve it
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._pending is None:
+            self._pending = AutomatchJob()
+            self._pending_since = now
+        else:
+            self._pending.requests += 1
+            self._trigger_handle.cancel()
+        delay = min(self.debounce, max(0.0, self._pending_since + self.max_debounce - now))
+        self._trigger_handle = loop.call_later(delay, self._start_pending)
+        return self._pending
+
+    async def close(self):
+        """
+        Cancels pending triggers and stops tracking running jobs
+        """
+        if self._trigger_handle is not None:
+            self._trigger_handle.cancel()
+            self._trigger_handle = None
+        if self._pending is not None:
+            self._pending._future.cancel()
+            self._pending = None
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _start_pending(self):
+        job = self._pending
+        self._pending = None
+        self._trigger_handle = None
+        task = asyncio.ensure_future(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job):
+        try:
+            result = await asyncio.wait_for(self._trigger_and_poll(job), self.timeout)
+        except asyncio.TimeoutError:
+            job._finish(error=AutomatchError("Automatch job {} did not finish in time".format(job.job_id)))
+        except asyncio.CancelledError:
+            job._future.cancel()
+            raise
+        except Exception as e:
+            logger.warning("Automatch job %s failed: %s", job.job_id, e)
+            job._finish(error=e)
+        else:
+            job._finish(result=result)
+
+    async def _trigger_and_poll(self, job):
+        response = await self.integration.automatch_receipts()
+        job.job_id = response.get("jobId") or response.get("id")
+        if job.job_id is None:
+            raise AutomatchError("Automatch trigger returned no job id")
+        job.status = (response.get("status") or "").lower()
+        interval = self.poll_interval
+
+        while job.status not in SUCCESS_STATUSES:
+            if job.status in FAILURE_STATUSES:
+                raise AutomatchError("Automatch job {} ended with status {}".format(job.job_id, job.status))
+            await asyncio.sleep(interval)
+            response = await self.integration.get_automatch_status(job.job_id)
+            job.status = (response.get("status") or "").lower()
+            interval = min(self.max_poll_interval, interval * POLL_BACKOFF)
+
+        return response
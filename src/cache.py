@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class _CacheEntry:
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value, expires_at):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry TTLs.
+
+    Expired entries are not dropped eagerly: `get_or_load` keeps serving the
+    stale value while a single background task refreshes it, so callers only
+    ever wait on a load when the key has never been cached (or was invalidated).
+    """
+
+    def __init__(self, max_size=256, clock=time.monotonic):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._refreshes = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key if it is still fresh
+        """
+        entry = self._entries.get(key)
+        if entry is None or self._is_expired(entry):
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores value under key; a ttl of None never expires
+        """
+        expires_at = None if ttl is None else self._clock() + ttl
+        self._entries[key] = _CacheEntry(value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._cancel_refresh(evicted_key)
+            self.evictions += 1
+
+    async def get_or_load(self, key, loader, ttl=None, max_stale=None):
+        """
+        Returns the cached value for key, loading it with `loader()` on a miss.
+
+        A stale entry is returned immediately and refreshed in the background,
+        unless it expired more than `max_stale` seconds ago, in which case it
+        is treated as a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._is_expired(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if max_stale is None or self._clock() - entry.expires_at <= max_stale:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._schedule_refresh(key, loader, ttl)
+                return entry.value
+
+        self.misses += 1
+        value = await loader()
+        self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key):
+        """
+        Drops a single key and any refresh in progress for it
+        """
+        self._cancel_refresh(key)
+        return self._entries.pop(key, _MISSING) is not _MISSING
+
+    def invalidate_where(self, predicate):
+        """
+        Drops every key for which predicate(key) is true and returns how many were dropped
+        """
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            self.invalidate(key)
+        return len(keys)
+
+    def clear(self):
+        """
+        Drops every entry
+        """
+        for key in list(self._refreshes):
+            self._cancel_refresh(key)
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Returns hit/miss counters for the cache
+        """
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refresh_errors": self.refresh_errors,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+    def _is_expired(self, entry):
+        return entry.expires_at is not None and entry.expires_at <= self._clock()
+
+    def _schedule_refresh(self, key, loader, ttl):
+        if key in self._refreshes:
+            return
+        task = asyncio.ensure_future(self._refresh(key, loader, ttl))
+        self._refreshes[key] = task
+
+    async def _refresh(self, key, loader, ttl):
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.warning("Background refresh of %r failed: %s", key, e)
+        else:
+            if key in self._entries:
+                self.set(key, value, ttl)
+        finally:
+            if self._refreshes.get(key) is asyncio.current_task():
+                del self._refreshes[key]
+
+    def _cancel_refresh(self, key):
+        task = self._refreshes.pop(key, None)
+        if task is not None and not task.done():
+            task.cancel()
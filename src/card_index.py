@@ -0,0 +1,251 @@
+import bisect
+import re
+
+from .time_periods import NUMBER_WORDS
+
+# Cards read out per answer; "next five cards" continues from where the last answer stopped
+PAGE_SIZE = 5
+
+# Card fields searched when a card is asked for by name
+NAME_FIELDS = ("displayName", "recipientName")
+
+# Utterance words that never identify a card by name
+NAME_STOPWORDS = {
+    "a", "an", "the", "my", "our", "me", "i", "is", "are", "on", "of", "for", "with", "in", "to",
+    "what", "whats", "show", "list", "tell", "all", "any", "which", "card", "cards", "virtual",
+    "balance", "balances", "over", "under", "above", "below", "than", "more", "less", "greater",
+    "least", "most", "at", "dollars", "dollar", "next", "other", "remaining", "ending", "ends",
+    "last", "four", "have", "has", "do", "does", "left",
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+_LAST_FOUR_PATTERN = re.compile(r"\b(?:ending|ends)\s+(?:in|with)\s+(\d{4})\b|\blast\s+four(?:\s+digits)?\s+(\d{4})\b")
+
+_AMOUNT = r"\$?\s*(\d[\d,]*(?:\.\d{1,2})?)"
+_OVER_PATTERN = re.compile(r"\b(?:(over|above|more than|greater than)|at least)\s+" + _AMOUNT)
+_UNDER_PATTERN = re.compile(r"\b(?:(under|below|less than)|at most)\s+" + _AMOUNT)
+
+_NEXT_PAGE_PATTERN = re.compile(r"\bnext(?:\s+(\d+|{}))?\b|\b(?:more|other|remaining) cards\b".format("|".join(NUMBER_WORDS)))
+
+
+def card_signature(cards):
+    """
+    Returns a value that changes whenever a card is added, removed or updated
+    """
+    return tuple(
+        (card.get("id"), card.get("lastFour"), card.get("balance"), card.get("status"))
+        + tuple(card.get(field) for field in NAME_FIELDS)
+        for card in cards
+    )
+
+
+def parse_last_four(command):
+    """
+    Returns the last four digits asked about ("card ending in 1234"), or None
+    """
+    match = _LAST_FOUR_PATTERN.search(command)
+    if match is None:
+        return None
+    return match.group(1) or match.group(2)
+
+
+def parse_balance_bounds(command):
+    """
+    Returns (minimum, maximum, include_minimum, include_maximum) for the balance
+    in cents asked about ("cards over $500"); either bound may be None, and
+    "at least" and "at most" include the bound itself
+    """
+    bounds = []
+    inclusive = []
+    for pattern in (_OVER_PATTERN, _UNDER_PATTERN):
+        match = pattern.search(command)
+        bounds.append(int(round(float(match.group(2).replace(",", "")) * 100)) if match else None)
+        inclusive.append(match is not None and match.group(1) is None)
+    return tuple(bounds + inclusive)
+
+
+def parse_next_page(command):
+    """
+    Returns the page size asked for by "next five cards" (PAGE_SIZE by default), or None
+    """
+    match = _NEXT_PAGE_PATTERN.search(command)
+    if match is None:
+        return None
+    size = match.group(1)
+    if size is None:
+        return PAGE_SIZE
+    return int(size) if size.isdigit() else NUMBER_WORDS[size]
+
+
+class CardSelection:
+    """
+    The cards matching one question, as positions into the index.
+
+    Positions are kept as a range over the balance order where possible, so
+    counting the matches and reading one page of them do not touch the rest.
+    """
+
+    __slots__ = ("index", "positions", "description", "filtered")
+
+    def __init__(self, index, positions, description, filtered=False):
+        self.index = index
+        self.positions = positions
+        self.description = description
+        # False when the command named no status, name or balance and every card matched
+        self.filtered = filtered
+
+    def __len__(self):
+        return len(self.positions)
+
+    def page(self, offset, size=PAGE_SIZE):
+        """
+        Returns up to size cards starting at offset
+        """
+        return [self.index.cards[position] for position in self.positions[offset:offset + size]]
+
+
+class CardIndex:
+    """
+    In-memory lookup structures over the cached virtual cards.
+
+    Cards are indexed by last four digits, by the words of their name and
+    recipient, and by status, and kept in a list sorted by balance, so
+    "card ending in 1234" is a dict lookup and "cards over $500" a binary
+    search. Build one per card list and reuse it.
+    """
+
+    def __init__(self, cards):
+        self.cards = list(cards)
+        self.signature = card_signature(self.cards)
+        self._by_last_four = {}
+        self._by_name = {}
+        self._by_status = {}
+
+        for position, card in enumerate(self.cards):
+            self._by_last_four.setdefault(str(card.get("lastFour")), []).append(position)
+            self._by_status.setdefault((card.get("status") or "").lower(), []).append(position)
+            for field in NAME_FIELDS:
+                for token in _TOKEN_PATTERN.findall((card.get(field) or "").lower()):
+                    if token not in NAME_STOPWORDS:
+                        self._by_name.setdefault(token, set()).add(position)
+
+        # Positions ordered by balance, largest first, with the negated balances alongside for bisect
+        self._by_balance = sorted(range(len(self.cards)), key=lambda position: -self._balance(position))
+        self._negated_balances = [-self._balance(position) for position in self._by_balance]
+
+    def __len__(self):
+        return len(self.cards)
+
+    def _balance(self, position):
+        return self.cards[position].get("balance") or 0
+
+    def ending_in(self, last_four):
+        """
+        Returns the cards whose number ends in the given four digits
+        """
+        return [self.cards[position] for position in self._by_last_four.get(last_four, ())]
+
+    def with_status(self, status):
+        """
+        Returns the positions of cards in the given status, in card order
+        """
+        return self._by_status.get(status.lower(), [])
+
+    def named(self, words):
+        """
+        Returns the positions of the cards sharing the most name words with the given words
+        """
+        hits = {}
+        for word in words:
+            for position in self._by_name.get(word, ()):
+                hits[position] = hits.get(position, 0) + 1
+        if not hits:
+            return []
+        best = max(hits.values())
+        return sorted(position for position, count in hits.items() if count == best)
+
+    def balance_between(self, minimum=None, maximum=None, include_minimum=False, include_maximum=False):
+        """
+        Returns the positions of cards with minimum < balance < maximum, largest balance first;
+        include_minimum and include_maximum make the matching bound inclusive
+        """
+        if maximum is None:
+            start = 0
+        elif include_maximum:
+            start = bisect.bisect_left(self._negated_balances, -maximum)
+        else:
+            start = bisect.bisect_right(self._negated_balances, -maximum)
+        if minimum is None:
+            end = len(self._by_balance)
+        elif include_minimum:
+            end = bisect.bisect_right(self._negated_balances, -minimum)
+        else:
+            end = bisect.bisect_left(self._negated_balances, -minimum)
+        return _Slice(self._by_balance, start, max(start, end))
+
+    def find(self, command):
+        """
+        Returns a CardSelection of the cards a command asks about
+        """
+        minimum, maximum, include_minimum, include_maximum = parse_balance_bounds(command)
+        tokens = _TOKEN_PATTERN.findall(command.lower())
+        status = next((token for token in tokens if token in self._by_status), None)
+        name_words = [token for token in tokens if token in self._by_name and token != status]
+        named = self.named(name_words)
+
+        positions = None
+        if minimum is not None or maximum is not None:
+            positions = self.balance_between(minimum, maximum, include_minimum, include_maximum)
+        for subset in (self.with_status(status) if status else None, named or None):
+            if subset is None:
+                continue
+            if positions is None:
+                positions = subset
+            else:
+                allowed = set(subset)
+                positions = [position for position in positions if position in allowed]
+        filtered = positions is not None
+        if positions is None:
+            positions = range(len(self.cards))
+
+        description = "virtual cards"
+        if status:
+            description = "{} {}".format(status, description)
+        if named:
+            description += " named {}".format(" ".join(name_words))
+        if minimum is not None:
+            description += " with a balance {} ${:,.2f}".format("of at least" if include_minimum else "over", minimum / 100)
+        if maximum is not None:
+            description += "{} {} ${:,.2f}".format(
+                " and" if minimum is not None else " with a balance",
+                ("at most" if minimum is not None else "of at most") if include_maximum else "under",
+                maximum / 100,
+            )
+        return CardSelection(self, positions, description, filtered)
+
+
+class _Slice:
+    """
+    Read-only view of list[start:end] that slices without copying the rest
+    """
+
+    __slots__ = ("items", "start", "end")
+
+    def __init__(self, items, start, end):
+        self.items = items
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self):
+        for offset in range(self.start, self.end):
+            yield self.items[offset]
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("_Slice only supports slicing")
+        start, stop, _ = key.indices(len(self))
+        return self.items[self.start + start:self.start + max(start, stop)]
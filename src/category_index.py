@@ -0,0 +1,176 @@
+import re
+from difflib import SequenceMatcher
+
+# Extra words that should resolve to a category containing the key term
+SYNONYMS = {
+    "travel": ("trip", "flight", "airfare", "airline", "hotel", "lodging", "taxi", "uber", "lyft"),
+    "meal": ("food", "lunch", "dinner", "breakfast", "restaurant", "dining", "catering"),
+    "food": ("meal", "lunch", "dinner", "breakfast", "restaurant", "dining", "grocery"),
+    "office": ("stationery", "printer", "paper"),
+    "entertainment": ("event", "ticket", "concert"),
+    "utility": ("electric", "electricity", "internet", "phone", "water"),
+    "software": ("saas", "subscription", "license"),
+    "fuel": ("gas", "gasoline", "petrol"),
+    "marketing": ("advertising", "ad", "ads"),
+}
+
+# Name words too generic to identify a category on their own
+GENERIC_TERMS = {"expense", "other", "general", "misc", "miscellaneous", "and", "cost", "fee", "service"}
+
+# Utterance words never worth a fuzzy lookup
+STOPWORDS = {
+    "a", "an", "and", "the", "on", "for", "in", "of", "to", "at", "my", "me", "i", "we", "our",
+    "how", "much", "did", "do", "have", "has", "what", "show", "list", "tell", "spend", "spent",
+    "spending", "transaction", "category", "expense", "total", "last", "this", "past", "day",
+    "week", "month", "quarter", "year", "today", "yesterday", "since", "from",
+}
+
+NAME_WEIGHT = 1.0
+SYNONYM_WEIGHT = 0.8
+GENERIC_WEIGHT = 0.2
+
+# Similarity a misheard word needs to count as a category word
+FUZZY_THRESHOLD = 0.8
+
+# A misheard word may differ in length from the real one by at most this fraction
+MAX_LENGTH_GAP = 0.2
+
+# Fuzzy candidates checked per word, ranked by shared trigrams
+FUZZY_CANDIDATES = 3
+
+# A category must score at least this to be resolved
+MIN_SCORE = 0.5
+
+# Word lookups remembered per index; cleared when full
+MAX_CACHED_LOOKUPS = 4096
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def stem(word):
+    """
+    Reduces simple English plurals to their singular form
+    """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def trigrams(word):
+    """
+    Returns the character trigrams of a word padded at both ends
+    """
+    padded = "  {} ".format(word)
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def category_signature(categories):
+    """
+    Returns a value that changes whenever a category is added, removed or renamed
+    """
+    return tuple((category.get("id"), category.get("name")) for category in categories)
+
+
+class CategoryIndex:
+    """
+    Resolves category mentions in an utterance against the live expense categories.
+
+    Category names are broken into stemmed terms and extended with synonyms.
+    Words that are not an exact term are looked up by shared character
+    trigrams and accepted when they are close enough, which catches misheard
+    words ("travle", "restaurent") and words split by speech recognition
+    ("enter tainment"). Build one per category list and reuse it.
+    """
+
+    def __init__(self, categories, synonyms=SYNONYMS):
+        self.categories = list(categories)
+        self.signature = category_signature(self.categories)
+        self._terms = {}
+        self._trigrams = {}
+        self._name_terms = []
+        self._lookups = {}
+
+        for position, category in enumerate(self.categories):
+            names = {stem(token) for token in _TOKEN_PATTERN.findall((category.get("name") or "").lower())}
+            self._name_terms.append(names)
+            for term in names:
+                self._add_term(term, position, GENERIC_WEIGHT if term in GENERIC_TERMS else NAME_WEIGHT)
+                for synonym in synonyms.get(term, ()):
+                    self._add_term(stem(synonym), position, SYNONYM_WEIGHT)
+
+    def _add_term(self, term, position, weight):
+        weights = self._terms.setdefault(term, {})
+        weights[position] = max(weight, weights.get(position, 0.0))
+        if len(term) >= 4:
+            for trigram in trigrams(term):
+                self._trigrams.setdefault(trigram, set()).add(term)
+
+    def resolve(self, text):
+        """
+        Returns the category mentioned in text, or None
+        """
+        if not self.categories:
+            return None
+        words = [stem(word) for word in _TOKEN_PATTERN.findall(text.lower())]
+        matched = {}
+        previous = None
+
+        for word in words:
+            term, similarity = self._lookup(word)
+            if term is None and previous is not None and word not in STOPWORDS and previous not in STOPWORDS:
+                # Speech recognition sometimes splits a long word in two
+                term, similarity = self._lookup(previous + word)
+            if term is not None:
+                matched[term] = max(similarity, matched.get(term, 0.0))
+            previous = word
+
+        scores = {}
+        for term, similarity in matched.items():
+            for position, weight in self._terms[term].items():
+                scores[position] = scores.get(position, 0.0) + weight * similarity
+        if not scores:
+            return None
+
+        def rank(position):
+            coverage = len(self._name_terms[position] & matched.keys()) / (len(self._name_terms[position]) or 1)
+            return scores[position], coverage, -len(self._name_terms[position])
+
+        best = max(scores, key=rank)
+        if scores[best] < MIN_SCORE:
+            return None
+        return self.categories[best]
+
+    def _lookup(self, word):
+        if word in self._terms:
+            return word, 1.0
+        if len(word) < 4 or word in STOPWORDS:
+            return None, 0.0
+        result = self._lookups.get(word)
+        if result is None:
+            if len(self._lookups) >= MAX_CACHED_LOOKUPS:
+                self._lookups.clear()
+            result = self._lookups[word] = self._fuzzy_lookup(word)
+        return result
+
+    def _fuzzy_lookup(self, word):
+        shared = {}
+        for trigram in trigrams(word):
+            for term in self._trigrams.get(trigram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:FUZZY_CANDIDATES]
+
+        best, best_ratio = None, 0.0
+        for term in candidates:
+            if abs(len(term) - len(word)) > max(1, int(len(term) * MAX_LENGTH_GAP)):
+                continue
+            matcher = SequenceMatcher(None, word, term)
+            if matcher.quick_ratio() < FUZZY_THRESHOLD:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best_ratio:
+                best, best_ratio = term, ratio
+        if best_ratio < FUZZY_THRESHOLD:
+            return None, 0.0
+        return best, best_ratio
@@ -1,66 +1,274 @@
+import asyncio
+import logging
 import re
-from datetime import datetime, timedelta
+
+from .card_index import PAGE_SIZE, parse_last_four, parse_next_page
+from .intent_router import (
+    ACTION_LIST, ACTION_MATCH, ACTION_TOTAL, DEFAULT_ROUTER, GROUP_BY_CARD, INTENT_EXPENSE_CATEGORIES,
+    INTENT_RECEIPTS, INTENT_TRANSACTIONS, INTENT_VIRTUAL_CARDS,
+)
+from .metrics import DEFAULT_METRICS, STAGE_AGGREGATE, STAGE_HANDLE, STAGE_PARSE
+from .response_generator import NO_TRANSACTIONS_MESSAGE, ResponseGenerator
+from .response_memo import ResponseMemo, memo_key
+from .spending_rollups import counts_toward_spending
+from .time_periods import DEFAULT_TIME_PERIOD_PARSER
+
+logger = logging.getLogger(__name__)
+
+# Seconds each part of a compound command may take before it is answered without data
+BRANCH_TIMEOUT = 8.0
+
+# How a compound answer refers to an intent it could not complete
+INTENT_NAMES = {
+    INTENT_VIRTUAL_CARDS: "virtual cards",
+    INTENT_TRANSACTIONS: "transactions",
+    INTENT_EXPENSE_CATEGORIES: "expense categories",
+    INTENT_RECEIPTS: "receipts",
+}
+
+# Groups read out in a spending breakdown
+BREAKDOWN_LIMIT = 5
+
+# How a breakdown names transactions missing the grouped attribute
+UNKNOWN_GROUP_LABELS = {
+    "category": "Uncategorized",
+    "merchant": "Unknown merchant",
+    "card": "An unknown card",
+    "week": "Undated",
+}
+
+async def _join(sentences):
+    """
+    Collects a stream of sentences into one response
+    """
+    return " ".join([sentence async for sentence in sentences])
 
 class CommandProcessor:
-    def __init__(self, extend_integration):
+    def __init__(self, extend_integration, notify=None, router=None, time_periods=None, branch_timeout=BRANCH_TIMEOUT, memo=None, metrics=None):
         self.extend_integration = extend_integration
+        self.branch_timeout = branch_timeout
+        self.router = router or DEFAULT_ROUTER
+        self.time_periods = time_periods or DEFAULT_TIME_PERIOD_PARSER
+        # Latency histograms for turns and the parse/fetch/aggregate/format spans within them
+        self.metrics = metrics or DEFAULT_METRICS
+        self.responses = ResponseGenerator(self.metrics)
+        # Answers to repeated questions, reused until the data behind them changes
+        self.memo = memo if memo is not None else ResponseMemo()
+        self._handlers = {
+            INTENT_VIRTUAL_CARDS: self._handle_virtual_card_command,
+            INTENT_TRANSACTIONS: self._handle_transaction_command,
+            INTENT_EXPENSE_CATEGORIES: self._handle_expense_category_command,
+            INTENT_RECEIPTS: self._handle_receipt_command,
+        }
+        # Called with messages produced outside a turn (e.g. a finished automatch job)
+        self.notify = notify
+        # Messages not yet delivered through notify, spoken at the start of the next turn
+        self.pending_notifications = []
+        # Automatch jobs (possibly shared with other callers) this processor will report on
+        self._automatch_jobs = set()
+        # (CardSelection, offset) of the card list being read out page by page
+        self._card_cursor = None
         
     async def process_command(self, command):
         """
         Processes a voice command and returns the appropriate response
         """
-        command = command.lower()
+        with self.metrics.turn():
+            response = await _join(self._stream_route(command.lower()))
         
-        # Check for virtual card commands
-        if "virtual card" in command or "virtual cards" in command:
-            return await self._handle_virtual_card_command(command)
+        if self.pending_notifications:
+            response = " ".join(self.pending_notifications + [response])
+            self.pending_notifications = []
         
-        # Check for transaction commands
-        elif "transaction" in command or "transactions" in command or "spent" in command or "spending" in command:
-            return await self._handle_transaction_command(command)
+        return response
+    
+    async def stream_command(self, command):
+        """
+        Yields the response to a voice command a sentence at a time, so speech
+        can start while later pages or totals are still being computed
+        """
+        pending, self.pending_notifications = self.pending_notifications, []
+        for message in pending:
+            yield message
         
-        # Check for expense category commands
-        elif "category" in command or "categories" in command or "expense" in command:
-            return await self._handle_expense_category_command(command)
+        with self.metrics.turn():
+            async for sentence in self._stream_route(command.lower()):
+                yield sentence
+    
+    async def _stream_route(self, command):
+        """
+        Routes a lowercased command to its handler and yields its sentences
+        """
+        with self.metrics.span(STAGE_PARSE, "route"):
+            clauses = self.router.route_all(command)
+            route = clauses[0][1] if clauses else self.router.route(command)
         
-        # Check for receipt commands
-        elif "receipt" in command or "upload" in command:
-            return await self._handle_receipt_command(command)
+        if len(clauses) > 1:
+            self.metrics.tag_turn("compound")
+            async for sentence in self._stream_compound_command(clauses):
+                yield sentence
+            return
+        
+        self.metrics.tag_turn(route.intent)
+        handler = self._handlers.get(route.intent)
         
         # Default response for unrecognized commands
-        else:
-            return "I'm not sure how to help with that. You can ask me about your virtual cards, transactions, expense categories, or uploading receipts."
+        if handler is None:
+            yield "I'm not sure how to help with that. You can ask me about your virtual cards, transactions, expense categories, or uploading receipts."
+            return
+        
+        with self.metrics.span(STAGE_HANDLE, route.intent):
+            async for sentence in handler(command, route):
+                yield sentence
     
-    async def _handle_virtual_card_command(self, command):
+    async def _stream_compound_command(self, clauses):
+        """
+        Runs every part of a compound command concurrently and yields the answers
+        in spoken order, each as soon as it and the parts before it are done
+        """
+        async def run(clause, route):
+            name = INTENT_NAMES.get(route.intent, route.intent)
+            try:
+                with self.metrics.span(STAGE_HANDLE, route.intent):
+                    return await asyncio.wait_for(_join(self._handlers[route.intent](clause, route)), self.branch_timeout)
+            except asyncio.TimeoutError:
+                return "I couldn't get your {} in time.".format(name)
+            except Exception as e:
+                logger.warning("Compound command part %r failed: %s", clause, e)
+                return "I ran into a problem getting your {}.".format(name)
+        
+        tasks = [asyncio.ensure_future(run(clause, route)) for clause, route in clauses]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            # The listener may stop early (e.g. the caller interrupted)
+            for task in tasks:
+                task.cancel()
+    
+    async def _handle_virtual_card_command(self, command, route):
         """
         Handles commands related to virtual cards
         """
-        virtual_cards = await self.extend_integration.get_virtual_cards()
+        index = await self.extend_integration.get_card_index()
         
-        if not virtual_cards:
-            return "You don't have any virtual cards."
+        if not len(index):
+            yield "You don't have any virtual cards."
+            return
         
-        if "list" in command or "show" in command or "what" in command:
-            response = "You have {} virtual cards. ".format(len(virtual_cards))
-            
-            for card in virtual_cards:
-                last_four = card.get("lastFour", "unknown")
-                balance = card.get("balance", 0) / 100  # Convert cents to dollars
-                response += "Card ending in {} has a balance of ${:.2f}. ".format(last_four, balance)
-            
-            return response
+        last_four = parse_last_four(command)
+        if last_four is not None:
+            cards = index.ending_in(last_four)
+            if not cards:
+                yield "I couldn't find a card ending in {}.".format(last_four)
+            for card in cards:
+                yield self.responses.format_virtual_card(card)
+            return
+        
+        page_size = parse_next_page(command)
+        if page_size is not None and self._card_cursor is not None and self._card_cursor[0].index.signature == index.signature:
+            selection, offset = self._card_cursor
+        else:
+            with self.metrics.span(STAGE_AGGREGATE, "card_index"):
+                selection, offset = index.find(command), 0
+            if not selection.filtered and page_size is None and route.action != ACTION_LIST:
+                yield "I can help you with your virtual cards. You can ask me to list your virtual cards or show details about a specific card."
+                return
+        
+        if not len(selection):
+            yield "You don't have any {}.".format(selection.description)
+            return
+        
+        cards = selection.page(offset, page_size or PAGE_SIZE)
+        if not cards:
+            yield "That's all of your {}.".format(selection.description)
+            return
+        
+        if offset:
+            yield "Cards {} to {} of {}.".format(offset + 1, offset + len(cards), len(selection))
+        else:
+            yield "You have {} {}.".format(len(selection), selection.description)
+            if len(cards) < len(selection):
+                yield "Here are the first {}.".format(len(cards))
         
-        return "I can help you with your virtual cards. You can ask me to list your virtual cards or show details about a specific card."
+        # Only one page is read out; "next five cards" continues from here
+        self._card_cursor = (selection, offset + len(cards))
+        
+        for card in cards:
+            yield self.responses.format_virtual_card(card)
+        
+        remaining = len(selection) - offset - len(cards)
+        if remaining > 0:
+            yield "Say next to hear {} more.".format(min(PAGE_SIZE, remaining))
     
-    async def _handle_transaction_command(self, command):
+    async def _handle_transaction_command(self, command, route):
         """
         Handles commands related to transactions
         """
+        filters, time_period, category = await self.build_transaction_filters(command)
+        description = time_period["description"] if time_period else None
+        
+        endpoints = ("transactions", "virtual_cards") if route.group_by == GROUP_BY_CARD else ("transactions",)
+        answer = self._answer_transaction_command(filters, description, category, route)
+        async for sentence in self._remember(memo_key(INTENT_TRANSACTIONS, route, filters, description), endpoints, answer):
+            yield sentence
+    
+    async def _answer_transaction_command(self, filters, description, category, route):
+        """
+        Yields the answer to a transaction command once its filters are known
+        """
+        if route.group_by:
+            async for sentence in self._handle_spending_breakdown(filters, description, category, route.group_by):
+                yield sentence
+            return
+        
+        if route.action == ACTION_LIST:
+            # Only the first page is read; the rest are counted from its pagination
+            total = await self.extend_integration.count_transactions(filters)
+            transactions = self.extend_integration.iter_transactions(filters=filters)
+            async for sentence in self.responses.stream_transaction_list(transactions, total=total):
+                yield sentence
+            return
+        
+        if route.action != ACTION_TOTAL:
+            yield "I can help you with your transactions. You can ask me how much you spent or to list your recent transactions."
+            return
+        
+        # Totals over a locally synced range come straight from the spending rollups
+        with self.metrics.span(STAGE_AGGREGATE, "rollups"):
+            summary = await self.extend_integration.summarize_spending(filters)
+        
+        if summary is not None:
+            total_spending, transaction_count = summary
+        else:
+            # Stream every page, keeping only the running total
+            total_spending = 0
+            transaction_count = 0
+            
+            async for transaction in self.extend_integration.iter_transactions(filters=filters):
+                if not counts_toward_spending(transaction):
+                    continue
+                total_spending += transaction.get("amount", 0)
+                transaction_count += 1
+        
+        if not transaction_count:
+            yield NO_TRANSACTIONS_MESSAGE
+            return
+        
+        yield self.responses.format_spending_total(total_spending, description, category)
+    
+    async def build_transaction_filters(self, command):
+        """
+        Builds the transaction filters for a lowercased command, returning
+        (filters, time period, category name)
+        """
         # Extract time period from command
-        time_period = self._extract_time_period(command)
+        with self.metrics.span(STAGE_PARSE, "time_period"):
+            time_period = self._extract_time_period(command)
         
         # Extract category from command
-        category = self._extract_category(command)
+        with self.metrics.span(STAGE_PARSE, "category"):
+            category = await self._extract_category(command)
         
         # Build filters
         filters = {}
@@ -72,146 +280,131 @@ class CommandProcessor:
         if category:
             filters["category"] = category
         
-        # Get transactions
-        transactions = await self.extend_integration.get_transactions(filters=filters)
+        return filters, time_period, category
+    
+    async def _handle_spending_breakdown(self, filters, time_period, category, group_by):
+        """
+        Handles spending broken down by category, merchant, card or week
+        """
+        # NumPy is only loaded once someone asks for a breakdown
+        from .spending_aggregation import GROUP_CARD, GROUP_WEEK, SpendingFrameBuilder
         
-        if not transactions:
-            return "I couldn't find any transactions matching your criteria."
+        builder = SpendingFrameBuilder()
+        async for transaction in self.extend_integration.iter_transactions(filters=filters):
+            builder.append(transaction)
         
-        # Calculate total spending
-        total_spending = sum(transaction.get("amount", 0) for transaction in transactions)
-        total_spending_dollars = total_spending / 100  # Convert cents to dollars
+        if not len(builder):
+            yield NO_TRANSACTIONS_MESSAGE
+            return
         
-        # Generate response
-        if "how much" in command:
-            response = "You spent ${:.2f} ".format(total_spending_dollars)
-            
-            if time_period:
-                response += "{} ".format(time_period["description"])
-            
-            if category:
-                response += "on {} ".format(category)
-            
-            response += "."
-            
-            return response
+        with self.metrics.span(STAGE_AGGREGATE, group_by):
+            frame = builder.build()
+            total_spending = frame.total()
+            groups = frame.group_by(group_by)
         
-        elif "list" in command or "show" in command or "what" in command:
-            response = "Here are your recent transactions: "
-            
-            for transaction in transactions[:5]:  # Limit to 5 transactions
-                amount = transaction.get("amount", 0) / 100  # Convert cents to dollars
-                description = transaction.get("description", "Unknown")
-                date = transaction.get("date", "Unknown")
-                
-                response += "${:.2f} for {} on {}. ".format(amount, description, date)
-            
-            if len(transactions) > 5:
-                response += "And {} more transactions. ".format(len(transactions) - 5)
-            
-            return response
+        yield self.responses.format_spending_total(total_spending, time_period, category, group_by)
         
-        return "I can help you with your transactions. You can ask me how much you spent or to list your recent transactions."
+        card_names = {}
+        if group_by == GROUP_CARD:
+            for card in await self.extend_integration.get_virtual_cards():
+                card_names[card.get("id")] = "Card ending in {}".format(card.get("lastFour", "unknown"))
+        
+        for group in groups[:BREAKDOWN_LIMIT]:
+            label = group.label
+            if label is None:
+                label = UNKNOWN_GROUP_LABELS[group_by]
+            elif group_by == GROUP_CARD:
+                label = card_names.get(label, "Card {}".format(label))
+            elif group_by == GROUP_WEEK:
+                label = "The week of {}".format(label)
+            yield "{}: ${:.2f}.".format(label, group.total / 100)
+        
+        if len(groups) > BREAKDOWN_LIMIT:
+            yield "And {} more.".format(len(groups) - BREAKDOWN_LIMIT)
     
-    async def _handle_expense_category_command(self, command):
+    async def _handle_expense_category_command(self, command, route):
         """
         Handles commands related to expense categories
         """
+        answer = self._answer_expense_category_command(route)
+        async for sentence in self._remember(memo_key(INTENT_EXPENSE_CATEGORIES, route), ("expense_categories",), answer):
+            yield sentence
+    
+    async def _answer_expense_category_command(self, route):
         categories = await self.extend_integration.get_expense_categories()
         
-        if not categories:
-            return "You don't have any expense categories."
+        if categories and route.action != ACTION_LIST:
+            yield "I can help you with your expense categories. You can ask me to list your categories."
+            return
         
-        if "list" in command or "show" in command or "what" in command:
-            response = "You have {} expense categories: ".format(len(categories))
-            
-            for category in categories:
-                name = category.get("name", "Unknown")
-                response += "{}, ".format(name)
-            
-            return response[:-2] + "."  # Remove trailing comma and space
+        yield self.responses.format_expense_category_list(categories)
+    
+    async def _remember(self, key, endpoints, answer):
+        """
+        Yields a remembered answer when the same question was already answered
+        over unchanged data, otherwise streams the answer and remembers it
+        """
+        version = self.extend_integration.data_version(*endpoints)
+        sentences = self.memo.get(key, version)
+        if sentences is not None:
+            for sentence in sentences:
+                yield sentence
+            return
         
-        return "I can help you with your expense categories. You can ask me to list your categories."
+        sentences = []
+        async for sentence in answer:
+            sentences.append(sentence)
+            yield sentence
+        # Only complete answers are remembered; an interrupted stream never gets here
+        self.memo.set(key, version, sentences)
     
-    async def _handle_receipt_command(self, command):
+    async def _handle_receipt_command(self, command, route):
         """
         Handles commands related to receipts
         """
-        # This is a placeholder for receipt handling
-        # In a real implementation, this would involve file handling and UI interaction
-        return "I can help you upload receipts. In a real implementation, this would guide you through taking a photo and attaching it to a transaction."
+        if route.action == ACTION_MATCH:
+            job = self.extend_integration.automatch_jobs.request()
+            # The job may have been requested first by a bulk upload or another call
+            if job not in self._automatch_jobs:
+                self._automatch_jobs.add(job)
+                job.add_done_callback(self._on_automatch_done)
+            yield "I've started matching your receipts to transactions. I'll let you know when it's done."
+            return
+        
+        # Uploading needs file handling and UI interaction outside the voice channel
+        yield "I can help you upload receipts. In a real implementation, this would guide you through taking a photo and attaching it to a transaction."
+    
+    def _on_automatch_done(self, job):
+        """
+        Tells the user how an automatch job they started turned out
+        """
+        self._automatch_jobs.discard(job)
+        if job.succeeded():
+            message = "Your receipts have been matched to transactions."
+        elif job.done() and not job.cancelled():
+            message = "I couldn't finish matching your receipts. Please try again later."
+        else:
+            return
+        
+        if self.notify is not None:
+            self.notify(message)
+        else:
+            self.pending_notifications.append(message)
     
     def _extract_time_period(self, command):
         """
         Extracts time period from command
         """
-        today = datetime.now()
-        
-        if "today" in command:
-            return {
-                "start_date": today.strftime("%Y-%m-%d"),
-                "end_date": today.strftime("%Y-%m-%d"),
-                "description": "today"
-            }
-        
-        elif "yesterday" in command:
-            yesterday = today - timedelta(days=1)
-            return {
-                "start_date": yesterday.strftime("%Y-%m-%d"),
-                "end_date": yesterday.strftime("%Y-%m-%d"),
-                "description": "yesterday"
-            }
-        
-        elif "this week" in command:
-            start_of_week = today - timedelta(days=today.weekday())
-            return {
-                "start_date": start_of_week.strftime("%Y-%m-%d"),
-                "end_date": today.strftime("%Y-%m-%d"),
-                "description": "this week"
-            }
-        
-        elif "this month" in command:
-            start_of_month = today.replace(day=1)
-            return {
-                "start_date": start_of_month.strftime("%Y-%m-%d"),
-                "end_date": today.strftime("%Y-%m-%d"),
-                "description": "this month"
-            }
-        
-        elif "last month" in command:
-            if today.month == 1:
-                start_of_last_month = today.replace(year=today.year-1, month=12, day=1)
-            else:
-                start_of_last_month = today.replace(month=today.month-1, day=1)
-            
-            if today.month == 1:
-                end_of_last_month = today.replace(year=today.year-1, month=12, day=31)
-            else:
-                if today.month == 3:
-                    end_of_last_month = today.replace(month=today.month-1, day=28)
-                elif today.month in [5, 7, 10, 12]:
-                    end_of_last_month = today.replace(month=today.month-1, day=30)
-                else:
-                    end_of_last_month = today.replace(month=today.month-1, day=31)
-            
-            return {
-                "start_date": start_of_last_month.strftime("%Y-%m-%d"),
-                "end_date": end_of_last_month.strftime("%Y-%m-%d"),
-                "description": "last month"
-            }
-        
-        return None
+        return self.time_periods.parse(command)
     
-    def _extract_category(self, command):
+    async def _extract_category(self, command):
         """
-        Extracts category from command
+        Extracts category from command, matched against the live expense categories
         """
-        # This is a simple implementation
-        # In a real implementation, this would use NLP to extract categories
-        categories = ["travel", "food", "office", "entertainment", "utilities"]
+        index = await self.extend_integration.get_category_index()
+        category = index.resolve(command)
         
-        for category in categories:
-            if category in command:
-                return category
+        if category is None:
+            return None
         
-        return None 
\ No newline at end of file
+        return category.get("name")
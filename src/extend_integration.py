@@ -1,82 +1,542 @@
 import os
-from extend import ExtendClient
-from extend_ai_toolkit.openai.toolkit import ExtendOpenAIToolkit
-from extend_ai_toolkit.shared import Configuration, Scope, Product, Actions
+import asyncio
+import logging
+from datetime import date, timedelta
+from .automatch_jobs import AutomatchJobManager
+from .cache import TTLCache
+from .card_index import CardIndex, card_signature
+from .category_index import CategoryIndex, category_signature
+from .metrics import DEFAULT_METRICS, STAGE_FETCH
+from .receipt_uploads import BulkReceiptUploader, DEFAULT_UPLOAD_CONCURRENCY, open_receipt
+from .scheduler import RequestScheduler, background_lane
+from .single_flight import SingleFlight, request_key
+from .spending_rollups import SpendingRollups
+from .time_periods import DEFAULT_TIME_PERIOD_PARSER
+from .transaction_store import TransactionStore, date_key
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached response is considered fresh, per endpoint
+DEFAULT_CACHE_TTLS = {
+    "virtual_cards": 60,
+    "expense_categories": 6 * 60 * 60,
+    "transactions": 30,
+}
+
+# Transactions requested per page when walking a full result set
+TRANSACTIONS_PAGE_SIZE = 100
+
+# Transaction details kept in memory, most recently used first
+DETAIL_CACHE_SIZE = 1024
+
+# Seconds a pending transaction's detail is reused; settled ones never change
+PENDING_DETAIL_TTL = 15
+
+# Statuses after which a transaction no longer changes
+SETTLED_STATUSES = {"CLEARED", "SETTLED", "DECLINED", "REVERSED", "AUTH_REVERSAL"}
+
+# Detail requests in flight at once for a batch lookup
+DETAIL_FETCH_CONCURRENCY = 8
+
+# Days of history backfilled into the local transaction store on first sync
+STORE_SYNC_LOOKBACK_DAYS = 365
+
+# Transactions written to the local store per batch while syncing
+STORE_SYNC_BATCH_SIZE = 500
+
+# Extend webhook event prefixes and the cached endpoints they make stale
+EVENT_INVALIDATIONS = {
+    "virtualcard": ("virtual_cards",),
+    "transaction": ("virtual_cards", "transactions"),
+    "expensecategory": ("expense_categories",),
+}
 
 class ExtendIntegration:
-    def __init__(self):
+    def __init__(self, cache_ttls=None, cache_max_size=256, transaction_store_path=None, scheduler=None, metrics=None):
         self.api_key = os.getenv('EXTEND_API_KEY')
         self.api_secret = os.getenv('EXTEND_API_SECRET')
         
         if not self.api_key or not self.api_secret:
             raise ValueError("EXTEND_API_KEY and EXTEND_API_SECRET environment variables must be set")
         
-        # Initialize the Extend client
-        self.client = ExtendClient(
-            api_key=self.api_key,
-            api_secret=self.api_secret
-        )
+        # The Extend client and AI toolkit are built on first use
+        self._client = None
+        self._toolkit = None
+        
+        # Cache for slow-changing reference data
+        self.cache_ttls = dict(DEFAULT_CACHE_TTLS, **(cache_ttls or {}))
+        self.cache = TTLCache(max_size=cache_max_size)
+        self.detail_cache = TTLCache(max_size=DETAIL_CACHE_SIZE)
+        
+        # Lookup indexes over the cards and expense categories, rebuilt when they change
+        self._card_index = None
+        self._category_index = None
+        
+        # Identical reads issued while one is already in flight share its result
+        self.single_flight = SingleFlight()
+        
+        # Rate limiting, concurrency caps, priority lanes and retries for every API call
+        self.scheduler = scheduler or RequestScheduler()
+        
+        # Debounced automatch triggering and job completion tracking
+        self.automatch_jobs = AutomatchJobManager(self)
         
-        # Initialize the Extend AI Toolkit
-        self.toolkit = ExtendOpenAIToolkit.default_instance(
-            api_key=self.api_key,
-            api_secret=self.api_secret,
-            configuration=Configuration(
-                scope=[
-                    Scope(Product.VIRTUAL_CARDS, actions=Actions(read=True)),
-                    Scope(Product.CREDIT_CARDS, actions=Actions(read=True)),
-                    Scope(Product.TRANSACTIONS, actions=Actions(read=True, write=True)),
-                    Scope(Product.EXPENSE_CATEGORIES, actions=Actions(read=True, write=True)),
-                ]
+        # Optional local copy of transactions, synced incrementally
+        transaction_store_path = transaction_store_path or os.getenv('EXTEND_TRANSACTION_STORE')
+        self.store = TransactionStore(transaction_store_path) if transaction_store_path else None
+        
+        # Per-day spending totals over the store, loaded on first use and kept current by syncs
+        self.rollups = SpendingRollups() if self.store is not None else None
+        self._rollups_loaded = False
+        
+        # Bumped whenever an endpoint's data is known to have changed (events, syncs, invalidation)
+        self._data_versions = {}
+        self._data_generation = 0
+        
+        # Every API read is timed as a fetch span of the turn waiting on it
+        self.metrics = metrics or DEFAULT_METRICS
+    
+    @property
+    def client(self):
+        """
+        Extend API client, created on first use
+        """
+        if self._client is None:
+            from extend import ExtendClient
+            self._client = ExtendClient(
+                api_key=self.api_key,
+                api_secret=self.api_secret
             )
-        )
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    @property
+    def toolkit(self):
+        """
+        Extend AI Toolkit, created on first use
+        """
+        if self._toolkit is None:
+            from extend_ai_toolkit.openai.toolkit import ExtendOpenAIToolkit
+            from extend_ai_toolkit.shared import Configuration, Scope, Product, Actions
+            self._toolkit = ExtendOpenAIToolkit.default_instance(
+                api_key=self.api_key,
+                api_secret=self.api_secret,
+                configuration=Configuration(
+                    scope=[
+                        Scope(Product.VIRTUAL_CARDS, actions=Actions(read=True)),
+                        Scope(Product.CREDIT_CARDS, actions=Actions(read=True)),
+                        Scope(Product.TRANSACTIONS, actions=Actions(read=True, write=True)),
+                        Scope(Product.EXPENSE_CATEGORIES, actions=Actions(read=True, write=True)),
+                    ]
+                )
+            )
+        return self._toolkit
+    
+    @toolkit.setter
+    def toolkit(self, toolkit):
+        self._toolkit = toolkit
     
     async def get_virtual_cards(self):
         """
         Gets all virtual cards
         """
-        response = await self.client.virtual_cards.get_virtual_cards()
+        return await self.cache.get_or_load(
+            request_key("virtual_cards"), self._fetch_virtual_cards, self.cache_ttls["virtual_cards"]
+        )
+    
+    async def get_card_index(self):
+        """
+        Gets a CardIndex over the current virtual cards, rebuilt only when they change
+        """
+        cards = await self.get_virtual_cards()
+        index = self._card_index
+        if index is None or index.signature != card_signature(cards):
+            index = self._card_index = CardIndex(cards)
+        return index
+    
+    async def _fetch_virtual_cards(self):
+        response = await self._request(
+            "virtual_cards", self.client.virtual_cards.get_virtual_cards
+        )
         return response.get("virtualCards", [])
     
     async def get_transactions(self, filters=None):
         """
         Gets transactions with optional filters
         """
-        response = await self.client.transactions.get_transactions(filters=filters)
+        response = await self._request(
+            "transactions", lambda: self.client.transactions.get_transactions(filters=filters), filters
+        )
         return response.get("report", {}).get("transactions", [])
     
+    async def iter_transactions(self, filters=None, page_size=TRANSACTIONS_PAGE_SIZE):
+        """
+        Yields every transaction matching the filters.
+        
+        Queries covered by the local store are answered from it; everything
+        else walks the API pages.
+        """
+        if self.store is not None and self.store.can_answer(filters):
+            for transaction in self.store.query(filters):
+                yield transaction
+            return
+        
+        pages = self._iter_api_transactions(filters, page_size)
+        try:
+            async for transaction in pages:
+                yield transaction
+        finally:
+            await pages.aclose()
+    
+    async def count_transactions(self, filters=None, page_size=TRANSACTIONS_PAGE_SIZE):
+        """
+        Returns how many transactions match the filters, from the local store or
+        the first page when it is the only one, or None when the API cannot tell
+        """
+        if self.store is not None and self.store.can_answer(filters):
+            return self.store.summarize(filters)[1]
+        _, _, total = await self._fetch_transactions_page(filters, 1, page_size)
+        return total
+    
+    async def prefetch_transactions(self, filters, page_size=TRANSACTIONS_PAGE_SIZE):
+        """
+        Loads the first page of a transactions query into the cache, unless the local store covers it
+        """
+        if self.store is not None and self.store.can_answer(filters):
+            return
+        await self._fetch_transactions_page(filters, 1, page_size)
+    
+    async def _iter_api_transactions(self, filters, page_size=TRANSACTIONS_PAGE_SIZE, cached=True):
+        # The next page is requested while the current one is being consumed,
+        # so at most two pages are held in memory at any time
+        page = 1
+        pending = asyncio.ensure_future(self._fetch_transactions_page(filters, page, page_size, cached))
+        try:
+            while pending is not None:
+                transactions, has_more, _ = await pending
+                pending = None
+                if has_more:
+                    page += 1
+                    pending = asyncio.ensure_future(self._fetch_transactions_page(filters, page, page_size, cached))
+                for transaction in transactions:
+                    yield transaction
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    async def _fetch_transactions_page(self, filters, page, page_size, cached=True):
+        params = dict(filters or {}, page=page, perPage=page_size)
+        
+        async def fetch():
+            response = await self._request(
+                "transactions", lambda: self.client.transactions.get_transactions(filters=params), params
+            )
+            report = response.get("report", {})
+            transactions = report.get("transactions", [])
+            pagination = report.get("pagination", {})
+            number_of_pages = pagination.get("numberOfPages")
+            if number_of_pages is not None:
+                has_more = page < number_of_pages
+            else:
+                has_more = len(transactions) >= page_size
+            # totalItems is only pageItemCount + 1 while another page exists, so the
+            # whole range is counted only when it fits on the first page
+            total = len(transactions) if page == 1 and not has_more else None
+            return transactions, has_more, total
+        
+        # Only first pages are cached (what warm-up, speculation and counts need), so
+        # streaming a long range neither fills the cache nor evicts cards and categories
+        if not cached or page > 1:
+            return await fetch()
+        # First pages are only cached briefly and never served stale
+        return await self.cache.get_or_load(
+            request_key("transactions", params), fetch, self.cache_ttls["transactions"], max_stale=0
+        )
+    
+    async def sync_transactions(self, lookback_days=STORE_SYNC_LOOKBACK_DAYS):
+        """
+        Pulls new transactions into the local store and returns how many were written.
+        
+        The first sync backfills `lookback_days` of history; later syncs resume
+        from the high-water mark, re-reading that day to pick up late postings.
+        """
+        if self.store is None:
+            return 0
+        
+        today = date.today()
+        coverage = self.store.get_coverage()
+        if coverage is None:
+            synced_from = date_key(today - timedelta(days=lookback_days))
+            start_date = synced_from
+        else:
+            synced_from, start_date = coverage
+        
+        filters = {"startDate": start_date, "endDate": date_key(today)}
+        written = 0
+        batch = []
+        with background_lane():
+            async for transaction in self._iter_api_transactions(filters, cached=False):
+                batch.append(transaction)
+                if len(batch) >= STORE_SYNC_BATCH_SIZE:
+                    written += self._store_transactions(batch)
+                    batch = []
+        written += self._store_transactions(batch)
+        
+        self.store.set_coverage(synced_from, today)
+        return written
+    
+    def _store_transactions(self, transactions):
+        written = self.store.upsert(transactions)
+        self._bump_data_version("transactions")
+        if self._rollups_loaded:
+            self.rollups.apply(transactions)
+        return written
+    
+    def _load_rollups(self):
+        if not self._rollups_loaded:
+            self.rollups.apply(self.store.query())
+            self._rollups_loaded = True
+    
+    async def summarize_spending(self, filters):
+        """
+        Returns (total, count) for the filters from the spending rollups, or
+        None when the local store does not cover them
+        """
+        if self.store is None or not self.store.can_answer(filters):
+            return None
+        self._load_rollups()
+        return self.rollups.summarize(
+            filters["startDate"],
+            filters["endDate"],
+            category=filters.get("category"),
+            card_id=filters.get("virtualCardId")
+        )
+    
+    async def warm_up(self):
+        """
+        Prefetches the data a caller's first question is most likely to need.
+        
+        Virtual cards, expense categories (and their index) and the first page
+        of this month's transactions are loaded concurrently in the background lane, so
+        interactive requests still go first. Failures are logged rather than raised.
+        """
+        # Resolved by the same parser as voice commands, so the cache keys match
+        period = DEFAULT_TIME_PERIOD_PARSER.parse("this month")
+        this_month = {"startDate": period["start_date"], "endDate": period["end_date"]}
+        
+        with background_lane():
+            results = await asyncio.gather(
+                self.get_virtual_cards(),
+                self.get_category_index(),
+                self._warm_up_transactions(this_month),
+                return_exceptions=True
+            )
+        
+        for name, result in zip(("virtual cards", "expense categories", "transactions"), results):
+            if isinstance(result, Exception):
+                logger.warning("Warm-up of %s failed: %s", name, result)
+    
+    async def _warm_up_transactions(self, filters):
+        if self.store is not None:
+            await self.sync_transactions()
+            return
+        await self.prefetch_transactions(filters)
+    
     async def get_transaction_detail(self, transaction_id):
         """
         Gets detailed information about a specific transaction
         """
-        response = await self.client.transactions.get_transaction_detail(transaction_id)
+        response = self.detail_cache.get(transaction_id)
+        if response is None:
+            response = await self._request(
+                "transaction_detail",
+                lambda: self.client.transactions.get_transaction_detail(transaction_id=transaction_id),
+                transaction_id
+            )
+            self.detail_cache.set(transaction_id, response, self._detail_ttl(response))
         return response
     
+    async def get_transaction_details(self, transaction_ids, concurrency=DETAIL_FETCH_CONCURRENCY):
+        """
+        Gets details for many transactions, keyed by transaction id.
+        
+        Duplicate ids are fetched once, cached details are reused, and the
+        rest are fetched concurrently with at most `concurrency` in flight.
+        """
+        unique_ids = list(dict.fromkeys(transaction_ids))
+        details = {}
+        missing = []
+        for transaction_id in unique_ids:
+            detail = self.detail_cache.get(transaction_id)
+            if detail is None:
+                missing.append(transaction_id)
+            else:
+                details[transaction_id] = detail
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def fetch(transaction_id):
+            async with semaphore:
+                return await self.get_transaction_detail(transaction_id)
+        
+        fetched = await asyncio.gather(*(fetch(transaction_id) for transaction_id in missing))
+        details.update(zip(missing, fetched))
+        return {transaction_id: details[transaction_id] for transaction_id in unique_ids}
+    
+    def _detail_ttl(self, detail):
+        # Settled transactions are immutable; anything else may still change
+        status = str(detail.get("status", "")).upper() if isinstance(detail, dict) else ""
+        return None if status in SETTLED_STATUSES else PENDING_DETAIL_TTL
+    
     async def get_expense_categories(self):
         """
         Gets all expense categories
         """
-        response = await self.client.expense_management.get_expense_categories()
+        return await self.cache.get_or_load(
+            request_key("expense_categories"), self._fetch_expense_categories, self.cache_ttls["expense_categories"]
+        )
+    
+    async def get_category_index(self):
+        """
+        Gets a CategoryIndex over the current expense categories, rebuilt only when they change
+        """
+        categories = await self.get_expense_categories()
+        index = self._category_index
+        if index is None or index.signature != category_signature(categories):
+            index = self._category_index = CategoryIndex(categories)
+        return index
+    
+    async def _fetch_expense_categories(self):
+        response = await self._request(
+            "expense_categories", self.client.expense_management.get_expense_categories
+        )
         return response.get("expenseCategories", [])
     
     async def create_receipt_attachment(self, transaction_id, file_path):
         """
         Uploads a receipt and attaches it to a transaction
         """
-        with open(file_path, 'rb') as file:
-            response = await self.client.expense_management.create_receipt_attachment(
-                transaction_id=transaction_id,
-                file=file
-            )
+        async def upload():
+            with open(file_path, 'rb') as file:
+                return await self.client.expense_management.create_receipt_attachment(
+                    transaction_id=transaction_id,
+                    file=file
+                )
+        
+        response = await self.scheduler.submit("receipt_attachments", upload, idempotent=False)
         return response
     
+    async def upload_receipts(self, items, concurrency=DEFAULT_UPLOAD_CONCURRENCY, progress=None,
+                              checkpoint_path=None, automatch=True):
+        """
+        Uploads many receipts, given as (transaction_id, file_path) pairs.
+        
+        Files are streamed from a memory map rather than read into memory, and
+        at most `concurrency` uploads run at once. `progress(result, completed,
+        total)` is called as each item finishes. Passing a checkpoint path lets
+        a partially completed batch be resumed by running it again.
+        
+        With automatch enabled, a debounced automatch run is requested once the
+        batch has uploaded anything; it is available as `report.automatch_job`.
+        """
+        uploader = BulkReceiptUploader(
+            self._stream_receipt_attachment,
+            concurrency=concurrency,
+            checkpoint_path=checkpoint_path,
+            progress=progress
+        )
+        report = await uploader.run(items)
+        report.automatch_job = self.automatch_jobs.request() if automatch and report.uploaded else None
+        return report
+    
+    async def _stream_receipt_attachment(self, transaction_id, file_path):
+        async def upload():
+            with open_receipt(file_path) as stream:
+                return await self.client.expense_management.create_receipt_attachment(
+                    transaction_id=transaction_id,
+                    file=stream
+                )
+        
+        return await self.scheduler.submit("receipt_attachments", upload, idempotent=False)
+    
     async def automatch_receipts(self):
         """
         Initiates an async job to automatch uploaded receipts to transactions
         """
-        response = await self.client.expense_management.automatch_receipts()
+        response = await self.scheduler.submit(
+            "automatch_receipts", self.client.expense_management.automatch_receipts, idempotent=False
+        )
         return response
     
+    async def get_automatch_status(self, job_id):
+        """
+        Gets the status of an automatch job
+        """
+        response = await self._request(
+            "automatch_status",
+            lambda: self.client.expense_management.get_automatch_status(job_id),
+            job_id
+        )
+        return response
+    
+    async def _request(self, endpoint, call, params=None):
+        """
+        Issues a read against the Extend API through the scheduler, sharing identical in-flight calls
+        """
+        with self.metrics.span(STAGE_FETCH, endpoint):
+            return await self.single_flight.do(
+                request_key(endpoint, params), lambda: self.scheduler.submit(endpoint, call)
+            )
+    
+    def invalidate_cache(self, *endpoints):
+        """
+        Drops cached responses for the given endpoints, or everything if none are given
+        """
+        if not endpoints:
+            self.cache.clear()
+            self._data_generation += 1
+            return
+        endpoints = set(endpoints)
+        self.cache.invalidate_where(lambda key: key[0] in endpoints)
+        for endpoint in endpoints:
+            self._bump_data_version(endpoint)
+    
+    def data_version(self, *endpoints):
+        """
+        Returns a value that changes whenever data from the given endpoints is
+        known to have changed, for keying answers built from that data
+        """
+        version = (self._data_generation,) + tuple(self._data_versions.get(endpoint, 0) for endpoint in endpoints)
+        if "transactions" in endpoints and self.rollups is not None:
+            version += (self.rollups.version,)
+        return version
+    
+    def _bump_data_version(self, endpoint):
+        self._data_versions[endpoint] = self._data_versions.get(endpoint, 0) + 1
+    
+    def handle_event(self, event_type, data=None):
+        """
+        Invalidates cached responses affected by an Extend webhook event (e.g. "virtualcard.updated").
+        
+        A transaction event's payload is written to the local store and spending rollups.
+        """
+        prefix = event_type.split(".", 1)[0].replace("_", "").lower()
+        endpoints = EVENT_INVALIDATIONS.get(prefix, ())
+        if endpoints:
+            self.invalidate_cache(*endpoints)
+        if prefix == "transaction" and self.store is not None and data and data.get("id") is not None:
+            self._store_transactions([data])
+        return endpoints
+    
+    def get_cache_stats(self):
+        """
+        Gets hit/miss counters for the response cache
+        """
+        return self.cache.stats()
+    
     def get_tools(self):
         """
         Gets the tools from the Extend AI Toolkit
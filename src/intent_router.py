@@ -0,0 +1,231 @@
+import re
+
+INTENT_VIRTUAL_CARDS = "virtual_cards"
+INTENT_TRANSACTIONS = "transactions"
+INTENT_EXPENSE_CATEGORIES = "expense_categories"
+INTENT_RECEIPTS = "receipts"
+
+# Tie-break order between equally scored intents
+INTENT_ORDER = (INTENT_VIRTUAL_CARDS, INTENT_TRANSACTIONS, INTENT_EXPENSE_CATEGORIES, INTENT_RECEIPTS)
+
+ACTION_LIST = "list"
+ACTION_TOTAL = "total"
+ACTION_MATCH = "match"
+ACTION_UPLOAD = "upload"
+
+# When several action words appear, the earliest in this tuple wins
+ACTION_ORDER = (ACTION_MATCH, ACTION_UPLOAD, ACTION_TOTAL, ACTION_LIST)
+
+GROUP_BY_CATEGORY = "category"
+GROUP_BY_MERCHANT = "merchant"
+GROUP_BY_CARD = "card"
+GROUP_BY_WEEK = "week"
+
+# Keyword phrase -> (intent weights, slots). Longer phrases take precedence
+# over the words they contain, so "expense categories" scores as one strong
+# category signal rather than a weak "expense" plus "categories", and
+# "by category" asks for a breakdown rather than for the category list.
+KEYWORDS = {
+    "virtual card": ({INTENT_VIRTUAL_CARDS: 3}, {}),
+    "virtual cards": ({INTENT_VIRTUAL_CARDS: 3}, {}),
+    "card": ({INTENT_VIRTUAL_CARDS: 1}, {}),
+    "cards": ({INTENT_VIRTUAL_CARDS: 1}, {}),
+    "balance": ({INTENT_VIRTUAL_CARDS: 1}, {}),
+    "balances": ({INTENT_VIRTUAL_CARDS: 1}, {}),
+    "transaction": ({INTENT_TRANSACTIONS: 3}, {}),
+    "transactions": ({INTENT_TRANSACTIONS: 3}, {}),
+    "spent": ({INTENT_TRANSACTIONS: 3}, {}),
+    "spend": ({INTENT_TRANSACTIONS: 3}, {}),
+    "spending": ({INTENT_TRANSACTIONS: 3}, {}),
+    "purchases": ({INTENT_TRANSACTIONS: 2}, {}),
+    "charges": ({INTENT_TRANSACTIONS: 2}, {}),
+    "how much": ({INTENT_TRANSACTIONS: 1}, {"action": ACTION_TOTAL}),
+    "total": ({}, {"action": ACTION_TOTAL}),
+    "category": ({INTENT_EXPENSE_CATEGORIES: 2}, {}),
+    "categories": ({INTENT_EXPENSE_CATEGORIES: 2}, {}),
+    "expense category": ({INTENT_EXPENSE_CATEGORIES: 3}, {}),
+    "expense categories": ({INTENT_EXPENSE_CATEGORIES: 3}, {}),
+    "expense": ({INTENT_EXPENSE_CATEGORIES: 1}, {}),
+    "expenses": ({INTENT_EXPENSE_CATEGORIES: 1}, {}),
+    "receipt": ({INTENT_RECEIPTS: 3}, {}),
+    "receipts": ({INTENT_RECEIPTS: 3}, {}),
+    "upload": ({INTENT_RECEIPTS: 2}, {"action": ACTION_UPLOAD}),
+    "automatch": ({INTENT_RECEIPTS: 3}, {"action": ACTION_MATCH}),
+    "match": ({}, {"action": ACTION_MATCH}),
+    "list": ({}, {"action": ACTION_LIST}),
+    "show": ({}, {"action": ACTION_LIST}),
+    "what": ({}, {"action": ACTION_LIST}),
+    "tell me": ({}, {"action": ACTION_LIST}),
+    "by category": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_CATEGORY}),
+    "per category": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_CATEGORY}),
+    "by merchant": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_MERCHANT}),
+    "per merchant": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_MERCHANT}),
+    "by vendor": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_MERCHANT}),
+    "top merchants": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_MERCHANT}),
+    "by card": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_CARD}),
+    "per card": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_CARD}),
+    "by week": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_WEEK}),
+    "per week": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_WEEK}),
+    "each week": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_WEEK}),
+    "weekly": ({INTENT_TRANSACTIONS: 1}, {"group_by": GROUP_BY_WEEK}),
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Where a compound command may be split into separate requests
+_CONJUNCTION_PATTERN = re.compile(r"\s*(?:[,;]|\bas well as\b|\band also\b|\band\b|\balso\b|\bplus\b|\bthen\b)\s*")
+
+
+def _intent_rank(intent):
+    return INTENT_ORDER.index(intent) if intent in INTENT_ORDER else len(INTENT_ORDER)
+
+
+def _action_rank(action):
+    return ACTION_ORDER.index(action) if action in ACTION_ORDER else len(ACTION_ORDER)
+
+
+class Route:
+    """
+    Result of routing one utterance: the winning intent, every intent's score,
+    the extracted slots and the tokens the utterance was split into
+    """
+
+    __slots__ = ("intent", "scores", "slots", "tokens")
+
+    def __init__(self, intent, scores, slots, tokens):
+        self.intent = intent
+        self.scores = scores
+        self.slots = slots
+        self.tokens = tokens
+
+    @property
+    def action(self):
+        return self.slots.get("action")
+
+    @property
+    def group_by(self):
+        return self.slots.get("group_by")
+
+    def __repr__(self):
+        return "Route({!r}, scores={!r}, slots={!r})".format(self.intent, self.scores, self.slots)
+
+
+class IntentRouter:
+    """
+    Single-pass keyword router for voice commands.
+
+    The keyword table is compiled once into a word-level trie. Routing splits
+    the utterance into tokens and walks the trie from each position, taking
+    the longest phrase that matches, so the cost depends on the utterance
+    length rather than on how many keywords there are. Matches add weight to intents
+    and fill slots; the highest-scoring intent wins.
+    """
+
+    def __init__(self, keywords=KEYWORDS):
+        self._trie = {}
+        for phrase, (weights, slots) in keywords.items():
+            node = self._trie
+            for word in phrase.split():
+                node = node.setdefault(word, {})
+            # Stored as items so routing does not rebuild them per match
+            node[None] = (tuple(weights.items()), tuple(slots.items()))
+
+    def tokenize(self, command):
+        """
+        Splits an utterance into lowercase word tokens
+        """
+        return _TOKEN_PATTERN.findall(command.lower())
+
+    def match(self, tokens):
+        """
+        Returns (start, end, payload) for the longest keyword phrase at each position
+        """
+        trie = self._trie
+        matches = []
+        position = 0
+        count = len(tokens)
+        while position < count:
+            node = trie.get(tokens[position])
+            if node is None:
+                position += 1
+                continue
+            best = None
+            end = position + 1
+            while True:
+                payload = node.get(None)
+                if payload is not None:
+                    best = (position, end, payload)
+                if end >= count:
+                    break
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                end += 1
+            if best is None:
+                position += 1
+            else:
+                matches.append(best)
+                position = best[1]
+        return matches
+
+    def route(self, command):
+        """
+        Routes an utterance to a Route with scored intents and slots
+        """
+        tokens = self.tokenize(command)
+        scores = {}
+        slots = {}
+        for _, _, (weights, match_slots) in self.match(tokens):
+            for intent, weight in weights:
+                scores[intent] = scores.get(intent, 0) + weight
+            for name, value in match_slots:
+                current = slots.get(name)
+                # The first value of a slot wins, except that stronger actions override weaker ones
+                if current is None or (name == "action" and _action_rank(value) < _action_rank(current)):
+                    slots[name] = value
+
+        intent = None
+        if scores:
+            intent = max(scores, key=lambda name: (scores[name], -_intent_rank(name)))
+        return Route(intent, scores, slots, tokens)
+
+    def route_all(self, command):
+        """
+        Splits a compound command into clauses and routes each one.
+
+        Returns a list of (clause, Route) in utterance order. A piece without
+        an intent of its own stays attached to its neighbour, so "meals and
+        entertainment" is not split, and a clause without an action word
+        inherits the previous clause's action ("show my cards and transactions").
+        """
+        spans = []
+        start = 0
+        for match in _CONJUNCTION_PATTERN.finditer(command):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(command)))
+
+        parts = []
+        for start, end in spans:
+            if start >= end:
+                continue
+            route = self.route(command[start:end])
+            if parts and (route.intent is None or parts[-1][2].intent is None):
+                start = parts[-1][0]
+                route = self.route(command[start:end])
+                parts[-1] = (start, end, route)
+            else:
+                parts.append((start, end, route))
+
+        clauses = []
+        previous_action = None
+        for start, end, route in parts:
+            if route.action is None and previous_action is not None:
+                route.slots["action"] = previous_action
+            previous_action = route.action
+            clauses.append((command[start:end], route))
+        return clauses
+
+
+# Shared, precompiled router
+DEFAULT_ROUTER = IntentRouter()
@@ -1,6 +1,7 @@
 import os
 import asyncio
 import logging
+import signal
 from typing import Optional
 from dotenv import load_dotenv
 from .voice_handler import VoiceHandler
@@ -18,50 +19,170 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
+# Seconds shutdown waits for in-flight tool calls before cancelling them
+DRAIN_TIMEOUT = 10.0
+
+# Signals that ask the assistant to shut down gracefully
+SHUTDOWN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
 class ExtendVoice:
     """
     Main class for the Extend Voice Assistant.
     Coordinates the interaction between voice handling, Extend integration,
     command processing, and response generation.
+    
+    Use it as an async context manager, or call start() to run until the
+    call ends or the process is asked to stop (SIGINT/SIGTERM)::
+    
+        async with ExtendVoice() as voice:
+            await voice.wait_until_stopped()
     """
     
-    def __init__(self):
+    def __init__(self, drain_timeout: float = DRAIN_TIMEOUT, stop_on_call_end: Optional[bool] = None):
         """Initialize all components of the Extend Voice Assistant."""
         self.voice_handler = VoiceHandler()
         self.extend_integration = ExtendIntegration()
         self.command_processor = CommandProcessor(self.extend_integration)
         self.response_generator = ResponseGenerator()
+        self.drain_timeout = drain_timeout
+        self.stop_reason: Optional[str] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._warm_up: Optional[asyncio.Future] = None
+        self._signals = []
         
+        # Answers the assistant's tool calls from real data when Vapi is pointed at this process,
+        # with a separate conversation per call over the shared integration
+        self.tool_server = None
+        self.sessions = None
+        if os.getenv('VAPI_SERVER_URL'):
+            from .session_manager import SessionManager
+            from .tool_server import ToolServer
+            self.sessions = SessionManager(self.extend_integration)
+            self.tool_server = ToolServer(
+                self.sessions,
+                secret=os.getenv('VAPI_SERVER_SECRET'),
+                event_secret=os.getenv('EXTEND_WEBHOOK_SECRET'),
+                on_call_ended=self._on_call_ended
+            )
+        
+        # A single-call assistant exits when its call ends; while the tool server is
+        # serving other calls' sessions, one of them ending must not stop the process
+        if stop_on_call_end is None:
+            stop_on_call_end = self.sessions is None
+        self.stop_on_call_end = stop_on_call_end
+    
+    async def __aenter__(self) -> "ExtendVoice":
+        await self.open()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.close()
+    
     async def start(self) -> None:
         """
-        Start the voice assistant and begin processing voice commands.
+        Start the voice assistant and process voice commands until the call
+        ends or a shutdown signal arrives.
         
         Raises:
             Exception: If there's an error during initialization or execution.
         """
+        try:
+            async with self:
+                reason = await self.wait_until_stopped()
+                logger.info("Stopping voice assistant: %s", reason)
+        except Exception as e:
+            logger.error("Error occurred: %s", str(e), exc_info=True)
+            raise
+    
+    async def open(self) -> None:
+        """
+        Starts the tool server and the call, and begins warming caches.
+        """
+        self._stopped = asyncio.Event()
+        self.stop_reason = None
+        self._install_signal_handlers()
         try:
             # Generate welcome message
             welcome_message = self.response_generator.generate_welcome_message()
             
             logger.info("Starting voice assistant with welcome message: %s", welcome_message)
             
+            if self.tool_server is not None:
+                await self.tool_server.start(
+                    host=os.getenv('TOOL_SERVER_HOST', '127.0.0.1'),
+                    port=int(os.getenv('TOOL_SERVER_PORT', '8080'))
+                )
+            
             # Start a new call with the welcome message
             self.voice_handler.start_call(first_message=welcome_message)
             
             logger.info("Call started successfully! You can now interact with the assistant.")
             
-            # Keep the connection alive
-            while True:
-                await asyncio.sleep(1)
-                
-        except Exception as e:
-            logger.error("Error occurred: %s", str(e), exc_info=True)
+            # Prefetch likely data while the welcome message plays
+            self._warm_up = asyncio.ensure_future(self.extend_integration.warm_up())
+        except BaseException:
+            await self.close()
             raise
+    
+    async def wait_until_stopped(self) -> str:
+        """
+        Waits, without polling, until stop() is called and returns the reason
+        """
+        await self._stopped.wait()
+        return self.stop_reason
+    
+    def stop(self, reason: str = "stop requested") -> None:
+        """
+        Asks the assistant to shut down; the first reason given is kept
+        """
+        if self._stopped is not None and not self._stopped.is_set():
+            self.stop_reason = reason
+            self._stopped.set()
+    
+    async def close(self) -> None:
+        """
+        Shuts down gracefully: refuses new tool calls, lets pending ones finish
+        within drain_timeout, then ends the call and stops the tool server.
+        """
+        self.stop("closing")
+        self._remove_signal_handlers()
+        try:
+            if self.tool_server is not None:
+                await self.tool_server.drain(self.drain_timeout)
         finally:
+            # Don't leave a warm-up running past the end of the call
+            warm_up, self._warm_up = self._warm_up, None
+            if warm_up is not None and not warm_up.done():
+                warm_up.cancel()
+                await asyncio.gather(warm_up, return_exceptions=True)
+            
             # Ensure we stop the assistant when done
             self.voice_handler.stop_call()
+            if self.tool_server is not None:
+                await self.tool_server.stop()
+            if self.sessions is not None:
+                self.sessions.close_all()
             logger.info("Voice assistant stopped.")
+    
+    def _on_call_ended(self, call_id) -> None:
+        if self.stop_on_call_end:
+            self.stop("call {} ended".format(call_id))
+    
+    def _install_signal_handlers(self) -> None:
+        loop = asyncio.get_event_loop()
+        for sig in SHUTDOWN_SIGNALS:
+            try:
+                loop.add_signal_handler(sig, self.stop, "received {}".format(sig.name))
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Not supported on this platform or outside the main thread
+                continue
+            self._signals.append(sig)
+    
+    def _remove_signal_handlers(self) -> None:
+        loop = asyncio.get_event_loop()
+        while self._signals:
+            loop.remove_signal_handler(self._signals.pop())
 
 if __name__ == "__main__":
     extend_voice = ExtendVoice()
-    asyncio.run(extend_voice.start()) 
\ No newline at end of file
+    asyncio.run(extend_voice.start())
@@ -0,0 +1,313 @@
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds after which a turn is logged with its span breakdown
+SLOW_TURN_THRESHOLD = 1.0
+
+# Environment variables turning instrumentation off ("0") and overriding the slow-turn threshold
+METRICS_ENV = "EXTEND_VOICE_METRICS"
+SLOW_TURN_ENV = "EXTEND_VOICE_SLOW_TURN_SECONDS"
+
+# What a span measures: understanding the command, waiting on Extend,
+# combining the data, building sentences, and a handler end to end
+STAGE_PARSE = "parse"
+STAGE_FETCH = "fetch"
+STAGE_AGGREGATE = "aggregate"
+STAGE_FORMAT = "format"
+STAGE_HANDLE = "handle"
+
+TURN_METRIC = "extend_voice_turn_seconds"
+SPAN_METRIC = "extend_voice_span_seconds"
+SLOW_TURNS_METRIC = "extend_voice_slow_turns_total"
+
+# The turn being timed in the current task, if any; tasks started during a
+# turn (compound command branches, page prefetches) inherit it
+_current_turn = contextvars.ContextVar("extend_voice_turn", default=None)
+
+
+def _enabled_from_env():
+    return os.getenv(METRICS_ENV, "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _threshold_from_env():
+    try:
+        return float(os.getenv(SLOW_TURN_ENV, SLOW_TURN_THRESHOLD))
+    except ValueError:
+        return SLOW_TURN_THRESHOLD
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Counts of observed values per fixed bucket, plus their sum
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus one for values above the last bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q-th quantile (inf if above every bucket)
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def render(self, name, labels=()):
+        """
+        Returns the histogram's lines in Prometheus text format
+        """
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append("{}_bucket{} {}".format(name, _format_labels(labels, ("le", bound)), cumulative))
+        lines.append("{}_bucket{} {}".format(name, _format_labels(labels, ("le", "+Inf")), self.count))
+        lines.append("{}_sum{} {}".format(name, _format_labels(labels), _format_value(self.sum)))
+        lines.append("{}_count{} {}".format(name, _format_labels(labels), self.count))
+        return lines
+
+
+class Turn:
+    """
+    The spans recorded while answering one command
+    """
+
+    __slots__ = ("started", "intent", "spans")
+
+    def __init__(self, started):
+        self.started = started
+        self.intent = None
+        # (stage, name, seconds) in the order the spans finished
+        self.spans = []
+
+    def breakdown(self):
+        """
+        Returns the total seconds and span count per (stage, name), slowest first
+        """
+        totals = {}
+        for stage, name, seconds in self.spans:
+            total, count = totals.get((stage, name), (0.0, 0))
+            totals[stage, name] = (total + seconds, count + 1)
+        return sorted(totals.items(), key=lambda item: -item[1][0])
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "name", "started")
+
+    def __init__(self, metrics, stage, name):
+        self.metrics = metrics
+        self.stage = stage
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe_span(self.stage, self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _TurnScope:
+    __slots__ = ("metrics", "turn", "token")
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __enter__(self):
+        self.turn = Turn(time.perf_counter())
+        self.token = _current_turn.set(self.turn)
+        return self.turn
+
+    def __exit__(self, *exc_info):
+        try:
+            _current_turn.reset(self.token)
+        except ValueError:
+            # An abandoned stream is closed from another context (e.g. by the garbage collector)
+            pass
+        self.metrics.observe_turn(self.turn, time.perf_counter() - self.turn.started)
+        return False
+
+
+class _NoSpan:
+    """
+    Stands in for spans and turns while instrumentation is disabled
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Metrics:
+    """
+    In-process latency histograms for voice turns and the spans within them.
+
+    A turn is one command answered end to end; spans time its parse, fetch,
+    aggregate and format stages and each handler. Every span is observed in
+    a histogram labelled by stage and name, and also recorded on the current
+    turn, so a turn slower than the threshold is logged with its breakdown.
+    When disabled, span() and turn() return a shared no-op and record nothing.
+    """
+
+    def __init__(self, enabled=None, slow_turn_threshold=None, buckets=LATENCY_BUCKETS):
+        self.enabled = _enabled_from_env() if enabled is None else enabled
+        self.slow_turn_threshold = _threshold_from_env() if slow_turn_threshold is None else slow_turn_threshold
+        self.buckets = buckets
+        self._turns = {}
+        self._spans = {}
+        self.slow_turns = 0
+
+    def span(self, stage, name):
+        """
+        Returns a context manager timing one span of the current turn
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, stage, name)
+
+    def turn(self):
+        """
+        Returns a context manager timing one turn; spans inside it are attributed to it
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _TurnScope(self)
+
+    def tag_turn(self, intent):
+        """
+        Labels the current turn with the intent it was routed to
+        """
+        turn = _current_turn.get()
+        if turn is not None and turn.intent is None:
+            turn.intent = intent
+
+    def observe_span(self, stage, name, seconds):
+        histogram = self._spans.get((stage, name))
+        if histogram is None:
+            histogram = self._spans[stage, name] = Histogram(self.buckets)
+        histogram.observe(seconds)
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.spans.append((stage, name, seconds))
+
+    def observe_turn(self, turn, seconds):
+        intent = turn.intent or "unknown"
+        histogram = self._turns.get(intent)
+        if histogram is None:
+            histogram = self._turns[intent] = Histogram(self.buckets)
+        histogram.observe(seconds)
+        if seconds >= self.slow_turn_threshold:
+            self.slow_turns += 1
+            logger.warning("Slow %s turn took %.0f ms: %s", intent, seconds * 1e3, ", ".join(
+                "{} {} {:.1f} ms{}".format(stage, name, total * 1e3, " (x{})".format(count) if count > 1 else "")
+                for (stage, name), (total, count) in turn.breakdown()
+            ) or "no spans")
+
+    def turn_histogram(self, intent):
+        """
+        Returns the turn latency histogram for an intent, or None
+        """
+        return self._turns.get(intent)
+
+    def span_histogram(self, stage, name):
+        """
+        Returns the latency histogram for one kind of span, or None
+        """
+        return self._spans.get((stage, name))
+
+    def reset(self):
+        """
+        Forgets every observation
+        """
+        self._turns.clear()
+        self._spans.clear()
+        self.slow_turns = 0
+
+    def render(self, gauges=None):
+        """
+        Returns every histogram, the slow-turn counter and the given gauges
+        ({name: value}) in Prometheus text exposition format
+        """
+        lines = [
+            "# HELP {} Seconds taken to answer one voice command.".format(TURN_METRIC),
+            "# TYPE {} histogram".format(TURN_METRIC),
+        ]
+        for intent, histogram in sorted(self._turns.items()):
+            lines.extend(histogram.render(TURN_METRIC, (("intent", intent),)))
+        lines.append("# HELP {} Seconds spent in one stage of answering a voice command.".format(SPAN_METRIC))
+        lines.append("# TYPE {} histogram".format(SPAN_METRIC))
+        for (stage, name), histogram in sorted(self._spans.items()):
+            lines.extend(histogram.render(SPAN_METRIC, (("stage", stage), ("name", name))))
+        lines.append("# HELP {} Voice commands slower than the slow-turn threshold.".format(SLOW_TURNS_METRIC))
+        lines.append("# TYPE {} counter".format(SLOW_TURNS_METRIC))
+        lines.append("{} {}".format(SLOW_TURNS_METRIC, self.slow_turns))
+        for name, value in sorted((gauges or {}).items()):
+            lines.append("# TYPE {} gauge".format(name))
+            lines.append("{} {}".format(name, _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+def timed(stage):
+    """
+    Decorates a method of an object with a `metrics` attribute so every call is a span named after the method
+    """
+    def decorate(method):
+        name = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.metrics.enabled:
+                return method(self, *args, **kwargs)
+            with _Span(self.metrics, stage, name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Shared by every processor and integration unless one is given explicitly
+DEFAULT_METRICS = Metrics()
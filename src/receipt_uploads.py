@@ -0,0 +1,189 @@
+import asyncio
+import io
+import json
+import logging
+import mmap
+import os
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Receipts uploaded at the same time by a bulk upload
+DEFAULT_UPLOAD_CONCURRENCY = 4
+
+UPLOADED = "uploaded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class ReceiptStream(io.RawIOBase):
+    """
+    Read-only file object over a memory-mapped receipt.
+
+    Readers pull the file in whatever chunk size they ask for, straight from
+    the page cache, so a receipt is never copied into memory as a whole.
+    """
+
+    def __init__(self, mapped, name):
+        super().__init__()
+        self._view = memoryview(mapped)
+        self._position = 0
+        self.name = name
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self._view) - self._position)
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+@contextmanager
+def open_receipt(path):
+    """
+    Opens a receipt for streaming upload, memory-mapped when the file allows it
+    """
+    with open(path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped; the plain file object streams just as well
+            yield file
+            return
+        try:
+            with ReceiptStream(mapped, os.path.basename(path)) as stream:
+                yield stream
+        finally:
+            mapped.close()
+
+
+class UploadResult:
+    """
+    Outcome of one receipt in a bulk upload
+    """
+
+    def __init__(self, transaction_id, path, status, response=None, error=None):
+        self.transaction_id = transaction_id
+        self.path = path
+        self.status = status
+        self.response = response
+        self.error = error
+
+    def __repr__(self):
+        return "UploadResult({!r}, {!r}, {!r})".format(self.transaction_id, self.path, self.status)
+
+
+class BulkUploadReport:
+    """
+    Per-item results of a bulk upload, in completion order
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self.automatch_job = None
+
+    @property
+    def uploaded(self):
+        return [result for result in self.results if result.status == UPLOADED]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if result.status == FAILED]
+
+    @property
+    def skipped(self):
+        return [result for result in self.results if result.status == SKIPPED]
+
+
+class UploadCheckpoint:
+    """
+    Append-only record of receipts already uploaded, used to resume a batch
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = set()
+        if os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        self.completed.add((entry["transactionId"], entry["path"]))
+
+    def __contains__(self, item):
+        return item in self.completed
+
+    def mark_done(self, transaction_id, path):
+        self.completed.add((transaction_id, path))
+        with open(self.path, 'a') as file:
+            file.write(json.dumps({"transactionId": transaction_id, "path": path}) + "\n")
+
+
+class BulkReceiptUploader:
+    """
+    Uploads many (transaction_id, path) pairs with bounded parallelism.
+
+    Each finished item is reported to `progress(result, completed, total)`.
+    With a checkpoint file, items that were uploaded by an earlier run are
+    skipped, so a partially completed batch can simply be run again.
+    """
+
+    def __init__(self, upload, concurrency=DEFAULT_UPLOAD_CONCURRENCY, checkpoint_path=None, progress=None):
+        self.upload = upload
+        self.concurrency = concurrency
+        self.checkpoint = UploadCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.progress = progress
+
+    async def run(self, items):
+        """
+        Uploads every item and returns a BulkUploadReport
+        """
+        total = len(items) if hasattr(items, "__len__") else None
+        pending = iter(items)
+        results = []
+
+        async def worker():
+            for transaction_id, path in pending:
+                result = await self._upload_one(transaction_id, path)
+                results.append(result)
+                if self.progress is not None:
+                    self.progress(result, len(results), total)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return BulkUploadReport(results)
+
+    async def _upload_one(self, transaction_id, path):
+        if self.checkpoint is not None and (transaction_id, path) in self.checkpoint:
+            return UploadResult(transaction_id, path, SKIPPED)
+        try:
+            response = await self.upload(transaction_id, path)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Uploading receipt %s for %s failed: %s", path, transaction_id, e)
+            return UploadResult(transaction_id, path, FAILED, error=e)
+        if self.checkpoint is not None:
+            self.checkpoint.mark_done(transaction_id, path)
+        return UploadResult(transaction_id, path, UPLOADED, response=response)
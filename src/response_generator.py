@@ -1,6 +1,24 @@
+from .metrics import DEFAULT_METRICS, STAGE_FORMAT, timed
+
+NO_TRANSACTIONS_MESSAGE = "I couldn't find any transactions matching your criteria."
+
+
+async def _iterate(items):
+    """
+    Yields from an async iterable (e.g. streamed API pages) or a plain iterable
+    """
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
 class ResponseGenerator:
-    def __init__(self):
-        pass
+    def __init__(self, metrics=None):
+        # Formatting calls are timed as format spans of the current turn
+        self.metrics = metrics or DEFAULT_METRICS
     
     def generate_welcome_message(self):
         """
@@ -20,49 +38,111 @@ class ResponseGenerator:
         """
         return "I can help you with the following: 1) Check your virtual cards, 2) View your transactions, 3) List your expense categories, 4) Upload receipts. What would you like to do?"
     
+    @timed(STAGE_FORMAT)
     def format_transaction_summary(self, transactions, time_period=None, category=None):
         """
-        Formats a summary of transactions
+        Formats a summary of transactions (a list of dicts or a SpendingFrame)
         """
-        if not transactions:
-            return "I couldn't find any transactions matching your criteria."
+        if transactions is None or not len(transactions):
+            return NO_TRANSACTIONS_MESSAGE
         
-        total_spending = sum(transaction.get("amount", 0) for transaction in transactions)
-        total_spending_dollars = total_spending / 100  # Convert cents to dollars
+        if hasattr(transactions, "total"):
+            total_spending = transactions.total()
+        else:
+            total_spending = sum(transaction.get("amount", 0) for transaction in transactions)
         
-        response = f"You spent ${total_spending_dollars:.2f} "
+        return self.format_spending_total(total_spending, time_period, category)
+    
+    @timed(STAGE_FORMAT)
+    def format_spending_total(self, total_spending, time_period=None, category=None, group_by=None):
+        """
+        Formats one sentence stating a spending total given in cents
+        """
+        words = [f"You spent ${total_spending / 100:.2f}"]  # Convert cents to dollars
         
         if time_period:
-            response += f"{time_period} "
+            words.append(time_period)
         
         if category:
-            response += f"on {category} "
+            words.append(f"on {category}")
         
-        response += "."
+        if group_by:
+            words.append(f"by {group_by}")
         
-        return response
+        return " ".join(words) + "."
     
+    @timed(STAGE_FORMAT)
+    def format_transaction(self, transaction):
+        """
+        Formats one transaction as a sentence
+        """
+        amount = transaction.get("amount", 0) / 100  # Convert cents to dollars
+        description = transaction.get("description", "Unknown")
+        date = transaction.get("date", "Unknown")
+        return f"${amount:.2f} for {description} on {date}."
+    
+    @timed(STAGE_FORMAT)
     def format_transaction_list(self, transactions, limit=5):
         """
         Formats a list of transactions
         """
         if not transactions:
-            return "I couldn't find any transactions matching your criteria."
-        
-        response = "Here are your recent transactions: "
+            return NO_TRANSACTIONS_MESSAGE
         
-        for transaction in transactions[:limit]:
-            amount = transaction.get("amount", 0) / 100  # Convert cents to dollars
-            description = transaction.get("description", "Unknown")
-            date = transaction.get("date", "Unknown")
-            
-            response += f"${amount:.2f} for {description} on {date}. "
+        sentences = ["Here are your recent transactions:"]
+        sentences.extend(self.format_transaction(transaction) for transaction in transactions[:limit])
         
         if len(transactions) > limit:
-            response += f"And {len(transactions) - limit} more transactions. "
+            sentences.append(f"And {len(transactions) - limit} more transactions.")
+        
+        return " ".join(sentences)
+    
+    async def stream_transaction_list(self, transactions, limit=5, total=None):
+        """
+        Yields the transaction list a sentence at a time, starting with the first
+        transaction received; transactions may be an async iterable of pages' rows.
         
-        return response
+        Reading stops after `limit` transactions (and one more, to tell whether
+        there are others), closing an async stream so no further pages are
+        fetched. The rest are counted from `total` when it is known.
+        """
+        if total is None and hasattr(transactions, "__len__"):
+            total = len(transactions)
+        
+        count = 0
+        more = False
+        items = _iterate(transactions)
+        try:
+            async for transaction in items:
+                if count == limit:
+                    more = True
+                    break
+                if not count:
+                    yield "Here are your recent transactions:"
+                yield self.format_transaction(transaction)
+                count += 1
+        finally:
+            await items.aclose()
+            if hasattr(transactions, "aclose"):
+                await transactions.aclose()
+        
+        if not count:
+            yield NO_TRANSACTIONS_MESSAGE
+        elif total is not None and total > count:
+            yield f"And {total - count} more transactions."
+        elif more:
+            yield "There are more transactions."
+    
+    @timed(STAGE_FORMAT)
+    def format_virtual_card(self, card):
+        """
+        Formats one virtual card as a sentence
+        """
+        last_four = card.get("lastFour", "unknown")
+        balance = (card.get("balance") or 0) / 100  # Convert cents to dollars
+        return f"Card ending in {last_four} has a balance of ${balance:.2f}."
     
+    @timed(STAGE_FORMAT)
     def format_virtual_card_list(self, virtual_cards):
         """
         Formats a list of virtual cards
@@ -70,15 +150,23 @@ class ResponseGenerator:
         if not virtual_cards:
             return "You don't have any virtual cards."
         
-        response = f"You have {len(virtual_cards)} virtual cards. "
-        
-        for card in virtual_cards:
-            last_four = card.get("lastFour", "unknown")
-            balance = card.get("balance", 0) / 100  # Convert cents to dollars
-            response += f"Card ending in {last_four} has a balance of ${balance:.2f}. "
+        sentences = [f"You have {len(virtual_cards)} virtual cards."]
+        sentences.extend(self.format_virtual_card(card) for card in virtual_cards)
+        return " ".join(sentences)
+    
+    async def stream_virtual_card_list(self, virtual_cards):
+        """
+        Yields the virtual card list a sentence at a time
+        """
+        if not virtual_cards:
+            yield "You don't have any virtual cards."
+            return
         
-        return response
+        yield f"You have {len(virtual_cards)} virtual cards."
+        async for card in _iterate(virtual_cards):
+            yield self.format_virtual_card(card)
     
+    @timed(STAGE_FORMAT)
     def format_expense_category_list(self, categories):
         """
         Formats a list of expense categories
@@ -86,10 +174,5 @@ class ResponseGenerator:
         if not categories:
             return "You don't have any expense categories."
         
-        response = f"You have {len(categories)} expense categories: "
-        
-        for category in categories:
-            name = category.get("name", "Unknown")
-            response += f"{name}, "
-        
-        return response[:-2] + "."  # Remove trailing comma and space 
\ No newline at end of file
+        names = ", ".join(category.get("name", "Unknown") for category in categories)
+        return f"You have {len(categories)} expense categories: {names}."
@@ -0,0 +1,71 @@
+import time
+
+from .cache import TTLCache
+
+# Seconds a remembered answer is reused even when no data version changed,
+# which bounds how long a silent refresh of cached data can go unnoticed
+MEMO_TTL = 30.0
+
+# Answers remembered per processor, least recently used dropped first
+MEMO_MAX_SIZE = 128
+
+
+def memo_key(intent, route, *params):
+    """
+    Returns a memo key for an answer: the intent, the routed action and
+    group-by, and any resolved parameters (e.g. transaction filters)
+    """
+    return (intent, route.action, route.group_by) + tuple(
+        tuple(sorted(param.items())) if isinstance(param, dict) else param for param in params
+    )
+
+
+class ResponseMemo:
+    """
+    Remembers spoken answers by what was asked and the version of the data
+    they were built from.
+
+    Rephrasings that route to the same intent, slots and filters share a key,
+    so "how much did I spend today" and "how much have I spent today" are one
+    entry. The data version is part of the key: once an event or sync changes
+    the data, old answers are no longer found and simply age out.
+    """
+
+    def __init__(self, ttl=MEMO_TTL, max_size=MEMO_MAX_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self._answers = TTLCache(max_size=max_size, clock=clock)
+
+    def __len__(self):
+        return len(self._answers)
+
+    def get(self, key, version):
+        """
+        Returns the remembered sentences for key at this data version, or None
+        """
+        return self._answers.get((key, version))
+
+    def set(self, key, version, sentences):
+        """
+        Remembers the sentences answering key at this data version
+        """
+        self._answers.set((key, version), tuple(sentences), self.ttl)
+
+    def clear(self):
+        """
+        Forgets every answer
+        """
+        self._answers.clear()
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the share of lookups answered from the memo
+        """
+        hits = self._answers.hits
+        misses = self._answers.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "size": len(self._answers),
+            "evictions": self._answers.evictions,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        }
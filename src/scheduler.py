@@ -0,0 +1,327 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes; lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# HTTP statuses worth retrying for idempotent reads
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Per-endpoint concurrency caps; endpoints not listed use the scheduler default
+DEFAULT_ENDPOINT_LIMITS = {
+    "transactions": 4,
+    "transaction_detail": 8,
+    "receipt_attachments": 4,
+}
+
+# A lane number, or a SharedPriority for a request made on behalf of several callers
+_request_priority = contextvars.ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+
+class SharedPriority:
+    """
+    The lane of one request made on behalf of several callers.
+
+    It starts in the lane of the caller that issued the request and only
+    moves up: when a caller from a higher-priority lane joins, a request
+    still queued for a slot is moved ahead with it.
+    """
+
+    __slots__ = ("priority", "_queued")
+
+    def __init__(self, priority):
+        self.priority = priority
+        # (scheduler, queue entry) while the request waits for a slot
+        self._queued = None
+
+    def join(self, priority):
+        """
+        Raises the lane to the given priority if it is higher
+        """
+        if priority >= self.priority:
+            return
+        self.priority = priority
+        if self._queued is not None:
+            scheduler, entry = self._queued
+            scheduler._reprioritize(entry, priority)
+
+
+def current_priority():
+    """
+    Returns the priority lane requests made in the current context are admitted in
+    """
+    priority = _request_priority.get()
+    return priority.priority if isinstance(priority, SharedPriority) else priority
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    Runs the enclosed requests (and tasks created inside it) in the given
+    priority lane, or in a SharedPriority's lane as it is raised
+    """
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def background_lane():
+    """
+    Runs the enclosed requests in the background lane, behind interactive voice turns
+    """
+    return request_priority(PRIORITY_BACKGROUND)
+
+
+def status_code(error):
+    """
+    Extracts the HTTP status from an SDK or HTTP client exception, if it carries one
+    """
+    response = getattr(error, "response", None)
+    for source in (response, error):
+        for attribute in ("status_code", "status"):
+            value = getattr(source, attribute, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def retry_after_seconds(error):
+    """
+    Reads the Retry-After header (seconds or HTTP date) from an exception's response
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter that can be paused when the server asks us to back off
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    def try_acquire(self):
+        """
+        Takes a token and returns 0, or returns the seconds until one is available
+        """
+        now = self._clock()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds):
+        """
+        Stops handing out tokens for the given number of seconds
+        """
+        now = self._clock()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = max(now, self._paused_until)
+
+
+class RequestScheduler:
+    """
+    Admission control for Extend API calls.
+
+    Every call passes a per-endpoint concurrency cap, a global concurrency cap
+    that admits interactive requests ahead of background ones, and a token
+    bucket that pauses when the API answers 429 with Retry-After. Failed calls
+    are retried with jittered exponential backoff: throttled calls always,
+    other transient failures only when the call is idempotent.
+    """
+
+    def __init__(self, rate=20.0, burst=40, max_concurrency=16, endpoint_limits=None,
+                 default_endpoint_limit=4, background_share=0.5, max_retries=3,
+                 base_delay=0.2, max_delay=5.0,
+                 retryable_exceptions=(asyncio.TimeoutError, ConnectionError, OSError)):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.endpoint_limits = dict(DEFAULT_ENDPOINT_LIMITS, **(endpoint_limits or {}))
+        self.default_endpoint_limit = default_endpoint_limit
+        self.background_limit = max(1, int(max_concurrency * background_share))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_exceptions = retryable_exceptions
+
+        self._endpoint_semaphores = {}
+        self._queue = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._active_background = 0
+        self._dispatch_handle = None
+
+        self.submitted = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+    async def submit(self, endpoint, call, idempotent=True, priority=None):
+        """
+        Runs `call()` once admitted, retrying transient failures
+        """
+        if priority is None:
+            priority = _request_priority.get()
+        shared = priority if isinstance(priority, SharedPriority) else None
+        self.submitted += 1
+        attempt = 0
+        while True:
+            async with self._endpoint_semaphore(endpoint):
+                admitted = await self._acquire_slot(shared.priority if shared else priority, shared)
+                try:
+                    return await call()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, idempotent)
+                    if delay is None:
+                        self.failures += 1
+                        raise
+                    logger.info("Retrying %s in %.2fs after error: %s", endpoint, delay, e)
+                finally:
+                    self._release_slot(admitted)
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        """
+        Returns counters and current queue depth
+        """
+        return {
+            "submitted": self.submitted,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "active": self._active,
+            "queued": sum(1 for entry in self._queue if entry[2] is not None),
+        }
+
+    def _endpoint_semaphore(self, endpoint):
+        semaphore = self._endpoint_semaphores.get(endpoint)
+        if semaphore is None:
+            limit = self.endpoint_limits.get(endpoint, self.default_endpoint_limit)
+            semaphore = self._endpoint_semaphores[endpoint] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def _retry_delay(self, error, attempt, idempotent):
+        if attempt >= self.max_retries:
+            return None
+        status = status_code(error)
+        if status == 429:
+            self.throttled += 1
+            retry_after = retry_after_seconds(error)
+            if retry_after is not None:
+                # The bucket enforces the pause for every caller, not just this one
+                self.bucket.pause(retry_after)
+                return 0.0
+            return self._backoff(attempt)
+        if not idempotent:
+            return None
+        if status in RETRYABLE_STATUSES:
+            return self._backoff(attempt)
+        if status is None and isinstance(error, self.retryable_exceptions):
+            return self._backoff(attempt)
+        return None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def _acquire_slot(self, priority, shared=None):
+        # Returns the priority the slot was granted in, which a SharedPriority may have raised
+        waiter = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), waiter]
+        heapq.heappush(self._queue, entry)
+        if shared is not None:
+            shared._queued = (self, entry)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot(entry[0])
+            else:
+                entry[2] = None
+            raise
+        finally:
+            if shared is not None:
+                shared._queued = None
+        return entry[0]
+
+    def _reprioritize(self, entry, priority):
+        # Only entries still waiting can move; an admitted one keeps the lane it was counted in
+        if entry[2] is None or entry[2].done():
+            return
+        entry[0] = priority
+        heapq.heapify(self._queue)
+        self._dispatch()
+
+    def _release_slot(self, priority):
+        self._active -= 1
+        if priority != PRIORITY_INTERACTIVE:
+            self._active_background -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        # Hand out free slots to the highest-priority waiters while tokens last
+        while self._queue and self._active < self.max_concurrency:
+            priority, _, waiter = self._queue[0]
+            if waiter is None or waiter.done():
+                heapq.heappop(self._queue)
+                continue
+            if priority != PRIORITY_INTERACTIVE and self._active_background >= self.background_limit:
+                return
+            delay = self.bucket.try_acquire()
+            if delay > 0:
+                self._schedule_dispatch(delay)
+                return
+            heapq.heappop(self._queue)
+            self._active += 1
+            if priority != PRIORITY_INTERACTIVE:
+                self._active_background += 1
+            waiter.set_result(None)
+
+    def _schedule_dispatch(self, delay):
+        if self._dispatch_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+
+        def run():
+            self._dispatch_handle = None
+            self._dispatch()
+
+        self._dispatch_handle = loop.call_later(delay, run)
@@ -0,0 +1,152 @@
+import logging
+import time
+
+from .command_processor import CommandProcessor
+from .speculation import SpeculativeExecutor
+
+logger = logging.getLogger(__name__)
+
+# Calls served at once by one process; further calls are refused until one ends
+MAX_SESSIONS = 500
+
+# Seconds without a message after which a call is assumed to have ended
+SESSION_IDLE_TIMEOUT = 15 * 60
+
+# Seconds between sweeps for idle sessions
+REAP_INTERVAL = 60
+
+# Session id used when a message does not name its call
+DEFAULT_CALL_ID = "default"
+
+
+class SessionLimitError(RuntimeError):
+    """
+    Raised when a new call arrives while the process is already serving MAX_SESSIONS calls
+    """
+
+
+class CallSession:
+    """
+    Conversation state of one call: its own CommandProcessor (card paging
+    cursor, pending notifications, remembered answers) and speculative fetches
+    """
+
+    def __init__(self, call_id, processor, speculation, started_at):
+        self.call_id = call_id
+        self.processor = processor
+        self.speculation = speculation
+        self.started_at = started_at
+        self.last_active = started_at
+        self.turns = 0
+
+
+class SessionManager:
+    """
+    Runs many concurrent calls in one event loop.
+
+    Every call gets its own CommandProcessor and SpeculativeExecutor, while
+    all of them share one ExtendIntegration, so the Extend client, its
+    connections, the caches, single-flight and the request scheduler serve
+    every caller: two callers asking for the same data cost one API request.
+    """
+
+    def __init__(self, extend_integration, max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT,
+                 speculate=True, processor_factory=CommandProcessor, clock=time.monotonic):
+        self.extend_integration = extend_integration
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.speculate = speculate
+        self.processor_factory = processor_factory
+        self._clock = clock
+        self._sessions = {}
+        self._next_reap = clock() + REAP_INTERVAL
+        self.opened = 0
+        self.closed = 0
+        self.reaped = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, call_id):
+        return call_id in self._sessions
+
+    def get(self, call_id):
+        """
+        Returns the session for call_id, or None
+        """
+        return self._sessions.get(call_id)
+
+    def open(self, call_id=None):
+        """
+        Returns the session for call_id, starting one if this is the call's first message
+        """
+        call_id = call_id or DEFAULT_CALL_ID
+        now = self._clock()
+        session = self._sessions.get(call_id)
+        if session is None:
+            if now >= self._next_reap or len(self._sessions) >= self.max_sessions:
+                self.reap_idle()
+            if len(self._sessions) >= self.max_sessions:
+                self.rejected += 1
+                raise SessionLimitError("Already serving {} calls".format(len(self._sessions)))
+            processor = self.processor_factory(self.extend_integration)
+            speculation = SpeculativeExecutor(processor) if self.speculate else None
+            session = self._sessions[call_id] = CallSession(call_id, processor, speculation, now)
+            self.opened += 1
+        session.last_active = now
+        return session
+
+    async def process_command(self, call_id, command):
+        """
+        Answers a command within its call's conversation
+        """
+        session = self.open(call_id)
+        session.turns += 1
+        if session.speculation is not None:
+            return await session.speculation.on_final(command)
+        return await session.processor.process_command(command)
+
+    def close(self, call_id):
+        """
+        Ends a call's session, abandoning any speculative fetch; returns whether it existed
+        """
+        session = self._sessions.pop(call_id or DEFAULT_CALL_ID, None)
+        if session is None:
+            return False
+        if session.speculation is not None:
+            session.speculation.cancel()
+        self.closed += 1
+        return True
+
+    def close_all(self):
+        """
+        Ends every session, e.g. on shutdown
+        """
+        for call_id in list(self._sessions):
+            self.close(call_id)
+
+    def reap_idle(self):
+        """
+        Ends sessions that have been silent for longer than idle_timeout and returns how many
+        """
+        now = self._clock()
+        self._next_reap = now + REAP_INTERVAL
+        idle = [call_id for call_id, session in self._sessions.items() if now - session.last_active > self.idle_timeout]
+        for call_id in idle:
+            logger.info("Ending idle call session %s", call_id)
+            self.close(call_id)
+        self.reaped += len(idle)
+        return len(idle)
+
+    def stats(self):
+        """
+        Returns session counters
+        """
+        return {
+            "active": len(self._sessions),
+            "opened": self.opened,
+            "closed": self.closed,
+            "reaped": self.reaped,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,99 @@
+import asyncio
+
+from .scheduler import SharedPriority, current_priority, request_priority
+
+
+def request_key(endpoint, params=None):
+    """
+    Builds a hashable key for an API call from its endpoint and normalized parameters.
+
+    Parameters set to None are dropped and keys are sorted, so filters that
+    only differ in ordering or unset values map to the same key.
+    """
+    if not params:
+        return (endpoint, ())
+    if not isinstance(params, dict):
+        return (endpoint, (params,))
+    normalized = tuple(sorted(
+        (name, _freeze(value)) for name, value in params.items() if value is not None
+    ))
+    return (endpoint, normalized)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((name, _freeze(item)) for name, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class _Flight:
+    __slots__ = ("task", "priority", "waiters")
+
+    def __init__(self, task, priority):
+        self.task = task
+        self.priority = priority
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task.
+
+    Callers that arrive while a call is running await the same result instead
+    of issuing their own request. The shared task is only cancelled once every
+    caller waiting on it has been cancelled. Its requests run in the lane of
+    the highest-priority caller waiting on it, so an interactive turn joining
+    a background warm-up call does not wait behind other background work.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._flights)
+
+    async def do(self, key, func):
+        """
+        Runs `func()` for key, or joins the call already in flight for it
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            priority = SharedPriority(current_priority())
+            # The task copies the context here, so its requests read the shared lane
+            with request_priority(priority):
+                task = asyncio.ensure_future(func())
+            flight = _Flight(task, priority)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.started += 1
+        else:
+            flight.priority.join(current_priority())
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def stats(self):
+        """
+        Returns counters for started and coalesced calls
+        """
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+    def _forget(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
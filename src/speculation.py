@@ -0,0 +1,116 @@
+import asyncio
+import logging
+
+from .intent_router import INTENT_EXPENSE_CATEGORIES, INTENT_TRANSACTIONS, INTENT_VIRTUAL_CARDS
+from .single_flight import request_key
+
+logger = logging.getLogger(__name__)
+
+# Weakest intent score worth speculating on; one strong keyword ("spent", "transactions") scores 3
+MIN_SPECULATION_SCORE = 3
+
+
+class SpeculativeExecutor:
+    """
+    Starts the Extend fetches a command will need while the caller is still speaking.
+
+    Each partial transcript is routed like a finished command. When it points
+    clearly at an intent, the read its handler will make is started right
+    away, with the same filters and therefore the same cache and single-flight
+    keys. When the final transcript asks for the same data, the handler joins
+    the fetch already in flight (or finds it cached). Otherwise the
+    speculative fetch is cancelled and counted as wasted.
+    """
+
+    def __init__(self, processor, min_score=MIN_SPECULATION_SCORE):
+        self.processor = processor
+        self.integration = processor.extend_integration
+        self.min_score = min_score
+        self._current = None
+        self.started = 0
+        self.committed = 0
+        self.wasted = 0
+        self.cancelled = 0
+        self.unpredicted = 0
+
+    async def on_partial(self, transcript):
+        """
+        Starts (or switches) the speculative fetch for a partial transcript
+        """
+        plan = await self._plan(transcript)
+        if plan is None:
+            # A partial that no longer reads clearly keeps the current guess
+            return
+        key, fetch = plan
+        if self._current is not None and self._current[0] == key:
+            return
+        self._abandon()
+        task = asyncio.ensure_future(fetch())
+        task.add_done_callback(self._log_failure)
+        self._current = (key, task)
+        self.started += 1
+
+    async def on_final(self, transcript):
+        """
+        Commits or cancels the speculative fetch, then processes the final command
+        """
+        plan = await self._plan(transcript)
+        if self._current is not None and plan is not None and self._current[0] == plan[0]:
+            self.committed += 1
+            self._current = None
+        else:
+            self._abandon()
+            if plan is not None:
+                self.unpredicted += 1
+        return await self.processor.process_command(transcript)
+
+    def cancel(self):
+        """
+        Abandons any speculative fetch, e.g. when the call ends mid-sentence
+        """
+        self._abandon()
+
+    def stats(self):
+        """
+        Returns speculation counters and the share of speculations that were used
+        """
+        return {
+            "started": self.started,
+            "committed": self.committed,
+            "wasted": self.wasted,
+            "cancelled": self.cancelled,
+            "unpredicted": self.unpredicted,
+            "hit_rate": self.committed / self.started if self.started else 0.0,
+        }
+
+    async def _plan(self, transcript):
+        command = transcript.lower()
+        route = self.processor.router.route(command)
+        if route.intent is None or route.scores[route.intent] < self.min_score:
+            return None
+
+        if route.intent == INTENT_VIRTUAL_CARDS:
+            return ("virtual_cards",), self.integration.get_virtual_cards
+        if route.intent == INTENT_EXPENSE_CATEGORIES:
+            return ("expense_categories",), self.integration.get_expense_categories
+        if route.intent == INTENT_TRANSACTIONS:
+            filters, time_period, _ = await self.processor.build_transaction_filters(command)
+            if time_period is None:
+                # Unbounded transaction queries are too expensive to guess at
+                return None
+            return request_key("transactions", filters), lambda: self.integration.prefetch_transactions(filters)
+        return None
+
+    def _abandon(self):
+        current, self._current = self._current, None
+        if current is None:
+            return
+        self.wasted += 1
+        if not current[1].done():
+            # Single-flight only cancels the request if nobody else is waiting on it
+            current[1].cancel()
+            self.cancelled += 1
+
+    def _log_failure(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.info("Speculative fetch failed: %s", task.exception())
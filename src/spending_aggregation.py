@@ -0,0 +1,244 @@
+import numpy as np
+
+from .spending_rollups import counts_toward_spending
+from .transaction_store import date_key
+
+GROUP_CATEGORY = "category"
+GROUP_MERCHANT = "merchant"
+GROUP_CARD = "card"
+GROUP_WEEK = "week"
+
+GROUP_KEYS = (GROUP_CATEGORY, GROUP_MERCHANT, GROUP_CARD, GROUP_WEEK)
+
+# Dictionary-encoded attributes and the transaction fields they are read from
+ENCODED_FIELDS = {
+    GROUP_CATEGORY: ("category",),
+    GROUP_MERCHANT: ("merchantName", "merchant"),
+    GROUP_CARD: ("virtualCardId",),
+}
+
+# Rows buffered by append() before they are encoded as one page
+BUILDER_PAGE_SIZE = 1024
+
+# 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+_EPOCH_WEEKDAY = 3
+
+
+class SpendingGroup:
+    """
+    Total and count of the transactions sharing one group-by label
+    """
+
+    __slots__ = ("label", "total", "count")
+
+    def __init__(self, label, total, count):
+        self.label = label
+        self.total = total
+        self.count = count
+
+    def __eq__(self, other):
+        return isinstance(other, SpendingGroup) and (self.label, self.total, self.count) == (other.label, other.total, other.count)
+
+    def __repr__(self):
+        return "SpendingGroup({!r}, {!r}, {!r})".format(self.label, self.total, self.count)
+
+
+def _date_string(value):
+    return date_key(value) or "NaT"
+
+
+class SpendingFrameBuilder:
+    """
+    Accumulates transactions, page by page, into the columns of a SpendingFrame.
+
+    Only the amount, date and encoded attribute codes of each transaction are
+    kept, so a long stream of pages does not hold on to the original dicts.
+    Transactions that do not count toward spending (e.g. reversed) are skipped.
+    """
+
+    def __init__(self):
+        self._amounts = []
+        self._dates = []
+        self._pending = []
+        # value -> code per encoded attribute; insertion order doubles as the label table
+        self._dictionaries = {key: {} for key in ENCODED_FIELDS}
+        self._codes = {key: [] for key in ENCODED_FIELDS}
+
+    def __len__(self):
+        return len(self._amounts) + len(self._pending)
+
+    def append(self, transaction):
+        """
+        Adds one transaction; rows are buffered and encoded a page at a time
+        """
+        if not counts_toward_spending(transaction):
+            return
+        self._pending.append(transaction)
+        if len(self._pending) >= BUILDER_PAGE_SIZE:
+            self._flush()
+
+    def extend(self, transactions):
+        """
+        Adds every transaction in an iterable (e.g. one API page)
+        """
+        self._flush()
+        self._encode([transaction for transaction in transactions if counts_toward_spending(transaction)])
+
+    def _flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._encode(pending)
+
+    def _encode(self, transactions):
+        page = transactions if isinstance(transactions, list) else list(transactions)
+        # One comprehension per column is several times faster than appending row by row
+        self._amounts.extend([transaction.get("amount") or 0 for transaction in page])
+        self._dates.extend([
+            day[:10] if type(day) is str else _date_string(day)
+            for day in [transaction.get("date") for transaction in page]
+        ])
+        categories = self._dictionaries[GROUP_CATEGORY]
+        self._codes[GROUP_CATEGORY].extend([
+            categories.setdefault(value, len(categories))
+            for value in [transaction.get("category") for transaction in page]
+        ])
+        merchants = self._dictionaries[GROUP_MERCHANT]
+        self._codes[GROUP_MERCHANT].extend([
+            merchants.setdefault(value, len(merchants))
+            for value in [transaction.get("merchantName") or transaction.get("merchant") for transaction in page]
+        ])
+        cards = self._dictionaries[GROUP_CARD]
+        self._codes[GROUP_CARD].extend([
+            cards.setdefault(value, len(cards))
+            for value in [transaction.get("virtualCardId") for transaction in page]
+        ])
+
+    def build(self):
+        """
+        Returns a SpendingFrame over everything added so far
+        """
+        self._flush()
+        return SpendingFrame(
+            np.array(self._amounts, dtype=np.int64),
+            np.array(self._dates, dtype="datetime64[D]"),
+            {key: np.array(codes, dtype=np.int32) for key, codes in self._codes.items()},
+            {key: list(dictionary) for key, dictionary in self._dictionaries.items()},
+        )
+
+
+class SpendingFrame:
+    """
+    Columnar, NumPy-backed table of transactions for spending questions.
+
+    Amounts are int64 cents and dates are datetime64 days. Categories,
+    merchants and cards are dictionary-encoded: each column stores small
+    integer codes into a table of distinct labels, so group-bys reduce to a
+    `bincount` over the codes instead of a Python loop over dicts.
+    """
+
+    def __init__(self, amounts, dates, codes, labels):
+        self.amounts = amounts
+        self.dates = dates
+        self.codes = codes
+        self.labels = labels
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """
+        Builds a frame from an iterable of transaction dicts
+        """
+        builder = SpendingFrameBuilder()
+        builder.extend(transactions)
+        return builder.build()
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def total(self):
+        """
+        Returns the summed amount in cents
+        """
+        return int(self.amounts.sum())
+
+    def count(self):
+        """
+        Returns the number of transactions
+        """
+        return len(self.amounts)
+
+    def filter(self, mask):
+        """
+        Returns a frame with only the rows where the boolean mask is true
+        """
+        return SpendingFrame(
+            self.amounts[mask],
+            self.dates[mask],
+            {key: codes[mask] for key, codes in self.codes.items()},
+            self.labels,
+        )
+
+    def between(self, start_date=None, end_date=None):
+        """
+        Returns the rows dated within [start_date, end_date] (YYYY-MM-DD, inclusive)
+        """
+        mask = np.ones(len(self.amounts), dtype=bool)
+        if start_date:
+            mask &= self.dates >= np.datetime64(start_date, "D")
+        if end_date:
+            mask &= self.dates <= np.datetime64(end_date, "D")
+        return self.filter(mask)
+
+    def group_by(self, key):
+        """
+        Returns a SpendingGroup per label of the given key, largest total first
+        """
+        codes, labels = self._group_codes(key)
+        totals, counts = self._reduce(codes, len(labels))
+        order = np.argsort(-totals, kind="stable")
+        return [
+            SpendingGroup(labels[code], int(totals[code]), int(counts[code]))
+            for code in order if counts[code]
+        ]
+
+    def top_k(self, key, k):
+        """
+        Returns the k groups of the given key with the largest totals
+        """
+        codes, labels = self._group_codes(key)
+        totals, counts = self._reduce(codes, len(labels))
+        present = np.flatnonzero(counts)
+        if k < len(present):
+            # Partition first so only the k winners are sorted
+            present = present[np.argpartition(-totals[present], k - 1)[:k]]
+        order = present[np.argsort(-totals[present], kind="stable")]
+        return [SpendingGroup(labels[code], int(totals[code]), int(counts[code])) for code in order]
+
+    def largest(self, k):
+        """
+        Returns the positions of the k largest transactions, largest first
+        """
+        if k >= len(self.amounts):
+            return np.argsort(-self.amounts, kind="stable")
+        top = np.argpartition(-self.amounts, k - 1)[:k]
+        return top[np.argsort(-self.amounts[top], kind="stable")]
+
+    def _group_codes(self, key):
+        if key == GROUP_WEEK:
+            days = self.dates.astype(np.int64)
+            valid = ~np.isnat(self.dates)
+            week_starts = days - (days + _EPOCH_WEEKDAY) % 7
+            starts, codes = np.unique(np.where(valid, week_starts, np.iinfo(np.int64).max), return_inverse=True)
+            labels = [
+                str(np.datetime64(int(start), "D")) if start != np.iinfo(np.int64).max else None
+                for start in starts
+            ]
+            return codes.reshape(-1), labels
+        if key not in self.codes:
+            raise ValueError("Unknown group-by key: {}".format(key))
+        return self.codes[key], self.labels[key]
+
+    def _reduce(self, codes, size):
+        counts = np.bincount(codes, minlength=size)
+        # float64 sums are exact for totals below 2**53 cents
+        totals = np.rint(np.bincount(codes, weights=self.amounts, minlength=size)).astype(np.int64)
+        return totals, counts
@@ -0,0 +1,123 @@
+import bisect
+
+from .transaction_store import date_key
+
+# Transactions in these states no longer count toward spending
+EXCLUDED_STATUSES = {"reversed", "declined", "void", "voided", "canceled", "cancelled", "failed"}
+
+
+def counts_toward_spending(transaction):
+    """
+    Checks whether a transaction adds to spending totals, whichever path computes them
+    """
+    return (transaction.get("status") or "").lower() not in EXCLUDED_STATUSES
+
+
+class SpendingRollups:
+    """
+    Materialized spending totals and counts per day x category x card.
+
+    Every transaction's contribution is remembered by id, so applying a newer
+    version of a transaction (a changed amount, a reversal) first takes the
+    old contribution back out. Range questions then add up one row per day
+    (and per category/card cell when filtered) instead of scanning transactions.
+    """
+
+    def __init__(self):
+        self._cells = {}
+        self._day_totals = {}
+        self._days = []
+        self._contributions = {}
+        # Bumped on every change, so callers can tell when cached answers are stale
+        self.version = 0
+
+    def __len__(self):
+        return len(self._contributions)
+
+    def apply(self, transactions):
+        """
+        Adds new transactions and corrects the contributions of ones seen before
+        """
+        for transaction in transactions:
+            transaction_id = transaction.get("id")
+            if transaction_id is None:
+                continue
+            contribution = self._contribution(transaction)
+            previous = self._contributions.get(transaction_id)
+            if previous == contribution:
+                continue
+            if previous is not None:
+                self._add(previous, -1)
+                del self._contributions[transaction_id]
+            if contribution is not None:
+                self._add(contribution, 1)
+                self._contributions[transaction_id] = contribution
+            self.version += 1
+
+    def remove(self, transaction_ids):
+        """
+        Takes transactions out of the rollups entirely
+        """
+        for transaction_id in transaction_ids:
+            previous = self._contributions.pop(transaction_id, None)
+            if previous is not None:
+                self._add(previous, -1)
+                self.version += 1
+
+    def summarize(self, start_date, end_date, category=None, card_id=None):
+        """
+        Returns (total amount, count) for the inclusive date range, optionally
+        limited to one category and/or card
+        """
+        first = bisect.bisect_left(self._days, date_key(start_date))
+        last = bisect.bisect_right(self._days, date_key(end_date))
+        category = category.lower() if category else None
+        total = 0
+        count = 0
+        for day in self._days[first:last]:
+            if category is None and card_id is None:
+                day_total, day_count = self._day_totals[day]
+                total += day_total
+                count += day_count
+                continue
+            for (cell_category, cell_card), (cell_total, cell_count) in self._cells[day].items():
+                if category is not None and cell_category != category:
+                    continue
+                if card_id is not None and cell_card != card_id:
+                    continue
+                total += cell_total
+                count += cell_count
+        return total, count
+
+    def _contribution(self, transaction):
+        if not counts_toward_spending(transaction):
+            return None
+        day = date_key(transaction.get("date"))
+        if not day:
+            return None
+        category = (transaction.get("category") or "").lower() or None
+        return day, category, transaction.get("virtualCardId"), transaction.get("amount") or 0
+
+    def _add(self, contribution, sign):
+        day, category, card_id, amount = contribution
+        cells = self._cells.get(day)
+        if cells is None:
+            cells = self._cells[day] = {}
+            self._day_totals[day] = [0, 0]
+            bisect.insort(self._days, day)
+
+        cell = cells.get((category, card_id))
+        if cell is None:
+            cell = cells[(category, card_id)] = [0, 0]
+        cell[0] += sign * amount
+        cell[1] += sign
+        if not cell[1]:
+            del cells[(category, card_id)]
+
+        day_total = self._day_totals[day]
+        day_total[0] += sign * amount
+        day_total[1] += sign
+        if not day_total[1]:
+            del self._cells[day]
+            del self._day_totals[day]
+            del self._days[bisect.bisect_left(self._days, day)]
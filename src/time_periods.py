@@ -0,0 +1,227 @@
+import calendar
+import re
+from datetime import date, timedelta
+
+MONTH_NAMES = (
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+)
+
+QUARTER_WORDS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "twenty": 20, "thirty": 30, "sixty": 60, "ninety": 90,
+}
+
+# Month names that are also common words only count with a preposition or a year
+AMBIGUOUS_MONTHS = {"may"}
+
+# Distinct ranges remembered per day; the rule table keeps this small in practice
+MAX_CACHED_RANGES = 512
+
+_NUMBER = r"(\d+|{})".format("|".join(NUMBER_WORDS))
+
+# (rule, pattern) in priority order: when two rules match at the same position
+# the earlier one wins, so longer phrases come before the phrases they contain
+PERIOD_RULES = (
+    ("last_days", r"(?:last|past)\s+" + _NUMBER + r"\s+days?"),
+    ("today", r"today"),
+    ("yesterday", r"yesterday"),
+    ("this_week", r"this\s+week"),
+    ("last_week", r"last\s+week"),
+    ("this_month", r"this\s+month"),
+    ("last_month", r"last\s+month"),
+    ("this_quarter", r"this\s+quarter"),
+    ("last_quarter", r"last\s+quarter"),
+    ("quarter", r"(?:q([1-4])|(first|second|third|fourth)\s+quarter)(?:\s+(?:of\s+)?(\d{4}))?"),
+    ("year_to_date", r"year\s+to\s+date|ytd|this\s+year"),
+    ("last_year", r"last\s+year"),
+    ("month", r"(?:(in|for|during|since|from|of|last)\s+)?(" + "|".join(MONTH_NAMES) + r")(?:\s+(\d{4}))?"),
+)
+
+_MISSING = object()
+
+
+def month_end(year, month):
+    """
+    Returns the last day of the given month
+    """
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _period(start, end, description):
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "description": description,
+    }
+
+
+def _resolve_last_days(today, groups):
+    value = groups[0]
+    days = int(value) if value.isdigit() else NUMBER_WORDS[value]
+    # More days than there are since date.min cannot be a date range
+    if days < 1 or days > (today - date.min).days + 1:
+        return None
+    return _period(today - timedelta(days=days - 1), today, "in the last {} days".format(days))
+
+
+def _resolve_today(today, groups):
+    return _period(today, today, "today")
+
+
+def _resolve_yesterday(today, groups):
+    yesterday = today - timedelta(days=1)
+    return _period(yesterday, yesterday, "yesterday")
+
+
+def _resolve_this_week(today, groups):
+    return _period(today - timedelta(days=today.weekday()), today, "this week")
+
+
+def _resolve_last_week(today, groups):
+    end = today - timedelta(days=today.weekday() + 1)
+    return _period(end - timedelta(days=6), end, "last week")
+
+
+def _resolve_this_month(today, groups):
+    return _period(today.replace(day=1), today, "this month")
+
+
+def _resolve_last_month(today, groups):
+    end = today.replace(day=1) - timedelta(days=1)
+    return _period(end.replace(day=1), end, "last month")
+
+
+def _quarter_range(year, quarter):
+    first_month = 3 * (quarter - 1) + 1
+    return date(year, first_month, 1), month_end(year, first_month + 2)
+
+
+def _resolve_this_quarter(today, groups):
+    start, _ = _quarter_range(today.year, (today.month - 1) // 3 + 1)
+    return _period(start, today, "this quarter")
+
+
+def _resolve_last_quarter(today, groups):
+    quarter = (today.month - 1) // 3
+    year = today.year
+    if quarter == 0:
+        quarter, year = 4, year - 1
+    start, end = _quarter_range(year, quarter)
+    return _period(start, end, "last quarter")
+
+
+def _resolve_quarter(today, groups):
+    number, word, year = groups
+    quarter = int(number) if number else QUARTER_WORDS[word]
+    if year:
+        year = int(year)
+        if year < date.min.year:
+            return None
+    else:
+        # Without a year, mean the most recent quarter that has started
+        year = today.year
+        if _quarter_range(year, quarter)[0] > today:
+            year -= 1
+    start, end = _quarter_range(year, quarter)
+    if start > today:
+        return None
+    description = "in Q{}".format(quarter) if year == today.year else "in Q{} {}".format(quarter, year)
+    return _period(start, min(end, today), description)
+
+
+def _resolve_year_to_date(today, groups):
+    return _period(today.replace(month=1, day=1), today, "this year")
+
+
+def _resolve_last_year(today, groups):
+    year = today.year - 1
+    return _period(date(year, 1, 1), date(year, 12, 31), "last year")
+
+
+def _resolve_month(today, groups):
+    prefix, name, year = groups
+    if name in AMBIGUOUS_MONTHS and not prefix and not year:
+        return None
+    month = MONTH_NAMES.index(name) + 1
+    if year:
+        year = int(year)
+        if year < date.min.year:
+            return None
+    else:
+        # Without a year, mean the most recent such month ("last" skips the current one)
+        year = today.year
+        if month > today.month or (prefix == "last" and month == today.month):
+            year -= 1
+    start = date(year, month, 1)
+    if start > today:
+        return None
+    label = name.capitalize() if year == today.year else "{} {}".format(name.capitalize(), year)
+    if prefix in ("since", "from"):
+        return _period(start, today, "since {}".format(label))
+    return _period(start, min(month_end(year, month), today), "in {}".format(label))
+
+
+_RESOLVERS = {
+    "last_days": _resolve_last_days,
+    "today": _resolve_today,
+    "yesterday": _resolve_yesterday,
+    "this_week": _resolve_this_week,
+    "last_week": _resolve_last_week,
+    "this_month": _resolve_this_month,
+    "last_month": _resolve_last_month,
+    "this_quarter": _resolve_this_quarter,
+    "last_quarter": _resolve_last_quarter,
+    "quarter": _resolve_quarter,
+    "year_to_date": _resolve_year_to_date,
+    "last_year": _resolve_last_year,
+    "month": _resolve_month,
+}
+
+
+class TimePeriodParser:
+    """
+    Table-driven parser for spoken time periods ("last month", "Q3", "past 30 days").
+
+    The rule table is compiled once into a single regular expression, so an
+    utterance is scanned in one pass. Resolved date ranges only depend on the
+    matched phrase and the current day, so they are cached until the date changes.
+    """
+
+    def __init__(self, clock=date.today):
+        self._clock = clock
+        self._rules = {name: re.compile(pattern) for name, pattern in PERIOD_RULES}
+        self._pattern = re.compile("|".join(
+            r"(?P<{}>\b(?:{})\b)".format(name, pattern) for name, pattern in PERIOD_RULES
+        ))
+        self._day = None
+        self._ranges = {}
+
+    def parse(self, command, today=None):
+        """
+        Returns the first time period in the command as a dict with
+        start_date, end_date (inclusive, YYYY-MM-DD) and description, or None
+        """
+        if today is None:
+            today = self._clock()
+        if today != self._day or len(self._ranges) >= MAX_CACHED_RANGES:
+            self._ranges.clear()
+            self._day = today
+
+        for match in self._pattern.finditer(command.lower()):
+            rule = match.lastgroup
+            key = (rule, " ".join(match.group(rule).split()))
+            period = self._ranges.get(key, _MISSING)
+            if period is _MISSING:
+                groups = self._rules[rule].fullmatch(key[1]).groups()
+                period = self._ranges[key] = _RESOLVERS[rule](today, groups)
+            if period is not None:
+                return dict(period)
+        return None
+
+
+# Shared parser; its cache is keyed by day, so it is safe to reuse across calls
+DEFAULT_TIME_PERIOD_PARSER = TimePeriodParser()
@@ -0,0 +1,329 @@
+import asyncio
+import hmac
+import json
+import logging
+
+from aiohttp import web
+
+from .metrics import DEFAULT_METRICS
+from .session_manager import SessionLimitError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds one tool call may take before a spoken fallback is returned; Vapi
+# itself gives up on a tool after 20 seconds
+TOOL_CALL_DEADLINE = 10.0
+
+# Seconds an idle connection from Vapi is kept open for the next request
+KEEPALIVE_TIMEOUT = 75.0
+
+# Seconds requests still running after a drain get before they are cancelled
+SHUTDOWN_GRACE = 1.0
+
+# Only local connections by default; expose it through a proxy or tunnel, or set the host explicitly
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+VAPI_SECRET_HEADER = "X-Vapi-Secret"
+EVENT_SECRET_HEADER = "X-Webhook-Secret"
+
+# Content type of the Prometheus text exposition format served at /metrics
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Function tools offered to the assistant model, in OpenAI function format
+TOOL_DEFINITIONS = [
+    {
+        "name": "process_command",
+        "description": "Answers a question about the caller's Extend virtual cards, transactions, "
+                       "spending, expense categories or receipts. Pass the caller's request verbatim.",
+        "parameters": {
+            "type": "object",
+            "properties": {"command": {"type": "string", "description": "What the caller asked"}},
+            "required": ["command"],
+        },
+    },
+    {
+        "name": "get_virtual_cards",
+        "description": "Returns the caller's virtual cards as JSON.",
+        "parameters": {"type": "object", "properties": {}},
+    },
+    {
+        "name": "get_transactions",
+        "description": "Returns transactions as JSON, optionally filtered by startDate, endDate and category.",
+        "parameters": {
+            "type": "object",
+            "properties": {"filters": {"type": "object"}},
+        },
+    },
+    {
+        "name": "get_expense_categories",
+        "description": "Returns the caller's expense categories as JSON.",
+        "parameters": {"type": "object", "properties": {}},
+    },
+]
+
+
+def dumps(value):
+    """
+    Encodes a value as compact JSON bytes, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def loads(body):
+    """
+    Decodes JSON bytes, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def tool_definitions(server_url):
+    """
+    Returns the assistant's tool list, each pointing at the tool server
+    """
+    return [
+        {"type": "function", "function": definition, "server": {"url": server_url}}
+        for definition in TOOL_DEFINITIONS
+    ]
+
+
+class ToolServer:
+    """
+    HTTP endpoint that Vapi calls while a conversation is running.
+
+    Tool calls from the assistant model are answered by the calling session's
+    CommandProcessor (or read straight from the shared ExtendIntegration), so
+    spoken answers come from real data rather than the model. Messages are
+    matched to sessions by their Vapi call id. Transcript messages drive
+    speculative prefetching, and Extend webhook events keep caches and the
+    local store current. Every tool call runs under its own deadline.
+    Latency histograms and component counters are served at /metrics.
+    
+    Extend events write to the local store, so they are refused unless an
+    event secret is configured and sent with them.
+    """
+
+    def __init__(self, sessions, secret=None, deadline=TOOL_CALL_DEADLINE, on_call_ended=None, metrics=None,
+                 event_secret=None):
+        self.sessions = sessions
+        self.integration = sessions.extend_integration
+        self.secret = secret
+        self.event_secret = event_secret
+        self.deadline = deadline
+        self.metrics = metrics or DEFAULT_METRICS
+        # Called with the Vapi call id whenever a call ends
+        self.on_call_ended = on_call_ended
+        # Set by drain(); new requests are then refused so a replacement process can take them
+        self.draining = False
+        self._in_flight = 0
+        self._idle = None
+        self._runner = None
+        self._background = set()
+        self._tools = {
+            "process_command": lambda call_id, arguments: self.sessions.process_command(call_id, arguments.get("command") or ""),
+            "get_virtual_cards": lambda call_id, arguments: self._json(self.integration.get_virtual_cards()),
+            "get_transactions": lambda call_id, arguments: self._json(self.integration.get_transactions(filters=arguments.get("filters"))),
+            "get_expense_categories": lambda call_id, arguments: self._json(self.integration.get_expense_categories()),
+        }
+
+    def build_app(self):
+        """
+        Returns the aiohttp application serving the Vapi and Extend webhooks
+        """
+        app = web.Application(middlewares=[self._track_requests])
+        app.router.add_post("/vapi", self.handle_vapi)
+        app.router.add_post("/extend/events", self.handle_extend_event)
+        app.router.add_get("/health", self.handle_health)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.on_shutdown.append(self._on_shutdown)
+        return app
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Starts serving on host:port, keeping idle connections open between requests
+        """
+        self.draining = False
+        self._runner = web.AppRunner(
+            self.build_app(), keepalive_timeout=KEEPALIVE_TIMEOUT, shutdown_timeout=SHUTDOWN_GRACE, access_log=None
+        )
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        logger.info("Tool server listening on %s:%s", host, port)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    async def drain(self, timeout):
+        """
+        Refuses new requests and waits up to timeout seconds for the ones in
+        progress to finish; returns whether they all did
+        """
+        self.draining = True
+        if not self._in_flight:
+            return True
+        self._idle = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("%d tool server requests still running after %.1fs drain", self._in_flight, timeout)
+            return False
+
+    async def stop(self):
+        """
+        Stops serving, cancelling requests still running after a short grace period
+        """
+        if self._runner is not None:
+            runner, self._runner = self._runner, None
+            await runner.cleanup()
+
+    async def handle_vapi(self, request):
+        """
+        Handles a Vapi server message: tool calls, transcripts and call status
+        """
+        if self.secret and not self._authorized(request, VAPI_SECRET_HEADER, self.secret):
+            return web.Response(status=401)
+        try:
+            message = loads(await request.read()).get("message") or {}
+        except (ValueError, AttributeError):
+            return web.Response(status=400)
+
+        message_type = message.get("type")
+        call_id = (message.get("call") or {}).get("id")
+        if message_type == "tool-calls":
+            results = await asyncio.gather(*(
+                self.run_tool_call(call, call_id) for call in message.get("toolCallList") or []
+            ))
+            return self._respond({"results": results})
+        if message_type == "transcript":
+            self._on_transcript(call_id, message)
+        elif message_type == "end-of-call-report" or (message_type == "status-update" and message.get("status") == "ended"):
+            self.sessions.close(call_id)
+            if self.on_call_ended is not None:
+                self.on_call_ended(call_id)
+        return self._respond({})
+
+    async def handle_extend_event(self, request):
+        """
+        Handles an Extend webhook event by refreshing the affected data
+        """
+        if not self.event_secret:
+            return web.Response(status=403, text="Extend events need an event secret")
+        if not self._authorized(request, EVENT_SECRET_HEADER, self.event_secret):
+            return web.Response(status=401)
+        try:
+            event = loads(await request.read())
+            event_type = event.get("type") or event.get("eventType")
+        except (ValueError, AttributeError):
+            return web.Response(status=400)
+        if not event_type:
+            return web.Response(status=400)
+
+        endpoints = self.integration.handle_event(event_type, event.get("data") or event.get("payload"))
+        return self._respond({"invalidated": list(endpoints)})
+
+    async def handle_health(self, request):
+        """
+        Reports that the server is up
+        """
+        return self._respond({"status": "ok"})
+
+    async def handle_metrics(self, request):
+        """
+        Reports latency histograms and counters in Prometheus text format
+        """
+        body = self.metrics.render(self.gauges())
+        return web.Response(body=body.encode(), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+    def gauges(self):
+        """
+        Returns the current counters of the sessions, cache, single-flight and scheduler as metric values
+        """
+        gauges = {"extend_voice_tool_requests_in_flight": self._in_flight}
+        for prefix, stats in (
+            ("extend_voice_sessions", self.sessions.stats()),
+            ("extend_voice_cache", self.integration.get_cache_stats()),
+            ("extend_voice_single_flight", self.integration.single_flight.stats()),
+            ("extend_voice_scheduler", self.integration.scheduler.stats()),
+        ):
+            for name, value in stats.items():
+                gauges["{}_{}".format(prefix, name)] = value
+        return gauges
+
+    async def run_tool_call(self, call, call_id=None):
+        """
+        Runs one Vapi tool call for the given Vapi call and returns its result entry
+        """
+        tool_call_id = call.get("id")
+        function = call.get("function") or {}
+        name = function.get("name")
+        tool = self._tools.get(name)
+        if tool is None:
+            return {"toolCallId": tool_call_id, "error": "Unknown tool: {}".format(name)}
+
+        arguments = function.get("arguments") or {}
+        try:
+            if isinstance(arguments, str):
+                arguments = loads(arguments) if arguments else {}
+            result = await asyncio.wait_for(tool(call_id, arguments), self.deadline)
+        except asyncio.TimeoutError:
+            logger.warning("Tool call %s (%s) missed its %.1fs deadline", tool_call_id, name, self.deadline)
+            result = "I couldn't get that information in time. Please try again."
+        except SessionLimitError:
+            result = "I'm helping a lot of callers right now. Please try again in a moment."
+        except Exception as e:
+            logger.warning("Tool call %s (%s) failed: %s", tool_call_id, name, e)
+            return {"toolCallId": tool_call_id, "error": str(e)}
+        return {"toolCallId": tool_call_id, "result": result}
+
+    async def _json(self, read):
+        return dumps(await read).decode()
+
+    @web.middleware
+    async def _track_requests(self, request, handler):
+        if self.draining:
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        self._in_flight += 1
+        try:
+            return await handler(request)
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight and self._idle is not None:
+                self._idle.set()
+
+    def _on_transcript(self, call_id, message):
+        if message.get("role") != "user" or message.get("transcriptType") != "partial":
+            return
+        try:
+            session = self.sessions.open(call_id)
+        except SessionLimitError:
+            return
+        if session.speculation is None:
+            return
+        # The webhook is answered at once; the prefetch carries on in the background
+        task = asyncio.ensure_future(session.speculation.on_partial(message.get("transcript") or ""))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _on_shutdown(self, app):
+        self.sessions.close_all()
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+    def _authorized(self, request, header, secret):
+        return hmac.compare_digest(request.headers.get(header, "").encode(), secret.encode())
+
+    def _respond(self, payload):
+        return web.Response(body=dumps(payload), content_type="application/json")
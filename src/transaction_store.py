@@ -0,0 +1,156 @@
+import json
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    category TEXT,
+    card_id TEXT,
+    amount INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_card_date ON transactions (card_id, date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Filter keys the store can answer; anything else has to go to the API
+SUPPORTED_FILTERS = {"startDate", "endDate", "category", "virtualCardId"}
+
+
+def date_key(value):
+    """
+    Normalizes a transaction date (ISO string, date or datetime) to YYYY-MM-DD
+    """
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return str(value)[:10]
+
+
+class TransactionStore:
+    """
+    Embedded SQLite copy of the account's transactions.
+
+    Transactions are indexed by date, category and card. The store records the
+    date range it has synced (from the first backfill up to the high-water
+    mark) so callers can tell whether a query can be answered locally or has
+    to go to the Extend API. The high-water day itself may still receive
+    transactions after the sync, so only the days before it count as covered.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def upsert(self, transactions):
+        """
+        Inserts or replaces transactions and returns how many were written
+        """
+        rows = [
+            (
+                transaction["id"],
+                date_key(transaction.get("date")) or "",
+                (transaction.get("category") or "").lower() or None,
+                transaction.get("virtualCardId"),
+                transaction.get("amount", 0),
+                json.dumps(transaction, default=str),
+            )
+            for transaction in transactions
+            if transaction.get("id") is not None
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO transactions (id, date, category, card_id, amount, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def get_coverage(self):
+        """
+        Returns the (start_date, high_water_mark) range that has been synced, or None
+        """
+        rows = dict(self._conn.execute(
+            "SELECT key, value FROM sync_state WHERE key IN ('synced_from', 'high_water_mark')"
+        ))
+        if "synced_from" not in rows or "high_water_mark" not in rows:
+            return None
+        return rows["synced_from"], rows["high_water_mark"]
+
+    def set_coverage(self, synced_from, high_water_mark):
+        """
+        Records the synced date range
+        """
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                [("synced_from", date_key(synced_from)), ("high_water_mark", date_key(high_water_mark))],
+            )
+
+    def can_answer(self, filters):
+        """
+        Checks whether a transactions query with these filters is fully covered
+        by the store, i.e. it ends before the high-water day
+        """
+        if not filters or set(filters) - SUPPORTED_FILTERS:
+            return False
+        coverage = self.get_coverage()
+        if coverage is None:
+            return False
+        start_date = date_key(filters.get("startDate"))
+        end_date = date_key(filters.get("endDate"))
+        if start_date is None or end_date is None:
+            return False
+        return coverage[0] <= start_date and end_date < coverage[1]
+
+    def query(self, filters=None):
+        """
+        Yields stored transactions matching the filters, newest first
+        """
+        where, params = self._where(filters or {})
+        cursor = self._conn.execute(
+            "SELECT data FROM transactions" + where + " ORDER BY date DESC, id", params
+        )
+        for (data,) in cursor:
+            yield json.loads(data)
+
+    def summarize(self, filters=None):
+        """
+        Returns (total amount, count) of stored transactions matching the filters
+        """
+        where, params = self._where(filters or {})
+        total, count = self._conn.execute(
+            "SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM transactions" + where, params
+        ).fetchone()
+        return total, count
+
+    def _where(self, filters):
+        clauses = []
+        params = []
+        if filters.get("startDate"):
+            clauses.append("date >= ?")
+            params.append(date_key(filters["startDate"]))
+        if filters.get("endDate"):
+            clauses.append("date <= ?")
+            params.append(date_key(filters["endDate"]))
+        if filters.get("category"):
+            clauses.append("category = ?")
+            params.append(filters["category"].lower())
+        if filters.get("virtualCardId"):
+            clauses.append("card_id = ?")
+            params.append(filters["virtualCardId"])
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
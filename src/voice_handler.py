@@ -1,4 +1,3 @@
-from vapi_python import Vapi
 import os
 
 class VoiceHandler:
@@ -6,8 +5,23 @@ class VoiceHandler:
         self.api_key = os.getenv('VAPI_API_KEY')
         if not self.api_key:
             raise ValueError("VAPI_API_KEY environment variable is not set")
-        self.client = Vapi(api_key=self.api_key)
+        # The Vapi client (and its audio stack) is built on first use
+        self._client = None
         
+    @property
+    def client(self):
+        """
+        Vapi client, created on first use
+        """
+        if self._client is None:
+            from vapi_python import Vapi
+            self._client = Vapi(api_key=self.api_key)
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
     def get_client(self):
         """
         Returns the Vapi client instance
@@ -66,6 +80,19 @@ class VoiceHandler:
             'interruptionsEnabled': True
         }
         
+        # With a tool server, answers about real data come from the CommandProcessor
+        server_url = os.getenv('VAPI_SERVER_URL')
+        if server_url:
+            from .tool_server import tool_definitions
+            assistant_config['serverUrl'] = server_url
+            if os.getenv('VAPI_SERVER_SECRET'):
+                assistant_config['serverUrlSecret'] = os.getenv('VAPI_SERVER_SECRET')
+            assistant_config['model'] = {
+                'provider': 'openai',
+                'model': assistant_config['model'],
+                'tools': tool_definitions(server_url),
+            }
+        
         self.client.start(assistant=assistant_config)
         
     def stop_call(self):
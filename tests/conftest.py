@@ -3,13 +3,26 @@ Pytest configuration and fixtures for the Extend Voice Assistant tests.
 """
 import os
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
 # Load environment variables from .env file
 load_dotenv()
 
+class FakeClock:
+    """Manually advanced clock for deterministic expiry; set `now` to move it."""
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    """Clock starting at zero for code that takes a `clock` callable."""
+    return FakeClock()
+
 @pytest.fixture
 def mock_vapi_client():
     """Mock Vapi client for testing."""
@@ -22,7 +35,7 @@ def mock_vapi_client():
 def mock_extend_client():
     """Mock Extend client for testing."""
     with patch('extend.ExtendClient') as mock:
-        mock_instance = MagicMock()
+        mock_instance = AsyncMock()
         mock.return_value = mock_instance
         yield mock_instance
 
@@ -0,0 +1,103 @@
+"""
+Unit tests for the AutomatchJobManager class.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.automatch_jobs import AutomatchError, AutomatchJobManager
+
+def make_integration(statuses):
+    """Build a stand-in integration whose job reports the given statuses in turn."""
+    integration = MagicMock()
+    integration.automatch_receipts = AsyncMock(return_value={"jobId": "job_1", "status": "processing"})
+    integration.get_automatch_status = AsyncMock(
+        side_effect=[{"jobId": "job_1", "status": status} for status in statuses]
+    )
+    return integration
+
+@pytest.mark.asyncio
+async def test_requests_within_debounce_window_share_one_job():
+    """Test that a burst of requests triggers a single automatch run."""
+    integration = make_integration(["completed"])
+    manager = AutomatchJobManager(integration, debounce=0.02, poll_interval=0.001)
+    
+    jobs = [manager.request() for _ in range(5)]
+    
+    assert all(job is jobs[0] for job in jobs)
+    assert jobs[0].requests == 5
+    assert (await jobs[0])["status"] == "completed"
+    integration.automatch_receipts.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_debounce_is_capped_by_max_debounce():
+    """Test that steady requests cannot postpone the run past max_debounce."""
+    integration = make_integration(["completed"])
+    manager = AutomatchJobManager(integration, debounce=0.05, max_debounce=0.08, poll_interval=0.001)
+    
+    job = manager.request()
+    for _ in range(6):
+        await asyncio.sleep(0.02)
+        if job.job_id is not None:
+            break
+        manager.request()
+    
+    await job.wait(timeout=1)
+    assert job.job_id == "job_1"
+
+@pytest.mark.asyncio
+async def test_polls_with_backoff_until_complete():
+    """Test that the job is polled with a growing interval until it finishes."""
+    integration = make_integration(["processing", "processing", "processing", "completed"])
+    manager = AutomatchJobManager(integration, debounce=0, poll_interval=0.001, max_poll_interval=0.002)
+    sleeps = []
+    real_sleep = asyncio.sleep
+    
+    async def recording_sleep(delay):
+        sleeps.append(delay)
+        await real_sleep(0)
+    
+    with patch("src.automatch_jobs.asyncio.sleep", recording_sleep):
+        result = await manager.request().wait(timeout=1)
+    
+    assert result["status"] == "completed"
+    assert integration.get_automatch_status.call_count == 4
+    assert sleeps == pytest.approx([0.001, 0.0015, 0.002, 0.002])
+
+@pytest.mark.asyncio
+async def test_failed_job_raises_and_calls_back():
+    """Test that a failed job raises for awaiters and still runs callbacks."""
+    integration = make_integration(["failed"])
+    manager = AutomatchJobManager(integration, debounce=0, poll_interval=0.001)
+    finished = []
+    
+    job = manager.request()
+    job.add_done_callback(finished.append)
+    
+    with pytest.raises(AutomatchError):
+        await job
+    await asyncio.sleep(0)
+    assert finished == [job]
+    assert not job.succeeded()
+
+@pytest.mark.asyncio
+async def test_missing_job_id_fails_without_polling():
+    """Test that a trigger response without a job id fails the job instead of polling for it."""
+    integration = make_integration(["completed"])
+    integration.automatch_receipts.return_value = {"status": "processing"}
+    manager = AutomatchJobManager(integration, debounce=0, poll_interval=0.001)
+    
+    with pytest.raises(AutomatchError):
+        await manager.request().wait(timeout=1)
+    integration.get_automatch_status.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_close_cancels_pending_jobs():
+    """Test that closing the manager cancels a job that has not started."""
+    integration = make_integration([])
+    manager = AutomatchJobManager(integration, debounce=10)
+    
+    job = manager.request()
+    await manager.close()
+    
+    assert job.cancelled()
+    integration.automatch_receipts.assert_not_called()
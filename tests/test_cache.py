@@ -0,0 +1,116 @@
+"""
+Unit tests for the TTLCache class.
+"""
+import asyncio
+import pytest
+from src.cache import TTLCache
+
+def test_get_returns_fresh_value_and_counts_hits(clock):
+    """Test that fresh entries are served and counted as hits."""
+    cache = TTLCache(clock=clock)
+    cache.set("key", "value", ttl=10)
+
+    assert cache.get("key") == "value"
+    assert cache.get("other") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_get_treats_expired_entry_as_miss(clock):
+    """Test that plain get does not serve stale entries."""
+    cache = TTLCache(clock=clock)
+    cache.set("key", "value", ttl=10)
+    clock.now = 11
+
+    assert cache.get("key") is None
+    assert "key" in cache
+
+def test_lru_eviction_when_full():
+    """Test that the least recently used entry is evicted first."""
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidate_where():
+    """Test invalidating a group of keys."""
+    cache = TTLCache()
+    cache.set(("cards",), [1])
+    cache.set(("categories",), [2])
+
+    assert cache.invalidate_where(lambda key: key[0] == "cards") == 1
+    assert ("cards",) not in cache
+    assert ("categories",) in cache
+
+@pytest.mark.asyncio
+async def test_get_or_load_loads_once_then_hits():
+    """Test that a miss loads the value and later calls hit the cache."""
+    cache = TTLCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return ["data"]
+
+    assert await cache.get_or_load("key", loader, ttl=60) == ["data"]
+    assert await cache.get_or_load("key", loader, ttl=60) == ["data"]
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_get_or_load_serves_stale_while_refreshing(clock):
+    """Test that a stale entry is returned immediately and refreshed in the background."""
+    cache = TTLCache(clock=clock)
+    cache.set("key", "old", ttl=10)
+    clock.now = 20
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "new"
+
+    assert await cache.get_or_load("key", loader, ttl=10) == "old"
+    # A second stale read must not start another refresh
+    assert await cache.get_or_load("key", loader, ttl=10) == "old"
+    assert cache.stats()["stale_hits"] == 2
+
+    release.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert cache.get("key") == "new"
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_stale_value(clock):
+    """Test that a failing background refresh leaves the stale entry in place."""
+    cache = TTLCache(clock=clock)
+    cache.set("key", "old", ttl=10)
+    clock.now = 20
+
+    async def loader():
+        raise RuntimeError("boom")
+
+    assert await cache.get_or_load("key", loader, ttl=10) == "old"
+    await asyncio.sleep(0)
+    assert cache.stats()["refresh_errors"] == 1
+    assert await cache.get_or_load("key", loader, ttl=10) == "old"
+
+@pytest.mark.asyncio
+async def test_get_or_load_max_stale_bounds_staleness(clock):
+    """Test that entries expired longer than max_stale are reloaded synchronously."""
+    cache = TTLCache(clock=clock)
+    cache.set("key", "old", ttl=10)
+    clock.now = 12
+
+    async def loader():
+        return "new"
+
+    assert await cache.get_or_load("key", loader, ttl=10, max_stale=5) == "old"
+    cache.set("key", "old", ttl=10)
+    clock.now = 30
+    assert await cache.get_or_load("key", loader, ttl=10, max_stale=5) == "new"
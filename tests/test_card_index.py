@@ -0,0 +1,86 @@
+"""
+Unit tests for the CardIndex class.
+"""
+import pytest
+from src.card_index import CardIndex, card_signature, parse_balance_bounds, parse_last_four, parse_next_page
+
+CARDS = [
+    {"id": "vc_1", "lastFour": "1234", "balance": 50000, "status": "ACTIVE", "displayName": "Marketing Ads"},
+    {"id": "vc_2", "lastFour": "5678", "balance": 120000, "status": "ACTIVE", "displayName": "Travel", "recipientName": "Jane Doe"},
+    {"id": "vc_3", "lastFour": "9012", "balance": 0, "status": "CANCELLED", "displayName": "Old Travel"},
+    {"id": "vc_4", "lastFour": "3456", "balance": 7500, "status": "PAUSED", "displayName": "Office Supplies"},
+]
+
+@pytest.fixture
+def index():
+    """Create an index over a small card list."""
+    return CardIndex(CARDS)
+
+def last_fours(selection, offset=0, size=10):
+    return [card["lastFour"] for card in selection.page(offset, size)]
+
+@pytest.mark.parametrize("command, expected", [
+    ("card ending in 1234", "1234"),
+    ("the one that ends with 5678", "5678"),
+    ("last four digits 9012", "9012"),
+    ("list my cards", None),
+])
+def test_parse_last_four(command, expected):
+    """Test that the last four digits are picked out of a command."""
+    assert parse_last_four(command) == expected
+
+def test_parse_balance_bounds_and_next_page():
+    """Test that balance thresholds are read as cents and page sizes as numbers."""
+    assert parse_balance_bounds("cards over $1,250.50") == (125050, None, False, False)
+    assert parse_balance_bounds("cards above 100 dollars and under 500") == (10000, 50000, False, False)
+    assert parse_balance_bounds("cards with at least $75 and at most $500") == (7500, 50000, True, True)
+    assert parse_balance_bounds("list my cards") == (None, None, False, False)
+    assert parse_next_page("next ten cards") == 10
+    assert parse_next_page("more cards") == 5
+    assert parse_next_page("list my cards") is None
+
+def test_ending_in(index):
+    """Test that cards are found by their last four digits."""
+    assert index.ending_in("5678") == [CARDS[1]]
+    assert index.ending_in("0000") == []
+
+def test_balance_between_is_largest_first(index):
+    """Test that balance ranges come back largest balance first."""
+    assert last_fours(index.find("cards over $100")) == ["5678", "1234"]
+    assert last_fours(index.find("cards under $500")) == ["3456", "9012"]
+    assert last_fours(index.find("cards over $50 and under $1000")) == ["1234", "3456"]
+    assert len(index.find("cards over $5000")) == 0
+
+def test_at_least_and_at_most_include_the_bound(index):
+    """Test that a card whose balance equals an "at least" or "at most" amount is selected."""
+    selection = index.find("cards with at least $500")
+    assert last_fours(selection) == ["5678", "1234"]
+    assert selection.description == "virtual cards with a balance of at least $500.00"
+    
+    assert last_fours(index.find("cards with at most $75")) == ["3456", "9012"]
+    assert last_fours(index.find("cards with at least $75 and at most $500")) == ["1234", "3456"]
+    assert last_fours(index.find("cards over $75 and under $500")) == []
+
+def test_find_by_status_and_name(index):
+    """Test that status words and name words narrow the selection."""
+    selection = index.find("show my active cards")
+    assert selection.filtered
+    assert selection.description == "active virtual cards"
+    assert last_fours(selection) == ["1234", "5678"]
+
+    assert last_fours(index.find("what's on the travel card")) == ["5678", "9012"]
+    assert last_fours(index.find("jane's travel card")) == ["5678"]
+    assert last_fours(index.find("active cards over $600")) == ["5678"]
+
+def test_find_without_filters_selects_every_card(index):
+    """Test that a plain listing selects every card in order."""
+    selection = index.find("list my virtual cards")
+    assert not selection.filtered
+    assert len(selection) == 4
+    assert last_fours(selection, offset=1, size=2) == ["5678", "9012"]
+
+def test_signature_changes_with_balance():
+    """Test that a balance change produces a new signature."""
+    updated = [dict(CARDS[0], balance=1)] + CARDS[1:]
+    assert card_signature(CARDS) != card_signature(updated)
+    assert card_signature(CARDS) == CardIndex(CARDS).signature
@@ -0,0 +1,75 @@
+"""
+Unit tests for the CategoryIndex class.
+"""
+import pytest
+from src.category_index import CategoryIndex, category_signature, stem
+
+CATEGORIES = [
+    {"id": "cat_1", "name": "Travel"},
+    {"id": "cat_2", "name": "Meals & Entertainment"},
+    {"id": "cat_3", "name": "Office Supplies"},
+    {"id": "cat_4", "name": "Office Rent"},
+    {"id": "cat_5", "name": "Utilities"},
+    {"id": "cat_6", "name": "Other Expenses"},
+]
+
+@pytest.fixture
+def index():
+    """Create an index over a typical category list."""
+    return CategoryIndex(CATEGORIES)
+
+def resolved(index, text):
+    category = index.resolve(text)
+    return category and category["name"]
+
+@pytest.mark.parametrize("text, name", [
+    ("how much did I spend on travel", "Travel"),
+    ("show my travel expenses last month", "Travel"),
+    ("what did we spend on flights", "Travel"),
+    ("restaurant spending this week", "Meals & Entertainment"),
+    ("office supplies this quarter", "Office Supplies"),
+    ("how much was office rent", "Office Rent"),
+    ("utility bills", "Utilities"),
+])
+def test_resolves_names_and_synonyms(index, text, name):
+    """Test that names, plurals and synonyms resolve to the live category."""
+    assert resolved(index, text) == name
+
+@pytest.mark.parametrize("text, name", [
+    ("how much did I spend on travle", "Travel"),
+    ("restaurent bills", "Meals & Entertainment"),
+    ("utilties last month", "Utilities"),
+    ("enter tainment this month", "Meals & Entertainment"),
+])
+def test_resolves_misheard_words(index, text, name):
+    """Test that close misspellings and split words still resolve."""
+    assert resolved(index, text) == name
+
+@pytest.mark.parametrize("text", [
+    "how much did I spend this month",
+    "show my expenses",
+    "what is the weather",
+])
+def test_no_category(index, text):
+    """Test that generic or unrelated words do not resolve to a category."""
+    assert index.resolve(text) is None
+
+def test_empty_index():
+    """Test that an index without categories resolves nothing."""
+    assert CategoryIndex([]).resolve("travel") is None
+
+def test_signature_tracks_renames():
+    """Test that renaming or adding a category changes the signature."""
+    renamed = [dict(category) for category in CATEGORIES]
+    renamed[0]["name"] = "Business Travel"
+    
+    assert category_signature(CATEGORIES) == CategoryIndex(CATEGORIES).signature
+    assert category_signature(renamed) != category_signature(CATEGORIES)
+    assert category_signature(CATEGORIES + [{"id": "cat_7", "name": "Fuel"}]) != category_signature(CATEGORIES)
+
+def test_stem():
+    """Test plural stemming."""
+    assert stem("supplies") == "supply"
+    assert stem("meals") == "meal"
+    assert stem("business") == "business"
+    assert stem("gas") == "gas"
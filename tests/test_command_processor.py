@@ -0,0 +1,441 @@
+"""
+Unit tests for the CommandProcessor class.
+"""
+import asyncio
+import itertools
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.card_index import CardIndex
+from src.category_index import CategoryIndex
+from src.command_processor import CommandProcessor
+from src.metrics import Metrics
+
+def make_integration(transactions=None, virtual_cards=None, expense_categories=None):
+    """Build a stand-in ExtendIntegration serving fixed data."""
+    integration = MagicMock()
+    
+    async def iter_transactions(filters=None):
+        for transaction in transactions or []:
+            yield transaction
+    
+    integration.iter_transactions = MagicMock(side_effect=iter_transactions)
+    integration.count_transactions = AsyncMock(return_value=len(transactions or []))
+    integration.get_virtual_cards = AsyncMock(return_value=virtual_cards or [])
+    
+    async def get_card_index():
+        return CardIndex(await integration.get_virtual_cards())
+    
+    integration.get_card_index = get_card_index
+    integration.get_expense_categories = AsyncMock(return_value=expense_categories or [])
+    integration.get_category_index = AsyncMock(return_value=CategoryIndex(expense_categories or []))
+    integration.summarize_spending = AsyncMock(return_value=None)
+    # A fresh data version per lookup, as if the data changed between every question
+    versions = itertools.count()
+    integration.data_version = MagicMock(side_effect=lambda *endpoints: next(versions))
+    return integration
+
+@pytest.mark.asyncio
+async def test_how_much_totals_every_transaction():
+    """Test that spending totals include every streamed transaction."""
+    transactions = [{"amount": 1000 * (i + 1)} for i in range(12)]
+    processor = CommandProcessor(make_integration(transactions=transactions))
+    
+    response = await processor.process_command("How much have I spent this month?")
+    
+    assert "$780.00" in response
+    assert "this month" in response
+
+@pytest.mark.asyncio
+async def test_streamed_totals_skip_reversed_transactions():
+    """Test that the API path totals the same statuses as the spending rollups."""
+    transactions = [{"amount": 5000, "status": "CLEARED"}, {"amount": 7000, "status": "REVERSED"}]
+    processor = CommandProcessor(make_integration(transactions=transactions))
+    
+    response = await processor.process_command("How much did I spend today?")
+    
+    assert "$50.00" in response
+
+@pytest.mark.asyncio
+async def test_list_transactions_shows_five_and_counts_the_rest():
+    """Test that listing shows the first five transactions and counts the remainder."""
+    transactions = [
+        {"amount": 100, "description": "Item {}".format(i), "date": "2024-01-0{}".format(i % 9 + 1)}
+        for i in range(8)
+    ]
+    processor = CommandProcessor(make_integration(transactions=transactions))
+    
+    response = await processor.process_command("Show my recent transactions")
+    
+    assert "Item 4" in response
+    assert "Item 5" not in response
+    assert "And 3 more transactions." in response
+
+@pytest.mark.asyncio
+async def test_transaction_filters_are_passed_to_stream():
+    """Test that time period and category filters reach the integration."""
+    integration = make_integration(
+        transactions=[{"amount": 500}],
+        expense_categories=[{"id": "cat_1", "name": "Travel"}, {"id": "cat_2", "name": "Meals"}]
+    )
+    processor = CommandProcessor(integration)
+    
+    await processor.process_command("How much have I spent on travle today?")
+    
+    filters = integration.iter_transactions.call_args[1]["filters"]
+    assert filters["category"] == "Travel"
+    assert filters["startDate"] == filters["endDate"]
+
+@pytest.mark.asyncio
+async def test_no_transactions():
+    """Test the response when no transactions match."""
+    processor = CommandProcessor(make_integration())
+    
+    response = await processor.process_command("Show my transactions")
+    
+    assert "couldn't find any transactions" in response
+
+@pytest.mark.asyncio
+async def test_unrecognized_command():
+    """Test the fallback response for unknown commands."""
+    processor = CommandProcessor(make_integration())
+    
+    response = await processor.process_command("What's the weather like?")
+    
+    assert "not sure how to help" in response
+
+@pytest.mark.asyncio
+async def test_match_receipts_reports_completion_on_next_turn():
+    """Test that automatch runs in the background and its outcome is spoken later."""
+    integration = make_integration()
+    job = MagicMock()
+    job.requests = 1
+    job.succeeded.return_value = True
+    integration.automatch_jobs.request.return_value = job
+    processor = CommandProcessor(integration)
+    
+    response = await processor.process_command("Match my receipts")
+    
+    assert "started matching your receipts" in response
+    callback = job.add_done_callback.call_args[0][0]
+    callback(job)
+    
+    response = await processor.process_command("What's the weather like?")
+    assert response.startswith("Your receipts have been matched to transactions.")
+    assert "not sure how to help" in response
+
+@pytest.mark.asyncio
+async def test_match_receipts_uses_notify_callback():
+    """Test that a notify callback receives the automatch outcome directly."""
+    integration = make_integration()
+    job = MagicMock()
+    job.requests = 1
+    job.succeeded.return_value = False
+    job.done.return_value = True
+    job.cancelled.return_value = False
+    integration.automatch_jobs.request.return_value = job
+    messages = []
+    processor = CommandProcessor(integration, notify=messages.append)
+    
+    await processor.process_command("Match my receipts")
+    job.add_done_callback.call_args[0][0](job)
+    
+    assert messages == ["I couldn't finish matching your receipts. Please try again later."]
+
+@pytest.mark.asyncio
+async def test_every_caller_of_a_shared_automatch_job_is_told_the_outcome():
+    """Test that a processor subscribes to a job another caller requested first, but only once."""
+    integration = make_integration()
+    job = MagicMock()
+    job.requests = 3
+    job.succeeded.return_value = True
+    integration.automatch_jobs.request.return_value = job
+    first, second = CommandProcessor(integration), CommandProcessor(integration)
+    
+    await first.process_command("Match my receipts")
+    await second.process_command("Match my receipts")
+    await second.process_command("Match my receipts")
+    
+    assert job.add_done_callback.call_count == 2
+    for call in job.add_done_callback.call_args_list:
+        call[0][0](job)
+    assert first.pending_notifications == second.pending_notifications == ["Your receipts have been matched to transactions."]
+
+@pytest.mark.asyncio
+async def test_upload_receipt_for_expense_routes_to_receipts():
+    """Test that receipt keywords outweigh a passing mention of an expense."""
+    integration = make_integration(expense_categories=[{"name": "Travel"}])
+    processor = CommandProcessor(integration)
+    
+    response = await processor.process_command("Upload receipt for travel expense")
+    
+    assert "upload receipts" in response
+    integration.get_expense_categories.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_how_much_did_i_spend_routes_to_transactions():
+    """Test that "spend" is recognized as a spending question."""
+    processor = CommandProcessor(make_integration(transactions=[{"amount": 2500}]))
+    
+    response = await processor.process_command("How much did I spend today?")
+    
+    assert response.startswith("You spent $25.00 today")
+
+@pytest.mark.asyncio
+async def test_spending_breakdown_by_category():
+    """Test that a breakdown request groups spending and reads out the largest groups."""
+    transactions = [
+        {"amount": 1000, "category": "Meals"},
+        {"amount": 5000, "category": "Travel"},
+        {"amount": 2000, "category": "Meals"},
+        {"amount": 400},
+    ]
+    processor = CommandProcessor(make_integration(transactions=transactions))
+    
+    response = await processor.process_command("How much did I spend by category this month?")
+    
+    assert response.startswith("You spent $84.00 this month by category.")
+    assert response.index("Travel: $50.00") < response.index("Meals: $30.00") < response.index("Uncategorized: $4.00")
+
+@pytest.mark.asyncio
+async def test_spending_breakdown_by_card_uses_card_names():
+    """Test that a card breakdown names cards by their last four digits."""
+    transactions = [{"amount": 700, "virtualCardId": "vc_1"}, {"amount": 300, "virtualCardId": "vc_9"}]
+    integration = make_integration(
+        transactions=transactions, virtual_cards=[{"id": "vc_1", "lastFour": "1234"}]
+    )
+    processor = CommandProcessor(integration)
+    
+    response = await processor.process_command("Show my spending by card")
+    
+    assert "Card ending in 1234: $7.00." in response
+    assert "Card vc_9: $3.00." in response
+
+@pytest.mark.asyncio
+async def test_how_much_uses_rollups_when_available():
+    """Test that spending totals come from the rollups without streaming transactions."""
+    integration = make_integration(transactions=[{"amount": 1}])
+    integration.summarize_spending = AsyncMock(return_value=(123400, 17))
+    processor = CommandProcessor(integration)
+    
+    response = await processor.process_command("How much did I spend last month?")
+    
+    assert response.startswith("You spent $1234.00 last month")
+    integration.iter_transactions.assert_not_called()
+    filters = integration.summarize_spending.call_args[0][0]
+    assert set(filters) == {"startDate", "endDate"}
+
+@pytest.mark.asyncio
+async def test_compound_command_runs_parts_concurrently_in_spoken_order():
+    """Test that each part of a compound command is fetched at once and answered in order."""
+    both_started = asyncio.Event()
+    calls = []
+    
+    async def get_virtual_cards():
+        calls.append("cards")
+        if len(calls) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), 1)
+        return [{"lastFour": "1234", "balance": 5000}]
+    
+    integration = make_integration(transactions=[{"amount": 2500}])
+    integration.get_virtual_cards = get_virtual_cards
+    
+    async def summarize_spending(filters):
+        calls.append("spending")
+        if len(calls) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), 1)
+        return None
+    
+    integration.summarize_spending = summarize_spending
+    processor = CommandProcessor(integration)
+    
+    response = await processor.process_command("Show my virtual cards and how much I spent this week")
+    
+    assert sorted(calls) == ["cards", "spending"]
+    assert response.index("Card ending in 1234") < response.index("You spent $25.00 this week")
+
+@pytest.mark.asyncio
+async def test_compound_command_branch_timeout_and_failure():
+    """Test that a slow or failing part is reported without losing the other answers."""
+    integration = make_integration(expense_categories=[{"name": "Travel"}])
+    
+    async def slow_virtual_cards():
+        await asyncio.sleep(1)
+    
+    integration.get_virtual_cards = slow_virtual_cards
+    integration.get_expense_categories.side_effect = [[{"name": "Travel"}], RuntimeError("boom")]
+    processor = CommandProcessor(integration, branch_timeout=0.05)
+    
+    response = await processor.process_command("List my categories and my virtual cards")
+    assert response == "You have 1 expense categories: Travel. I couldn't get your virtual cards in time."
+    
+    response = await processor.process_command("List my categories and my virtual cards")
+    assert response.startswith("I ran into a problem getting your expense categories.")
+
+def make_cards(count):
+    """Build cards with distinct last four digits and balances of $10, $20, ..."""
+    return [
+        {"id": "vc_{}".format(i), "lastFour": "{:04d}".format(1000 + i), "balance": 1000 * (i + 1), "status": "ACTIVE"}
+        for i in range(count)
+    ]
+
+@pytest.mark.asyncio
+async def test_card_ending_in_reads_one_card():
+    """Test that a card asked for by its last four digits is answered on its own."""
+    processor = CommandProcessor(make_integration(virtual_cards=make_cards(200)))
+    
+    response = await processor.process_command("What's the balance on the card ending in 1042?")
+    assert response == "Card ending in 1042 has a balance of $430.00."
+    
+    response = await processor.process_command("What's the balance on the card ending in 9999?")
+    assert response == "I couldn't find a card ending in 9999."
+
+@pytest.mark.asyncio
+async def test_card_list_is_read_a_page_at_a_time():
+    """Test that long card lists are paginated and "next five cards" continues them."""
+    processor = CommandProcessor(make_integration(virtual_cards=make_cards(12)))
+    
+    response = await processor.process_command("List my virtual cards")
+    assert response.startswith("You have 12 virtual cards. Here are the first 5. Card ending in 1000")
+    assert "1005" not in response
+    assert response.endswith("Say next to hear 5 more.")
+    
+    response = await processor.process_command("Next five cards")
+    assert response.startswith("Cards 6 to 10 of 12. Card ending in 1005")
+    
+    response = await processor.process_command("Next cards")
+    assert response.startswith("Cards 11 to 12 of 12.")
+    assert not response.endswith("more.")
+    
+    response = await processor.process_command("Next cards")
+    assert response == "That's all of your virtual cards."
+
+@pytest.mark.asyncio
+async def test_cards_over_an_amount_largest_first():
+    """Test that balance thresholds select cards through the balance index."""
+    processor = CommandProcessor(make_integration(virtual_cards=make_cards(12)))
+    
+    response = await processor.process_command("Which cards are over $95?")
+    assert response.startswith("You have 3 virtual cards with a balance over $95.00. Card ending in 1011 has a balance of $120.00.")
+    
+    response = await processor.process_command("Show cards over $5,000")
+    assert response == "You don't have any virtual cards with a balance over $5,000.00."
+
+@pytest.mark.asyncio
+async def test_list_transactions_stops_reading_after_the_first_five():
+    """Test that listing closes the stream once it has read one transaction past the limit."""
+    integration = make_integration()
+    integration.count_transactions = AsyncMock(return_value=20000)
+    read = []
+    
+    async def iter_transactions(filters=None):
+        for i in range(20000):
+            read.append(i)
+            yield {"amount": 100, "description": "Item {}".format(i), "date": "2024-01-02"}
+    
+    integration.iter_transactions = iter_transactions
+    processor = CommandProcessor(integration)
+    
+    response = await processor.process_command("Show my recent transactions")
+    
+    assert len(read) == 6
+    assert response.endswith("And 19995 more transactions.")
+
+@pytest.mark.asyncio
+async def test_stream_command_yields_first_sentences_before_paging_finishes():
+    """Test that a transaction list starts streaming while later pages are still loading."""
+    release = asyncio.Event()
+    integration = make_integration()
+    
+    async def iter_transactions(filters=None):
+        yield {"amount": 500, "description": "Lunch", "date": "2024-01-02"}
+        await release.wait()
+        yield {"amount": 700, "description": "Taxi", "date": "2024-01-03"}
+    
+    integration.iter_transactions = iter_transactions
+    processor = CommandProcessor(integration)
+    processor.pending_notifications.append("Your receipts have been matched to transactions.")
+    
+    stream = processor.stream_command("Show my recent transactions")
+    assert await stream.__anext__() == "Your receipts have been matched to transactions."
+    assert await stream.__anext__() == "Here are your recent transactions:"
+    assert await stream.__anext__() == "$5.00 for Lunch on 2024-01-02."
+    
+    release.set()
+    assert [sentence async for sentence in stream] == ["$7.00 for Taxi on 2024-01-03."]
+    assert processor.pending_notifications == []
+
+@pytest.mark.asyncio
+async def test_stream_compound_command_yields_parts_in_spoken_order():
+    """Test that a compound command streams each part's answer in the order it was asked."""
+    integration = make_integration(
+        virtual_cards=[{"lastFour": "1234", "balance": 5000}],
+        expense_categories=[{"name": "Travel"}]
+    )
+    processor = CommandProcessor(integration)
+    
+    sentences = [sentence async for sentence in processor.stream_command("List my categories and my virtual cards")]
+    
+    assert sentences == [
+        "You have 1 expense categories: Travel.",
+        "You have 1 virtual cards. Card ending in 1234 has a balance of $50.00.",
+    ]
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_answered_from_the_memo():
+    """Test that a rephrased repeat over unchanged data skips the fetch."""
+    integration = make_integration(transactions=[{"amount": 2500}])
+    integration.data_version = MagicMock(return_value=(0, 0))
+    processor = CommandProcessor(integration)
+    
+    first = await processor.process_command("How much did I spend today?")
+    second = await processor.process_command("How much have I spent today")
+    
+    assert first == second == "You spent $25.00 today."
+    assert integration.iter_transactions.call_count == 1
+    assert processor.memo.stats()["hits"] == 1
+    assert processor.memo.stats()["hit_ratio"] == 0.5
+    
+    integration.data_version.return_value = (0, 1)
+    await processor.process_command("How much did I spend today?")
+    assert integration.iter_transactions.call_count == 2
+
+@pytest.mark.asyncio
+async def test_interrupted_answer_is_not_remembered():
+    """Test that a stream closed early leaves nothing in the memo."""
+    transactions = [{"amount": 100, "description": "Item", "date": "2024-01-02"}] * 3
+    integration = make_integration(transactions=transactions)
+    integration.data_version = MagicMock(return_value=(0, 0))
+    processor = CommandProcessor(integration)
+    
+    stream = processor.stream_command("Show my recent transactions")
+    await stream.__anext__()
+    await stream.aclose()
+    
+    assert len(processor.memo) == 0
+
+@pytest.mark.asyncio
+async def test_process_command_records_parse_handle_and_format_spans():
+    """Test that answering a command times routing, its handler and formatting under its intent."""
+    metrics = Metrics(enabled=True)
+    processor = CommandProcessor(make_integration(transactions=[{"amount": 500}]), metrics=metrics)
+    
+    await processor.process_command("How much did I spend today?")
+    
+    assert metrics.turn_histogram("transactions").count == 1
+    for stage, name in [("parse", "route"), ("parse", "time_period"), ("parse", "category"),
+                        ("handle", "transactions"), ("format", "format_spending_total")]:
+        assert metrics.span_histogram(stage, name).count == 1, (stage, name)
+
+@pytest.mark.asyncio
+async def test_compound_branches_share_the_turn():
+    """Test that spans from concurrently run parts of a compound command land on the one turn."""
+    metrics = Metrics(enabled=True, slow_turn_threshold=0)
+    processor = CommandProcessor(make_integration(virtual_cards=[{"id": "vc_1", "lastFour": "1234"}]), metrics=metrics)
+    
+    await processor.process_command("List my virtual cards and list my expense categories")
+    
+    assert metrics.turn_histogram("compound").count == 1
+    assert metrics.span_histogram("handle", "virtual_cards").count == 1
+    assert metrics.span_histogram("handle", "expense_categories").count == 1
@@ -1,10 +1,13 @@
 """
 Unit tests for the ExtendIntegration class.
 """
+import asyncio
 import os
 import pytest
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 from src.extend_integration import ExtendIntegration
+from src.scheduler import RequestScheduler
 
 def test_extend_integration_initialization():
     """Test that ExtendIntegration initializes correctly with API keys."""
@@ -231,4 +234,602 @@ def test_get_tools(mock_extend_toolkit):
         
         # Verify the result
         assert result == ["tool1", "tool2", "tool3"]
-        mock_extend_toolkit.get_tools.assert_called_once() 
\ No newline at end of file
+        mock_extend_toolkit.get_tools.assert_called_once() 
+
+@pytest.mark.asyncio
+async def test_get_virtual_cards_is_cached(mock_extend_client, sample_virtual_cards):
+    """Test that repeated virtual card lookups hit the cache."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        mock_extend_client.virtual_cards.get_virtual_cards.return_value = {
+            "virtualCards": sample_virtual_cards
+        }
+        
+        assert await integration.get_virtual_cards() == sample_virtual_cards
+        assert await integration.get_virtual_cards() == sample_virtual_cards
+        
+        mock_extend_client.virtual_cards.get_virtual_cards.assert_called_once()
+        stats = integration.get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_cache_ttls_are_configurable(mock_extend_client, sample_expense_categories):
+    """Test that a zero TTL serves stale data and refreshes in the background."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(cache_ttls={"expense_categories": 0})
+        integration.client = mock_extend_client
+        
+        mock_extend_client.expense_management.get_expense_categories.return_value = {
+            "expenseCategories": sample_expense_categories
+        }
+        
+        assert await integration.get_expense_categories() == sample_expense_categories
+        assert await integration.get_expense_categories() == sample_expense_categories
+        await asyncio.sleep(0.01)
+        
+        assert mock_extend_client.expense_management.get_expense_categories.call_count == 2
+        assert integration.get_cache_stats()["stale_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_category_index_is_rebuilt_only_when_categories_change(mock_extend_client, sample_expense_categories):
+    """Test that the category index is reused until the category list changes."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        mock_extend_client.expense_management.get_expense_categories.return_value = {
+            "expenseCategories": sample_expense_categories
+        }
+        
+        index = await integration.get_category_index()
+        assert index.resolve("spent on travel")["id"] == "cat_1"
+        
+        integration.invalidate_cache("expense_categories")
+        assert await integration.get_category_index() is index
+        
+        renamed = [dict(sample_expense_categories[0], name="Business Trips")] + sample_expense_categories[1:]
+        mock_extend_client.expense_management.get_expense_categories.return_value = {
+            "expenseCategories": renamed
+        }
+        integration.invalidate_cache("expense_categories")
+        rebuilt = await integration.get_category_index()
+        
+        assert rebuilt is not index
+        assert rebuilt.resolve("business trips")["id"] == "cat_1"
+
+@pytest.mark.asyncio
+async def test_card_index_is_rebuilt_only_when_cards_change(mock_extend_client):
+    """Test that the card index is reused until a card changes."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        cards = [{"id": "vc_1", "lastFour": "1234", "balance": 5000, "status": "ACTIVE"}]
+        mock_extend_client.virtual_cards.get_virtual_cards.return_value = {"virtualCards": cards}
+        
+        index = await integration.get_card_index()
+        assert index.ending_in("1234") == cards
+        
+        integration.invalidate_cache("virtual_cards")
+        assert await integration.get_card_index() is index
+        
+        mock_extend_client.virtual_cards.get_virtual_cards.return_value = {
+            "virtualCards": [dict(cards[0], balance=100)]
+        }
+        integration.invalidate_cache("virtual_cards")
+        rebuilt = await integration.get_card_index()
+        
+        assert rebuilt is not index
+        assert rebuilt.ending_in("1234")[0]["balance"] == 100
+
+@pytest.mark.asyncio
+async def test_handle_event_invalidates_cache(mock_extend_client, sample_virtual_cards):
+    """Test that webhook events drop the affected cache entries."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        mock_extend_client.virtual_cards.get_virtual_cards.return_value = {
+            "virtualCards": sample_virtual_cards
+        }
+        
+        await integration.get_virtual_cards()
+        assert integration.handle_event("virtualcard.updated") == ("virtual_cards",)
+        assert integration.handle_event("unknown.event") == ()
+        await integration.get_virtual_cards()
+        
+        assert mock_extend_client.virtual_cards.get_virtual_cards.call_count == 2
+
+@pytest.mark.asyncio
+async def test_iter_transactions_walks_every_page(mock_extend_client):
+    """Test that iter_transactions follows pagination until the last page."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        pages = {
+            1: [{"id": "txn_1"}, {"id": "txn_2"}],
+            2: [{"id": "txn_3"}, {"id": "txn_4"}],
+            3: [{"id": "txn_5"}],
+        }
+        
+        async def get_transactions(filters=None):
+            return {
+                "report": {
+                    "transactions": pages[filters["page"]],
+                    "pagination": {"page": filters["page"], "numberOfPages": 3}
+                }
+            }
+        
+        mock_extend_client.transactions.get_transactions.side_effect = get_transactions
+        
+        result = [t["id"] async for t in integration.iter_transactions({"category": "travel"}, page_size=2)]
+        
+        assert result == ["txn_1", "txn_2", "txn_3", "txn_4", "txn_5"]
+        assert mock_extend_client.transactions.get_transactions.call_count == 3
+        mock_extend_client.transactions.get_transactions.assert_any_call(
+            filters={"category": "travel", "page": 2, "perPage": 2}
+        )
+
+@pytest.mark.asyncio
+async def test_streaming_a_long_range_caches_only_its_first_page(mock_extend_client, sample_virtual_cards):
+    """Test that later pages bypass the response cache, so cached cards are not evicted."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(cache_max_size=4)
+        integration.client = mock_extend_client
+        mock_extend_client.virtual_cards.get_virtual_cards.return_value = {"virtualCards": sample_virtual_cards}
+        
+        async def get_transactions(filters=None):
+            return {
+                "report": {
+                    "transactions": [{"id": "txn_{}".format(filters["page"])}],
+                    "pagination": {"page": filters["page"], "numberOfPages": 10}
+                }
+            }
+        
+        mock_extend_client.transactions.get_transactions.side_effect = get_transactions
+        await integration.get_virtual_cards()
+        
+        result = [t["id"] async for t in integration.iter_transactions(page_size=1)]
+        
+        assert len(result) == 10
+        assert len(integration.cache) == 2
+        await integration.get_virtual_cards()
+        mock_extend_client.virtual_cards.get_virtual_cards.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_iter_transactions_without_pagination_metadata(mock_extend_client):
+    """Test that a short page ends iteration when the API omits pagination info."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        responses = [
+            {"report": {"transactions": [{"id": "txn_1"}, {"id": "txn_2"}]}},
+            {"report": {"transactions": [{"id": "txn_3"}]}},
+        ]
+        mock_extend_client.transactions.get_transactions.side_effect = responses
+        
+        result = [t["id"] async for t in integration.iter_transactions(page_size=2)]
+        
+        assert result == ["txn_1", "txn_2", "txn_3"]
+
+@pytest.mark.asyncio
+async def test_count_transactions_reads_only_the_first_page(mock_extend_client):
+    """Test that the match count comes from a first page that is the only one, which later reads reuse."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        mock_extend_client.transactions.get_transactions.return_value = {
+            "report": {
+                "transactions": [{"id": "txn_1"}, {"id": "txn_2"}],
+                "pagination": {"page": 1, "numberOfPages": 1, "totalItems": 2}
+            }
+        }
+        
+        assert await integration.count_transactions(page_size=50) == 2
+        stream = integration.iter_transactions(page_size=50)
+        assert (await stream.__anext__())["id"] == "txn_1"
+        await stream.aclose()
+        
+        # The first page came from the cache
+        assert mock_extend_client.transactions.get_transactions.call_count == 1
+
+@pytest.mark.asyncio
+async def test_count_transactions_is_unknown_when_more_pages_exist(mock_extend_client):
+    """Test that totalItems is not taken as the range's count while another page exists."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        # The API reports pageItemCount + 1 whenever there is another page
+        mock_extend_client.transactions.get_transactions.return_value = {
+            "report": {
+                "transactions": [{"id": "txn_1"}, {"id": "txn_2"}],
+                "pagination": {"page": 1, "pageItemCount": 2, "numberOfPages": 2, "totalItems": 3}
+            }
+        }
+        
+        assert await integration.count_transactions(page_size=2) is None
+
+@pytest.mark.asyncio
+async def test_iter_transactions_prefetch_is_cancelled_on_early_exit(mock_extend_client):
+    """Test that closing the stream early cancels the prefetched page."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        second_page_started = asyncio.Event()
+        second_page_cancelled = asyncio.Event()
+        
+        async def get_transactions(filters=None):
+            if filters["page"] == 1:
+                return {"report": {"transactions": [{"id": "txn_1"}, {"id": "txn_2"}]}}
+            second_page_started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                second_page_cancelled.set()
+                raise
+        
+        mock_extend_client.transactions.get_transactions.side_effect = get_transactions
+        
+        stream = integration.iter_transactions(page_size=2)
+        assert (await stream.__anext__())["id"] == "txn_1"
+        await second_page_started.wait()
+        await stream.aclose()
+        
+        await asyncio.wait_for(second_page_cancelled.wait(), timeout=1)
+
+@pytest.mark.asyncio
+async def test_sync_transactions_then_answer_from_store(mock_extend_client):
+    """Test that synced ranges are served from the local store without API calls."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(transaction_store_path=":memory:")
+        integration.client = mock_extend_client
+        
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        mock_extend_client.transactions.get_transactions.return_value = {
+            "report": {
+                "transactions": [
+                    {"id": "txn_1", "amount": 2500, "category": "Food", "date": yesterday},
+                    {"id": "txn_2", "amount": 5000, "category": "Travel", "date": yesterday},
+                ],
+                "pagination": {"numberOfPages": 1}
+            }
+        }
+        
+        assert await integration.sync_transactions() == 2
+        mock_extend_client.transactions.get_transactions.reset_mock()
+        
+        filters = {"startDate": yesterday, "endDate": yesterday, "category": "travel"}
+        result = [t["id"] async for t in integration.iter_transactions(filters)]
+        
+        assert result == ["txn_2"]
+        mock_extend_client.transactions.get_transactions.assert_not_called()
+        
+        # Today is still changing after the sync, so it is read from the API
+        today = datetime.now().strftime("%Y-%m-%d")
+        mock_extend_client.transactions.get_transactions.return_value = {
+            "report": {"transactions": [{"id": "txn_3", "amount": 900, "date": today}], "pagination": {"numberOfPages": 1}}
+        }
+        result = [t["id"] async for t in integration.iter_transactions({"startDate": yesterday, "endDate": today})]
+        
+        assert result == ["txn_3"]
+        mock_extend_client.transactions.get_transactions.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_summarize_spending_uses_rollups(mock_extend_client):
+    """Test that synced ranges are totalled from the rollups and corrected by transaction events."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(transaction_store_path=":memory:")
+        integration.client = mock_extend_client
+        
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        filters = {"startDate": yesterday, "endDate": yesterday, "category": "Travel"}
+        assert await integration.summarize_spending(filters) is None
+        
+        mock_extend_client.transactions.get_transactions.return_value = {
+            "report": {
+                "transactions": [
+                    {"id": "txn_1", "amount": 2500, "category": "Food", "date": yesterday},
+                    {"id": "txn_2", "amount": 5000, "category": "Travel", "date": yesterday},
+                ],
+                "pagination": {"numberOfPages": 1}
+            }
+        }
+        await integration.sync_transactions()
+        
+        assert await integration.summarize_spending(filters) == (5000, 1)
+        
+        integration.handle_event("transaction.updated", {
+            "id": "txn_2", "amount": 5000, "category": "Travel", "date": yesterday, "status": "REVERSED"
+        })
+        integration.handle_event("transaction.created", {
+            "id": "txn_3", "amount": 700, "category": "Travel", "date": yesterday
+        })
+        
+        assert await integration.summarize_spending(filters) == (700, 1)
+        assert await integration.summarize_spending({"startDate": yesterday, "endDate": yesterday}) == (3200, 2)
+
+def test_data_version_changes_with_events_and_stored_transactions():
+    """Test that data versions move only for the endpoints whose data changed."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(transaction_store_path=":memory:")
+        
+        categories = integration.data_version("expense_categories")
+        transactions = integration.data_version("transactions")
+        assert integration.data_version("transactions") == transactions
+        
+        integration.handle_event("transaction.created", {"id": "txn_1", "amount": 700, "date": "2024-01-02"})
+        assert integration.data_version("transactions") != transactions
+        assert integration.data_version("expense_categories") == categories
+        
+        integration.invalidate_cache()
+        assert integration.data_version("expense_categories") != categories
+
+@pytest.mark.asyncio
+async def test_sync_transactions_resumes_from_high_water_mark(mock_extend_client):
+    """Test that later syncs start from the high-water mark."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(transaction_store_path=":memory:")
+        integration.client = mock_extend_client
+        integration.store.set_coverage("2024-01-01", "2024-03-10")
+        
+        mock_extend_client.transactions.get_transactions.return_value = {
+            "report": {"transactions": [], "pagination": {"numberOfPages": 1}}
+        }
+        
+        await integration.sync_transactions()
+        
+        filters = mock_extend_client.transactions.get_transactions.call_args[1]["filters"]
+        assert filters["startDate"] == "2024-03-10"
+        assert integration.store.get_coverage()[0] == "2024-01-01"
+
+@pytest.mark.asyncio
+async def test_unsynced_range_falls_back_to_api(mock_extend_client):
+    """Test that ranges outside the synced window are fetched from the API."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(transaction_store_path=":memory:")
+        integration.client = mock_extend_client
+        integration.store.set_coverage("2024-01-01", "2024-03-10")
+        
+        mock_extend_client.transactions.get_transactions.return_value = {
+            "report": {"transactions": [{"id": "txn_api"}], "pagination": {"numberOfPages": 1}}
+        }
+        
+        filters = {"startDate": "2023-12-01", "endDate": "2023-12-31"}
+        result = [t["id"] async for t in integration.iter_transactions(filters)]
+        
+        assert result == ["txn_api"]
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_reads_are_coalesced(mock_extend_client, sample_transactions):
+    """Test that identical in-flight transaction queries share one API call."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        async def get_transactions(filters=None):
+            await asyncio.sleep(0.01)
+            return {"report": {"transactions": sample_transactions}}
+        
+        mock_extend_client.transactions.get_transactions.side_effect = get_transactions
+        
+        results = await asyncio.gather(
+            integration.get_transactions({"startDate": "2024-03-01", "endDate": "2024-03-31"}),
+            integration.get_transactions({"endDate": "2024-03-31", "startDate": "2024-03-01"}),
+            integration.get_transactions({"startDate": "2024-03-01", "endDate": "2024-03-31", "category": None}),
+            integration.get_transactions({"startDate": "2024-02-01", "endDate": "2024-02-29"}),
+        )
+        
+        assert all(result == sample_transactions for result in results)
+        assert mock_extend_client.transactions.get_transactions.call_count == 2
+        assert integration.single_flight.stats()["coalesced"] == 2
+
+@pytest.mark.asyncio
+async def test_reads_are_retried_through_the_scheduler(mock_extend_client, sample_virtual_cards):
+    """Test that transient errors on reads are retried instead of reaching the caller."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(scheduler=RequestScheduler(base_delay=0.001))
+        integration.client = mock_extend_client
+        
+        mock_extend_client.virtual_cards.get_virtual_cards.side_effect = [
+            ConnectionError("connection reset"),
+            {"virtualCards": sample_virtual_cards},
+        ]
+        
+        assert await integration.get_virtual_cards() == sample_virtual_cards
+        assert integration.scheduler.stats()["retries"] == 1
+
+@pytest.mark.asyncio
+async def test_upload_receipts_streams_files(mock_extend_client, tmp_path):
+    """Test that bulk uploads hand the SDK a streamed file object per receipt."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        received = {}
+        
+        async def create_receipt_attachment(transaction_id, file):
+            received[transaction_id] = file.read()
+            return {"transactionId": transaction_id, "status": "attached"}
+        
+        mock_extend_client.expense_management.create_receipt_attachment.side_effect = create_receipt_attachment
+        
+        items = []
+        for i in range(3):
+            path = tmp_path / "receipt_{}.pdf".format(i)
+            path.write_bytes(b"receipt %d" % i)
+            items.append(("tx_{}".format(i), str(path)))
+        
+        report = await integration.upload_receipts(items)
+        
+        assert len(report.uploaded) == 3
+        assert received == {"tx_0": b"receipt 0", "tx_1": b"receipt 1", "tx_2": b"receipt 2"}
+
+@pytest.mark.asyncio
+async def test_warm_up_primes_caches(mock_extend_client, sample_virtual_cards, sample_expense_categories):
+    """Test that warm-up loads the data a first question needs into the caches."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        mock_extend_client.virtual_cards.get_virtual_cards.return_value = {"virtualCards": sample_virtual_cards}
+        mock_extend_client.expense_management.get_expense_categories.return_value = {
+            "expenseCategories": sample_expense_categories
+        }
+        mock_extend_client.transactions.get_transactions.return_value = {
+            "report": {"transactions": [{"id": "txn_1", "amount": 100}], "pagination": {"numberOfPages": 1}}
+        }
+        
+        await integration.warm_up()
+        
+        today = datetime.now()
+        this_month = {"startDate": today.replace(day=1).strftime("%Y-%m-%d"), "endDate": today.strftime("%Y-%m-%d")}
+        assert await integration.get_virtual_cards() == sample_virtual_cards
+        assert await integration.get_expense_categories() == sample_expense_categories
+        assert [t["id"] async for t in integration.iter_transactions(this_month)] == ["txn_1"]
+        
+        mock_extend_client.virtual_cards.get_virtual_cards.assert_called_once()
+        mock_extend_client.expense_management.get_expense_categories.assert_called_once()
+        mock_extend_client.transactions.get_transactions.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_warm_up_logs_failures(mock_extend_client, sample_expense_categories):
+    """Test that a failing prefetch does not stop the others or raise."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration(scheduler=RequestScheduler(max_retries=0))
+        integration.client = mock_extend_client
+        
+        mock_extend_client.virtual_cards.get_virtual_cards.side_effect = RuntimeError("down")
+        mock_extend_client.expense_management.get_expense_categories.return_value = {
+            "expenseCategories": sample_expense_categories
+        }
+        mock_extend_client.transactions.get_transactions.return_value = {"report": {"transactions": []}}
+        
+        await integration.warm_up()
+        
+        assert await integration.get_expense_categories() == sample_expense_categories
+        mock_extend_client.expense_management.get_expense_categories.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_get_transaction_details_deduplicates_and_memoizes(mock_extend_client):
+    """Test that batch detail lookups fetch each id once and reuse cached details."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        in_flight = []
+        max_in_flight = []
+        
+        async def get_transaction_detail(transaction_id):
+            in_flight.append(transaction_id)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(transaction_id)
+            return {"id": transaction_id, "status": "CLEARED"}
+        
+        mock_extend_client.transactions.get_transaction_detail.side_effect = get_transaction_detail
+        
+        ids = ["tx_1", "tx_2", "tx_1", "tx_3", "tx_4", "tx_2"]
+        details = await integration.get_transaction_details(ids, concurrency=2)
+        
+        assert list(details) == ["tx_1", "tx_2", "tx_3", "tx_4"]
+        assert details["tx_3"] == {"id": "tx_3", "status": "CLEARED"}
+        assert mock_extend_client.transactions.get_transaction_detail.call_count == 4
+        assert max(max_in_flight) == 2
+        
+        await integration.get_transaction_details(["tx_4", "tx_1"])
+        assert mock_extend_client.transactions.get_transaction_detail.call_count == 4
+
+@pytest.mark.asyncio
+async def test_pending_transaction_details_expire(mock_extend_client):
+    """Test that pending transactions get a short TTL and settled ones never expire."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+        integration.client = mock_extend_client
+        
+        async def get_transaction_detail(transaction_id):
+            status = "PENDING" if transaction_id == "tx_pending" else "CLEARED"
+            return {"id": transaction_id, "status": status}
+        
+        mock_extend_client.transactions.get_transaction_detail.side_effect = get_transaction_detail
+        
+        await integration.get_transaction_details(["tx_pending", "tx_settled"])
+        
+        assert integration.detail_cache._entries["tx_settled"].expires_at is None
+        assert integration.detail_cache._entries["tx_pending"].expires_at is not None
@@ -0,0 +1,108 @@
+"""
+Unit tests for the IntentRouter class.
+"""
+import pytest
+from src.intent_router import (
+    ACTION_LIST, ACTION_MATCH, ACTION_TOTAL, ACTION_UPLOAD, INTENT_EXPENSE_CATEGORIES,
+    INTENT_RECEIPTS, INTENT_TRANSACTIONS, INTENT_VIRTUAL_CARDS, IntentRouter,
+)
+
+@pytest.fixture
+def router():
+    """Create a router over the default keyword table."""
+    return IntentRouter()
+
+@pytest.mark.parametrize("utterance, intent", [
+    ("Show me my virtual cards", INTENT_VIRTUAL_CARDS),
+    ("What's the balance on my card ending in 1234?", INTENT_VIRTUAL_CARDS),
+    ("How much did I spend last week?", INTENT_TRANSACTIONS),
+    ("List my recent transactions", INTENT_TRANSACTIONS),
+    ("What are my expense categories?", INTENT_EXPENSE_CATEGORIES),
+    ("Upload a receipt for travel expense", INTENT_RECEIPTS),
+    ("Match my receipts", INTENT_RECEIPTS),
+    ("How much did I spend on my virtual card?", INTENT_TRANSACTIONS),
+])
+def test_routes_utterances(router, utterance, intent):
+    """Test that utterances route to the expected intent."""
+    assert router.route(utterance).intent == intent
+
+def test_unrecognized_utterance_has_no_intent(router):
+    """Test that utterances without keywords route nowhere."""
+    route = router.route("What's the weather like?")
+    
+    assert route.intent is None
+    assert route.scores == {}
+
+def test_longest_phrase_wins(router):
+    """Test that a multi-word keyword is matched instead of the words inside it."""
+    matches = list(router.match(router.tokenize("list expense categories please")))
+    
+    assert [(start, end) for start, end, _ in matches] == [(0, 1), (1, 3)]
+    assert router.route("list expense categories").scores == {INTENT_EXPENSE_CATEGORIES: 3}
+
+def test_keywords_match_whole_words_only(router):
+    """Test that keywords inside longer words are ignored."""
+    assert router.route("whatever happened to the cardigan").intent is None
+
+@pytest.mark.parametrize("utterance, action", [
+    ("How much did I spend today?", ACTION_TOTAL),
+    ("What was my total spending?", ACTION_TOTAL),
+    ("Show my transactions", ACTION_LIST),
+    ("Match my receipts", ACTION_MATCH),
+    ("Upload a receipt", ACTION_UPLOAD),
+    ("Receipts", None),
+])
+def test_extracts_action_slot(router, utterance, action):
+    """Test that the action slot follows the strongest action word."""
+    assert router.route(utterance).action == action
+
+@pytest.mark.parametrize("utterance, group_by", [
+    ("How much did I spend by category this month?", "category"),
+    ("Show spending per merchant", "merchant"),
+    ("Break down spending by card", "card"),
+    ("What did I spend each week?", "week"),
+    ("How much did I spend?", None),
+])
+def test_extracts_group_by_slot(router, utterance, group_by):
+    """Test that breakdown phrases fill the group_by slot and stay spending questions."""
+    route = router.route(utterance)
+    
+    assert route.intent == INTENT_TRANSACTIONS
+    assert route.group_by == group_by
+
+def test_custom_keywords():
+    """Test that a router can be compiled from its own keyword table."""
+    router = IntentRouter({"pay bill": ({"bills": 2}, {"action": "pay"})})
+    
+    route = router.route("Please pay bill now")
+    
+    assert route.intent == "bills"
+    assert route.scores == {"bills": 2}
+    assert route.action == "pay"
+
+def test_route_all_splits_compound_commands(router):
+    """Test that a compound command is split into one routed clause per request."""
+    clauses = router.route_all("show my virtual cards and how much i spent this week")
+    
+    assert [clause for clause, _ in clauses] == ["show my virtual cards", "how much i spent this week"]
+    assert [route.intent for _, route in clauses] == [INTENT_VIRTUAL_CARDS, INTENT_TRANSACTIONS]
+    assert [route.action for _, route in clauses] == [ACTION_LIST, ACTION_TOTAL]
+
+@pytest.mark.parametrize("command", [
+    "how much did i spend on meals and entertainment this month",
+    "hey, show my transactions",
+    "show my transactions today and yesterday",
+])
+def test_route_all_keeps_clauses_without_their_own_intent(router, command):
+    """Test that pieces without an intent stay attached to their neighbour."""
+    clauses = router.route_all(command)
+    
+    assert len(clauses) == 1
+    assert clauses[0][0] == command
+
+def test_route_all_inherits_action(router):
+    """Test that a clause without an action word reuses the previous clause's action."""
+    clauses = router.route_all("list my expense categories, plus my virtual cards")
+    
+    assert [route.intent for _, route in clauses] == [INTENT_EXPENSE_CATEGORIES, INTENT_VIRTUAL_CARDS]
+    assert clauses[1][1].action == ACTION_LIST
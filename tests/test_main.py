@@ -0,0 +1,139 @@
+"""
+Unit tests for the ExtendVoice class.
+"""
+import asyncio
+import os
+import signal
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.main import ExtendVoice
+
+@pytest.fixture
+def extend_voice():
+    """Create an ExtendVoice with its call and API layers mocked out."""
+    with patch.dict(os.environ, {
+        'VAPI_API_KEY': 'test_api_key',
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        voice = ExtendVoice()
+    voice.voice_handler = MagicMock()
+    voice.extend_integration = MagicMock()
+    return voice
+
+@pytest.mark.asyncio
+async def test_start_warms_up_after_starting_the_call(extend_voice):
+    """Test that warm-up begins once the call has started."""
+    events = []
+    extend_voice.voice_handler.start_call.side_effect = lambda **kwargs: events.append("call started")
+    
+    async def warm_up():
+        events.append("warm-up")
+    
+    extend_voice.extend_integration.warm_up = warm_up
+    
+    task = asyncio.ensure_future(extend_voice.start())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    
+    assert events == ["call started", "warm-up"]
+
+@pytest.mark.asyncio
+async def test_warm_up_is_cancelled_when_the_call_ends(extend_voice):
+    """Test that an unfinished warm-up is cancelled cleanly on shutdown."""
+    cancelled = asyncio.Event()
+    
+    async def warm_up():
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    extend_voice.extend_integration.warm_up = warm_up
+    
+    task = asyncio.ensure_future(extend_voice.start())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    
+    assert cancelled.is_set()
+    extend_voice.voice_handler.stop_call.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_tool_server_runs_for_the_length_of_the_call(extend_voice):
+    """Test that a configured tool server is started before the call and stopped after it."""
+    events = []
+    extend_voice.tool_server = MagicMock()
+    extend_voice.tool_server.start = AsyncMock(side_effect=lambda **kwargs: events.append("server started"))
+    extend_voice.tool_server.drain = AsyncMock(side_effect=lambda timeout: events.append("drained"))
+    extend_voice.tool_server.stop = AsyncMock(side_effect=lambda: events.append("server stopped"))
+    extend_voice.voice_handler.start_call.side_effect = lambda **kwargs: events.append("call started")
+    extend_voice.extend_integration.warm_up = AsyncMock()
+    
+    task = asyncio.ensure_future(extend_voice.start())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    
+    assert events == ["server started", "call started", "drained", "server stopped"]
+
+def test_tool_server_is_created_when_server_url_is_set():
+    """Test that VAPI_SERVER_URL enables the tool server."""
+    with patch.dict(os.environ, {
+        'VAPI_API_KEY': 'test_api_key',
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret',
+        'VAPI_SERVER_URL': 'https://example.com/vapi'
+    }):
+        voice = ExtendVoice()
+    
+    assert voice.tool_server is not None
+    assert voice.tool_server.sessions is voice.sessions
+    assert voice.sessions.extend_integration is voice.extend_integration
+    # Other callers' calls end all the time on a shared server
+    assert voice.stop_on_call_end is False
+
+@pytest.mark.asyncio
+async def test_call_end_stops_start_without_polling(extend_voice):
+    """Test that start() returns as soon as the call ends."""
+    extend_voice.extend_integration.warm_up = AsyncMock()
+    
+    task = asyncio.ensure_future(extend_voice.start())
+    await asyncio.sleep(0)
+    extend_voice._on_call_ended("call_1")
+    await asyncio.wait_for(task, 0.1)
+    
+    assert extend_voice.stop_reason == "call call_1 ended"
+    extend_voice.voice_handler.stop_call.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_call_end_is_ignored_when_serving_many_calls(extend_voice):
+    """Test that a multi-call server keeps running when one call ends."""
+    extend_voice.stop_on_call_end = False
+    extend_voice.extend_integration.warm_up = AsyncMock()
+    
+    async with extend_voice:
+        extend_voice._on_call_ended("call_1")
+        await asyncio.sleep(0.01)
+        assert extend_voice.stop_reason is None
+    
+    extend_voice.voice_handler.stop_call.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_shutdown_signal_stops_gracefully(extend_voice):
+    """Test that SIGTERM ends start() cleanly instead of killing the process."""
+    extend_voice.extend_integration.warm_up = AsyncMock()
+    
+    task = asyncio.ensure_future(extend_voice.start())
+    await asyncio.sleep(0.01)
+    assert signal.SIGTERM in extend_voice._signals
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.wait_for(task, 1)
+    
+    assert extend_voice.stop_reason == "received SIGTERM"
+    assert extend_voice._signals == []
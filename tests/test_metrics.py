@@ -0,0 +1,84 @@
+"""
+Unit tests for the Metrics registry and its histograms.
+"""
+import logging
+import os
+from unittest.mock import patch
+from src.metrics import Histogram, Metrics
+
+def test_histogram_buckets_are_cumulative():
+    """Test that values land in the first bucket whose bound they do not exceed."""
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1.0) == float("inf")
+    assert histogram.render("latency", (("stage", "fetch"),)) == [
+        'latency_bucket{stage="fetch",le="0.1"} 2',
+        'latency_bucket{stage="fetch",le="1.0"} 3',
+        'latency_bucket{stage="fetch",le="+Inf"} 4',
+        'latency_sum{stage="fetch"} 2.65',
+        'latency_count{stage="fetch"} 4',
+    ]
+
+def test_spans_are_attributed_to_the_current_turn():
+    """Test that spans inside a turn are observed and recorded on it, tagged with its intent."""
+    metrics = Metrics(enabled=True)
+    
+    with metrics.turn() as turn:
+        metrics.tag_turn("transactions")
+        with metrics.span("fetch", "transactions"):
+            pass
+        with metrics.span("fetch", "transactions"):
+            pass
+    with metrics.span("fetch", "virtual_cards"):
+        pass
+    
+    assert turn.intent == "transactions"
+    assert [(stage, name) for stage, name, _ in turn.spans] == [("fetch", "transactions")] * 2
+    assert metrics.turn_histogram("transactions").count == 1
+    assert metrics.span_histogram("fetch", "transactions").count == 2
+    assert metrics.span_histogram("fetch", "virtual_cards").count == 1
+
+def test_slow_turns_are_logged_with_their_breakdown(caplog):
+    """Test that a turn over the threshold is counted and logged with its spans."""
+    metrics = Metrics(enabled=True, slow_turn_threshold=0)
+    
+    with caplog.at_level(logging.WARNING, logger="src.metrics"):
+        with metrics.turn():
+            metrics.tag_turn("virtual_cards")
+            with metrics.span("fetch", "virtual_cards"):
+                pass
+    
+    assert metrics.slow_turns == 1
+    assert "Slow virtual_cards turn" in caplog.text
+    assert "fetch virtual_cards" in caplog.text
+
+def test_disabled_metrics_record_nothing():
+    """Test that disabled instrumentation hands out no-op spans and observes nothing."""
+    with patch.dict(os.environ, {"EXTEND_VOICE_METRICS": "0"}):
+        metrics = Metrics()
+    
+    with metrics.turn() as turn:
+        with metrics.span("parse", "route") as span:
+            pass
+    
+    assert turn is None and span is None
+    assert metrics.turn_histogram("unknown") is None
+    assert metrics.span_histogram("parse", "route") is None
+
+def test_render_uses_prometheus_text_format():
+    """Test that the exposition has typed histograms, the slow-turn counter and gauges."""
+    metrics = Metrics(enabled=True, slow_turn_threshold=60)
+    
+    with metrics.turn():
+        metrics.tag_turn("receipts")
+    
+    text = metrics.render({"extend_voice_sessions_active": 3})
+    
+    assert "# TYPE extend_voice_turn_seconds histogram" in text
+    assert 'extend_voice_turn_seconds_count{intent="receipts"} 1' in text
+    assert "extend_voice_slow_turns_total 0" in text
+    assert "# TYPE extend_voice_sessions_active gauge\nextend_voice_sessions_active 3\n" in text
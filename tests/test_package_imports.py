@@ -0,0 +1,54 @@
+"""
+Import-time regression tests for the src package.
+"""
+import json
+import os
+import subprocess
+import sys
+
+# Cold-start budget for `import src` in a fresh interpreter, in seconds
+IMPORT_TIME_BUDGET = 0.25
+
+# Third-party SDKs and libraries that must only be loaded on first use
+HEAVY_MODULES = ['vapi_python', 'extend', 'extend_ai_toolkit', 'dotenv', 'numpy']
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_import(statement):
+    """Run an import in a fresh interpreter and report its time and loaded SDKs."""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "{}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {!r} if m in sys.modules]}}))\n"
+    ).format(statement, HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_package_import_does_not_load_sdks():
+    """Test that importing the package does not pull in any SDK."""
+    result = run_import("import src")
+    assert result["loaded"] == []
+
+def test_package_import_time_budget():
+    """Test that importing the package stays within the cold-start budget."""
+    result = min((run_import("import src") for _ in range(3)), key=lambda r: r["elapsed"])
+    assert result["elapsed"] < IMPORT_TIME_BUDGET
+
+def test_integration_import_defers_sdks():
+    """Test that the integration and command modules load without the SDKs."""
+    result = run_import("import src.extend_integration, src.command_processor, src.response_generator")
+    assert result["loaded"] == []
+
+def test_lazy_exports_resolve():
+    """Test that lazily exported names resolve to the real classes."""
+    import src
+    from src.command_processor import CommandProcessor
+    from src.response_generator import ResponseGenerator
+    
+    assert src.CommandProcessor is CommandProcessor
+    assert src.ResponseGenerator is ResponseGenerator
+    assert set(src.__all__) <= set(dir(src))
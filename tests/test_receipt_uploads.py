@@ -0,0 +1,116 @@
+"""
+Unit tests for bulk receipt uploads.
+"""
+import asyncio
+import pytest
+from src.receipt_uploads import (
+    BulkReceiptUploader,
+    FAILED,
+    SKIPPED,
+    UPLOADED,
+    open_receipt,
+)
+
+@pytest.fixture
+def receipt_files(tmp_path):
+    """Write a handful of receipt files to disk."""
+    paths = []
+    for i in range(6):
+        path = tmp_path / "receipt_{}.pdf".format(i)
+        path.write_bytes(b"%PDF-" + bytes([i]) * 1000)
+        paths.append(str(path))
+    return paths
+
+def test_open_receipt_streams_in_chunks(tmp_path):
+    """Test that a mapped receipt can be read in chunks and rewound."""
+    path = tmp_path / "receipt.pdf"
+    content = bytes(range(256)) * 100
+    path.write_bytes(content)
+    
+    with open_receipt(str(path)) as stream:
+        assert stream.name == "receipt.pdf"
+        chunks = []
+        while True:
+            chunk = stream.read(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        assert b"".join(chunks) == content
+        assert len(chunks) == 7
+        
+        stream.seek(0)
+        assert stream.read(3) == content[:3]
+
+def test_open_receipt_handles_empty_files(tmp_path):
+    """Test that empty files fall back to a plain file object."""
+    path = tmp_path / "empty.pdf"
+    path.write_bytes(b"")
+    
+    with open_receipt(str(path)) as stream:
+        assert stream.read() == b""
+
+@pytest.mark.asyncio
+async def test_bulk_upload_bounds_parallelism_and_reports_progress(receipt_files):
+    """Test that uploads run with bounded parallelism and report every item."""
+    in_flight = []
+    max_in_flight = []
+    progress = []
+    
+    async def upload(transaction_id, path):
+        in_flight.append(1)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return {"transactionId": transaction_id}
+    
+    items = [("txn_{}".format(i), path) for i, path in enumerate(receipt_files)]
+    uploader = BulkReceiptUploader(
+        upload, concurrency=2, progress=lambda result, done, total: progress.append((done, total))
+    )
+    
+    report = await uploader.run(items)
+    
+    assert len(report.uploaded) == 6
+    assert max(max_in_flight) == 2
+    assert progress[-1] == (6, 6)
+
+@pytest.mark.asyncio
+async def test_bulk_upload_reports_failures_without_stopping(receipt_files):
+    """Test that one failing receipt does not abort the batch."""
+    async def upload(transaction_id, path):
+        if transaction_id == "txn_2":
+            raise RuntimeError("rejected")
+        return {}
+    
+    items = [("txn_{}".format(i), path) for i, path in enumerate(receipt_files)]
+    report = await BulkReceiptUploader(upload).run(items)
+    
+    assert [result.transaction_id for result in report.failed] == ["txn_2"]
+    assert isinstance(report.failed[0].error, RuntimeError)
+    assert len(report.uploaded) == 5
+
+@pytest.mark.asyncio
+async def test_bulk_upload_resumes_from_checkpoint(receipt_files, tmp_path):
+    """Test that a rerun only uploads receipts that did not succeed before."""
+    checkpoint = str(tmp_path / "upload.checkpoint")
+    attempts = []
+    fail = {"txn_1", "txn_4"}
+    
+    async def upload(transaction_id, path):
+        attempts.append(transaction_id)
+        if transaction_id in fail:
+            raise RuntimeError("network down")
+        return {}
+    
+    items = [("txn_{}".format(i), path) for i, path in enumerate(receipt_files)]
+    first = await BulkReceiptUploader(upload, checkpoint_path=checkpoint).run(items)
+    assert len(first.failed) == 2
+    
+    fail.clear()
+    attempts.clear()
+    second = await BulkReceiptUploader(upload, checkpoint_path=checkpoint).run(items)
+    
+    assert sorted(attempts) == ["txn_1", "txn_4"]
+    assert len(second.skipped) == 4
+    assert {result.status for result in second.results} == {UPLOADED, SKIPPED}
+    assert FAILED not in {result.status for result in second.results}
@@ -1,6 +1,7 @@
 """
 Unit tests for the ResponseGenerator class.
 """
+import asyncio
 import pytest
 from datetime import datetime, timedelta
 from src.response_generator import ResponseGenerator
@@ -59,6 +60,13 @@ def test_format_transaction_summary_with_transactions(response_generator, sample
     assert "Food" in summary
     assert "$225.00" in summary  # Total remains the same as filtering is only for display
 
+def test_format_transaction_summary_with_spending_frame(response_generator, sample_transactions):
+    """Test that a columnar SpendingFrame is summarized like a list of transactions."""
+    from src.spending_aggregation import SpendingFrame
+    
+    summary = response_generator.format_transaction_summary(SpendingFrame.from_transactions(sample_transactions))
+    assert "$225.00" in summary
+
 def test_format_transaction_summary_without_transactions(response_generator):
     """Test formatting transaction summary without transactions."""
     summary = response_generator.format_transaction_summary([])
@@ -114,4 +122,56 @@ def test_format_expense_category_list_without_categories(response_generator):
     """Test formatting expense category list without categories."""
     list_str = response_generator.format_expense_category_list([])
     assert isinstance(list_str, str)
-    assert "don't have any expense categories" in list_str 
\ No newline at end of file
+    assert "don't have any expense categories" in list_str 
+
+@pytest.mark.asyncio
+async def test_stream_transaction_list_speaks_before_the_stream_ends(response_generator):
+    """Test that the first sentences are yielded before later transactions arrive."""
+    release = asyncio.Event()
+    
+    async def transactions():
+        yield {"amount": 1250, "description": "Coffee Shop", "date": "2024-01-02"}
+        await release.wait()
+        for i in range(6):
+            yield {"amount": 100, "description": "Item {}".format(i), "date": "2024-01-03"}
+    
+    stream = response_generator.stream_transaction_list(transactions(), total=7)
+    assert await stream.__anext__() == "Here are your recent transactions:"
+    assert await stream.__anext__() == "$12.50 for Coffee Shop on 2024-01-02."
+    
+    release.set()
+    rest = [sentence async for sentence in stream]
+    assert len(rest) == 5
+    assert rest[-1] == "And 2 more transactions."
+
+@pytest.mark.asyncio
+async def test_stream_transaction_list_closes_the_stream_after_the_limit(response_generator):
+    """Test that no more than one transaction past the limit is read and the source is closed."""
+    read = []
+    closed = asyncio.Event()
+    
+    async def transactions():
+        try:
+            for i in range(100):
+                read.append(i)
+                yield {"amount": 100, "description": "Item {}".format(i), "date": "2024-01-03"}
+        finally:
+            closed.set()
+    
+    sentences = [sentence async for sentence in response_generator.stream_transaction_list(transactions(), limit=2)]
+    
+    assert read == [0, 1, 2]
+    assert closed.is_set()
+    assert sentences[-1] == "There are more transactions."
+
+@pytest.mark.asyncio
+async def test_streams_match_formatted_responses(response_generator, sample_transactions, sample_virtual_cards):
+    """Test that joining a stream gives the same text as the format_* method."""
+    sentences = [sentence async for sentence in response_generator.stream_transaction_list(sample_transactions, limit=2)]
+    assert " ".join(sentences) == response_generator.format_transaction_list(sample_transactions, limit=2)
+    
+    sentences = [sentence async for sentence in response_generator.stream_virtual_card_list(sample_virtual_cards)]
+    assert " ".join(sentences) == response_generator.format_virtual_card_list(sample_virtual_cards)
+    
+    sentences = [sentence async for sentence in response_generator.stream_transaction_list([])]
+    assert sentences == ["I couldn't find any transactions matching your criteria."]
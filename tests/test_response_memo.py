@@ -0,0 +1,45 @@
+"""
+Unit tests for the ResponseMemo class.
+"""
+from src.intent_router import IntentRouter
+from src.response_memo import ResponseMemo, memo_key
+
+def test_rephrasings_share_a_key():
+    """Test that commands routing to the same intent, slots and filters share a key."""
+    router = IntentRouter()
+    filters = {"startDate": "2024-01-01", "endDate": "2024-01-01"}
+    first = router.route("how much did i spend today")
+    second = router.route("how much have i spent today")
+    listing = router.route("show my transactions today")
+    
+    assert memo_key("transactions", first, filters) == memo_key("transactions", second, dict(reversed(list(filters.items()))))
+    assert memo_key("transactions", first, filters) != memo_key("transactions", listing, filters)
+
+def test_answers_are_keyed_by_data_version():
+    """Test that a new data version misses and the old answer is not returned."""
+    memo = ResponseMemo()
+    memo.set("key", (0, 1), ["You spent $1.00 today."])
+    
+    assert memo.get("key", (0, 1)) == ("You spent $1.00 today.",)
+    assert memo.get("key", (0, 2)) is None
+    assert memo.stats() == {"hits": 1, "misses": 1, "size": 1, "evictions": 0, "hit_ratio": 0.5}
+
+def test_answers_expire_after_ttl(clock):
+    """Test that remembered answers are only reused within the TTL."""
+    memo = ResponseMemo(ttl=30, clock=clock)
+    memo.set("key", 0, ["Hello."])
+    
+    clock.now = 29
+    assert memo.get("key", 0) == ("Hello.",)
+    clock.now = 31
+    assert memo.get("key", 0) is None
+
+def test_least_recently_used_answers_are_dropped():
+    """Test that the memo stays within its size bound."""
+    memo = ResponseMemo(max_size=2)
+    for key in ("a", "b", "c"):
+        memo.set(key, 0, [key])
+    
+    assert len(memo) == 2
+    assert memo.get("a", 0) is None
+    assert memo.stats()["evictions"] == 1
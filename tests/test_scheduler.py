@@ -0,0 +1,199 @@
+"""
+Unit tests for the RequestScheduler class, run against a local fake server.
+"""
+import asyncio
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from src.scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    RequestScheduler,
+    TokenBucket,
+    background_lane,
+    retry_after_seconds,
+    status_code,
+)
+
+class FakeExtendServer:
+    """Local HTTP server that replays a scripted list of statuses."""
+    def __init__(self, statuses, retry_after=None, delay=0):
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def handle(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            status = self.statuses.pop(0) if self.statuses else 200
+            headers = {}
+            if status == 429 and self.retry_after is not None:
+                headers["Retry-After"] = self.retry_after
+            return web.json_response({"ok": status == 200}, status=status, headers=headers)
+        finally:
+            self.in_flight -= 1
+
+@pytest_asyncio.fixture
+async def fake_server():
+    """Start a fake server and an HTTP session pointed at it."""
+    servers = []
+    sessions = []
+    
+    async def start(*args, **kwargs):
+        fake = FakeExtendServer(*args, **kwargs)
+        app = web.Application()
+        app.router.add_get("/transactions", fake.handle)
+        server = TestServer(app)
+        await server.start_server()
+        session = aiohttp.ClientSession()
+        servers.append(server)
+        sessions.append(session)
+        
+        async def call():
+            async with session.get(server.make_url("/transactions")) as response:
+                response.raise_for_status()
+                return await response.json()
+        
+        return fake, call
+    
+    yield start
+    for session in sessions:
+        await session.close()
+    for server in servers:
+        await server.close()
+
+def test_status_code_and_retry_after_from_exceptions():
+    """Test extracting status and Retry-After from HTTP client errors."""
+    error = aiohttp.ClientResponseError(None, (), status=429, headers={"Retry-After": "2"})
+    
+    assert status_code(error) == 429
+    assert retry_after_seconds(error) == 2.0
+    assert status_code(RuntimeError("boom")) is None
+    assert retry_after_seconds(RuntimeError("boom")) is None
+
+def test_token_bucket_pause():
+    """Test that a paused bucket hands out no tokens until the pause ends."""
+    now = [0.0]
+    bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+    
+    assert bucket.try_acquire() == 0
+    bucket.pause(1.0)
+    assert bucket.try_acquire() == pytest.approx(1.0)
+    now[0] = 1.0
+    assert bucket.try_acquire() == pytest.approx(0.1)
+    now[0] = 1.1
+    assert bucket.try_acquire() == 0
+
+@pytest.mark.asyncio
+async def test_retries_throttled_request_after_retry_after(fake_server):
+    """Test that a 429 pauses the bucket for Retry-After and then succeeds."""
+    fake, call = await fake_server([429], retry_after="0.05")
+    scheduler = RequestScheduler()
+    loop = asyncio.get_running_loop()
+    
+    started = loop.time()
+    assert await scheduler.submit("transactions", call) == {"ok": True}
+    
+    assert loop.time() - started >= 0.05
+    assert fake.requests == 2
+    assert scheduler.stats()["throttled"] == 1
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors_for_idempotent_reads(fake_server):
+    """Test that 5xx responses are retried with backoff for idempotent calls."""
+    fake, call = await fake_server([503, 502])
+    scheduler = RequestScheduler(base_delay=0.001)
+    
+    assert await scheduler.submit("transactions", call) == {"ok": True}
+    assert fake.requests == 3
+    assert scheduler.stats()["retries"] == 2
+
+@pytest.mark.asyncio
+async def test_does_not_retry_non_idempotent_calls(fake_server):
+    """Test that writes surface transient errors instead of retrying."""
+    fake, call = await fake_server([503])
+    scheduler = RequestScheduler(base_delay=0.001)
+    
+    with pytest.raises(aiohttp.ClientResponseError):
+        await scheduler.submit("transactions", call, idempotent=False)
+    assert fake.requests == 1
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries(fake_server):
+    """Test that persistent failures are raised once retries are exhausted."""
+    fake, call = await fake_server([500] * 10)
+    scheduler = RequestScheduler(base_delay=0.001, max_retries=2)
+    
+    with pytest.raises(aiohttp.ClientResponseError):
+        await scheduler.submit("transactions", call)
+    assert fake.requests == 3
+    assert scheduler.stats()["failures"] == 1
+
+@pytest.mark.asyncio
+async def test_endpoint_concurrency_limit(fake_server):
+    """Test that no more than the endpoint limit run at once."""
+    fake, call = await fake_server([], delay=0.02)
+    scheduler = RequestScheduler(endpoint_limits={"transactions": 2})
+    
+    await asyncio.gather(*(scheduler.submit("transactions", call) for _ in range(6)))
+    
+    assert fake.requests == 6
+    assert fake.max_in_flight == 2
+
+@pytest.mark.asyncio
+async def test_interactive_requests_are_admitted_before_background():
+    """Test that queued interactive requests go ahead of queued background ones."""
+    scheduler = RequestScheduler(max_concurrency=1, background_share=1.0)
+    order = []
+    release = asyncio.Event()
+    
+    async def blocker():
+        await release.wait()
+    
+    def record(name):
+        async def call():
+            order.append(name)
+        return call
+    
+    holding = asyncio.ensure_future(scheduler.submit("a", blocker))
+    await asyncio.sleep(0)
+    background = asyncio.ensure_future(scheduler.submit("b", record("background"), priority=PRIORITY_BACKGROUND))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(scheduler.submit("c", record("interactive"), priority=PRIORITY_INTERACTIVE))
+    await asyncio.sleep(0)
+    
+    release.set()
+    await asyncio.gather(holding, background, interactive)
+    
+    assert order == ["interactive", "background"]
+
+@pytest.mark.asyncio
+async def test_background_lane_is_capped():
+    """Test that background requests cannot take every slot."""
+    scheduler = RequestScheduler(max_concurrency=2, background_share=0.5)
+    release = asyncio.Event()
+    running = []
+    
+    async def call():
+        running.append(1)
+        await release.wait()
+    
+    with background_lane():
+        tasks = [asyncio.ensure_future(scheduler.submit("a{}".format(i), call)) for i in range(3)]
+    await asyncio.sleep(0.01)
+    assert len(running) == 1
+    
+    interactive = asyncio.ensure_future(scheduler.submit("b", call))
+    await asyncio.sleep(0.01)
+    assert len(running) == 2
+    
+    release.set()
+    await asyncio.gather(interactive, *tasks)
@@ -0,0 +1,86 @@
+"""
+Unit tests for the SessionManager class.
+"""
+import asyncio
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+from src.extend_integration import ExtendIntegration
+from src.session_manager import SessionLimitError, SessionManager
+
+def make_integration(mock_extend_client, cards):
+    """Build a real ExtendIntegration over a mocked Extend client."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+    integration.client = mock_extend_client
+    mock_extend_client.virtual_cards.get_virtual_cards.return_value = {"virtualCards": cards}
+    mock_extend_client.expense_management.get_expense_categories.return_value = {"expenseCategories": []}
+    return integration
+
+def make_cards(count):
+    """Build cards with distinct last four digits."""
+    return [{"id": "vc_{}".format(i), "lastFour": "{:04d}".format(1000 + i), "balance": 100 * i} for i in range(count)]
+
+@pytest.mark.asyncio
+async def test_calls_keep_their_own_conversation(mock_extend_client):
+    """Test that paging through cards on one call does not move another call's place."""
+    sessions = SessionManager(make_integration(mock_extend_client, make_cards(12)))
+    
+    first = await sessions.process_command("call_a", "List my virtual cards")
+    await sessions.process_command("call_a", "Next five cards")
+    other = await sessions.process_command("call_b", "List my virtual cards")
+    third = await sessions.process_command("call_a", "Next five cards")
+    
+    assert other == first
+    assert third.startswith("Cards 11 to 12 of 12.")
+    assert sessions.get("call_a").processor is not sessions.get("call_b").processor
+    assert sessions.get("call_a").turns == 3
+
+@pytest.mark.asyncio
+async def test_many_concurrent_calls_share_one_fetch(mock_extend_client):
+    """Test that hundreds of simultaneous callers are served by one API request."""
+    integration = make_integration(mock_extend_client, make_cards(3))
+    
+    async def slow_cards():
+        await asyncio.sleep(0.01)
+        return {"virtualCards": make_cards(3)}
+    
+    mock_extend_client.virtual_cards.get_virtual_cards.side_effect = slow_cards
+    sessions = SessionManager(integration)
+    
+    responses = await asyncio.gather(*(
+        sessions.process_command("call_{}".format(i), "List my virtual cards") for i in range(300)
+    ))
+    
+    assert len(sessions) == 300
+    assert all(response.startswith("You have 3 virtual cards.") for response in responses)
+    assert mock_extend_client.virtual_cards.get_virtual_cards.call_count == 1
+
+def test_capacity_limit_and_idle_reaping(clock):
+    """Test that new calls are refused at capacity until idle ones are reaped."""
+    sessions = SessionManager(MagicMock(), max_sessions=2, idle_timeout=60, speculate=False, clock=clock)
+    sessions.open("call_a")
+    sessions.open("call_b")
+    
+    with pytest.raises(SessionLimitError):
+        sessions.open("call_c")
+    
+    clock.now = 30
+    sessions.open("call_b")
+    clock.now = 70
+    assert sessions.open("call_c").call_id == "call_c"
+    assert "call_a" not in sessions
+    assert sessions.stats() == {"active": 2, "opened": 3, "closed": 1, "reaped": 1, "rejected": 1}
+
+def test_close_cancels_speculation():
+    """Test that ending a call abandons its speculative fetch."""
+    sessions = SessionManager(MagicMock())
+    session = sessions.open("call_a")
+    session.speculation = MagicMock()
+    
+    assert sessions.close("call_a")
+    assert not sessions.close("call_a")
+    session.speculation.cancel.assert_called_once()
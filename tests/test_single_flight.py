@@ -0,0 +1,128 @@
+"""
+Unit tests for the SingleFlight class.
+"""
+import asyncio
+import pytest
+from src.scheduler import RequestScheduler, background_lane
+from src.single_flight import SingleFlight, request_key
+
+def test_request_key_normalizes_filters():
+    """Test that ordering and unset values do not change the key."""
+    first = request_key("transactions", {"startDate": "2024-03-01", "endDate": "2024-03-31", "category": None})
+    second = request_key("transactions", {"endDate": "2024-03-31", "startDate": "2024-03-01"})
+    
+    assert first == second
+    assert request_key("transactions") == request_key("transactions", {})
+    assert request_key("transactions", {"status": ["PENDING"]}) == ("transactions", (("status", ("PENDING",)),))
+    assert request_key("virtual_cards") != request_key("transactions")
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_flight():
+    """Test that concurrent callers with the same key share a single call."""
+    single_flight = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+    
+    async def fetch():
+        calls.append(1)
+        await release.wait()
+        return "result"
+    
+    waiters = [asyncio.ensure_future(single_flight.do("key", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    
+    assert await asyncio.gather(*waiters) == ["result"] * 5
+    assert len(calls) == 1
+    assert single_flight.stats() == {"in_flight": 0, "started": 1, "coalesced": 4}
+
+@pytest.mark.asyncio
+async def test_completed_flight_is_not_reused():
+    """Test that calls after completion start a new flight."""
+    single_flight = SingleFlight()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+    
+    assert await single_flight.do("key", fetch) == 1
+    assert await single_flight.do("key", fetch) == 2
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_waiter():
+    """Test that a failing call raises for every caller sharing it."""
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+    
+    async def fetch():
+        await release.wait()
+        raise RuntimeError("upstream failed")
+    
+    waiters = [asyncio.ensure_future(single_flight.do("key", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_keeps_the_flight_alive():
+    """Test that the shared call is only cancelled when every waiter is gone."""
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+    cancelled = asyncio.Event()
+    
+    async def fetch():
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "result"
+    
+    first = asyncio.ensure_future(single_flight.do("key", fetch))
+    second = asyncio.ensure_future(single_flight.do("key", fetch))
+    await asyncio.sleep(0)
+    
+    first.cancel()
+    await asyncio.sleep(0)
+    assert not cancelled.is_set()
+    
+    second.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert len(single_flight) == 0
+
+@pytest.mark.asyncio
+async def test_interactive_caller_raises_a_background_flight():
+    """Test that a background flight joined by an interactive caller goes ahead of other background work."""
+    single_flight = SingleFlight()
+    scheduler = RequestScheduler(max_concurrency=1, background_share=1.0)
+    order = []
+    release = asyncio.Event()
+    
+    async def blocker():
+        await release.wait()
+    
+    def record(name):
+        async def call():
+            order.append(name)
+            return name
+        return call
+    
+    holding = asyncio.ensure_future(scheduler.submit("a", blocker))
+    await asyncio.sleep(0)
+    with background_lane():
+        other = asyncio.ensure_future(scheduler.submit("c", record("other")))
+        await asyncio.sleep(0)
+        warm_up = asyncio.ensure_future(single_flight.do("cards", lambda: scheduler.submit("b", record("cards"))))
+    await asyncio.sleep(0)
+    turn = asyncio.ensure_future(single_flight.do("cards", lambda: scheduler.submit("b", record("cards"))))
+    await asyncio.sleep(0)
+    
+    release.set()
+    assert await asyncio.gather(warm_up, turn) == ["cards", "cards"]
+    await asyncio.gather(holding, other)
+    
+    assert order == ["cards", "other"]
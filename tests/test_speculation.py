@@ -0,0 +1,102 @@
+"""
+Unit tests for speculative execution on partial transcripts.
+"""
+import asyncio
+import os
+import pytest
+from unittest.mock import patch
+from src.command_processor import CommandProcessor
+from src.extend_integration import ExtendIntegration
+from src.speculation import SpeculativeExecutor
+
+@pytest.fixture
+def integration(mock_extend_client, sample_expense_categories):
+    """Create an integration whose Extend client is mocked."""
+    with patch.dict(os.environ, {
+        'EXTEND_API_KEY': 'test_api_key',
+        'EXTEND_API_SECRET': 'test_api_secret'
+    }):
+        integration = ExtendIntegration()
+    integration.client = mock_extend_client
+    mock_extend_client.expense_management.get_expense_categories.return_value = {
+        "expenseCategories": sample_expense_categories
+    }
+    return integration
+
+@pytest.mark.asyncio
+async def test_matching_final_transcript_reuses_speculative_fetch(integration, mock_extend_client):
+    """Test that the handler joins the fetch started from the partial transcript."""
+    async def get_transactions(filters):
+        await asyncio.sleep(0.05)
+        return {"report": {"transactions": [{"amount": 4200}], "pagination": {"numberOfPages": 1}}}
+    
+    mock_extend_client.transactions.get_transactions.side_effect = get_transactions
+    executor = SpeculativeExecutor(CommandProcessor(integration))
+    
+    await executor.on_partial("how much did I spend this month")
+    await asyncio.sleep(0.01)
+    response = await executor.on_final("How much did I spend this month?")
+    
+    assert response.startswith("You spent $42.00 this month")
+    assert mock_extend_client.transactions.get_transactions.call_count == 1
+    assert executor.stats()["committed"] == 1
+    assert executor.stats()["hit_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_different_final_transcript_cancels_speculative_fetch(integration, mock_extend_client):
+    """Test that a fetch the final command does not need is cancelled and counted as wasted."""
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+    
+    async def get_virtual_cards():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    mock_extend_client.virtual_cards.get_virtual_cards.side_effect = get_virtual_cards
+    mock_extend_client.transactions.get_transactions.return_value = {
+        "report": {"transactions": [{"amount": 100}], "pagination": {"numberOfPages": 1}}
+    }
+    executor = SpeculativeExecutor(CommandProcessor(integration))
+    
+    await executor.on_partial("show my virtual cards")
+    await asyncio.wait_for(started.wait(), 1)
+    response = await executor.on_final("How much did I spend on my cards today?")
+    
+    await asyncio.wait_for(cancelled.wait(), 1)
+    stats = executor.stats()
+    assert stats["wasted"] == 1
+    assert stats["cancelled"] == 1
+    assert stats["unpredicted"] == 1
+    assert response.startswith("You spent $1.00 today")
+
+@pytest.mark.asyncio
+async def test_weak_or_unbounded_partials_are_not_speculated(integration, mock_extend_client):
+    """Test that low-confidence partials and open-ended transaction queries start nothing."""
+    executor = SpeculativeExecutor(CommandProcessor(integration))
+    
+    await executor.on_partial("how much")
+    await executor.on_partial("how much did I spend")
+    
+    assert executor.stats()["started"] == 0
+    mock_extend_client.transactions.get_transactions.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_refined_partial_switches_speculation(integration, mock_extend_client):
+    """Test that a partial that narrows the filters replaces the earlier speculation."""
+    mock_extend_client.transactions.get_transactions.return_value = {
+        "report": {"transactions": [], "pagination": {"numberOfPages": 1}}
+    }
+    executor = SpeculativeExecutor(CommandProcessor(integration))
+    
+    await executor.on_partial("what did I spend this month")
+    await executor.on_partial("what did I spend this month on travel")
+    await executor.on_partial("what did I spend this month on travel")
+    await executor.on_final("What did I spend this month on travel?")
+    
+    assert executor.stats() == {
+        "started": 2, "committed": 1, "wasted": 1, "cancelled": 1, "unpredicted": 0, "hit_rate": 0.5
+    }
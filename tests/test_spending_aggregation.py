@@ -0,0 +1,115 @@
+"""
+Unit tests for the columnar spending aggregation engine.
+"""
+import numpy as np
+import pytest
+from datetime import datetime
+from src.spending_aggregation import SpendingFrame, SpendingFrameBuilder, SpendingGroup
+
+TRANSACTIONS = [
+    {"amount": 1500, "date": "2024-03-04T09:00:00Z", "category": "Meals", "merchant": "Cafe", "virtualCardId": "vc_1"},
+    {"amount": 30000, "date": "2024-03-05", "category": "Travel", "merchantName": "United", "virtualCardId": "vc_2"},
+    {"amount": 2500, "date": "2024-03-10", "category": "Meals", "merchant": "Cafe", "virtualCardId": "vc_1"},
+    {"amount": 12000, "date": "2024-03-11", "category": "Travel", "merchant": "Hilton", "virtualCardId": "vc_2"},
+    {"amount": 800, "date": datetime(2024, 3, 12, 18, 30), "merchant": "Kiosk", "virtualCardId": "vc_1"},
+]
+
+@pytest.fixture
+def frame():
+    """Build a frame over a handful of transactions."""
+    return SpendingFrame.from_transactions(TRANSACTIONS)
+
+def test_total_and_count(frame):
+    """Test vectorized total and count."""
+    assert frame.total() == 46800
+    assert frame.count() == len(frame) == 5
+
+def test_columns_are_dictionary_encoded(frame):
+    """Test that repeated strings are stored once and referenced by code."""
+    assert frame.labels["merchant"] == ["Cafe", "United", "Hilton", "Kiosk"]
+    assert frame.codes["merchant"].tolist() == [0, 1, 0, 2, 3]
+    assert frame.codes["category"].dtype == np.int32
+    assert frame.amounts.dtype == np.int64
+
+def test_group_by_category(frame):
+    """Test grouping by category, largest total first, with missing values grouped as None."""
+    assert frame.group_by("category") == [
+        SpendingGroup("Travel", 42000, 2),
+        SpendingGroup("Meals", 4000, 2),
+        SpendingGroup(None, 800, 1),
+    ]
+
+def test_reversed_transactions_are_not_spending():
+    """Test that transactions the rollups exclude are skipped by both builder paths."""
+    reversed_row = dict(TRANSACTIONS[0], status="REVERSED")
+    builder = SpendingFrameBuilder()
+    builder.append(reversed_row)
+    builder.append(TRANSACTIONS[1])
+    
+    assert builder.build().total() == 30000
+    assert SpendingFrame.from_transactions([reversed_row, TRANSACTIONS[1]]).total() == 30000
+
+def test_group_by_card(frame):
+    """Test grouping by virtual card."""
+    assert [(group.label, group.total) for group in frame.group_by("card")] == [("vc_2", 42000), ("vc_1", 4800)]
+
+def test_group_by_week(frame):
+    """Test grouping by Monday-based week."""
+    assert frame.group_by("week") == [
+        SpendingGroup("2024-03-04", 34000, 3),
+        SpendingGroup("2024-03-11", 12800, 2),
+    ]
+
+def test_top_k(frame):
+    """Test that top_k returns only the largest groups, in order."""
+    assert [group.label for group in frame.top_k("merchant", 2)] == ["United", "Hilton"]
+    assert len(frame.top_k("merchant", 10)) == 4
+
+def test_largest_transactions(frame):
+    """Test the positions of the largest transactions."""
+    assert frame.largest(2).tolist() == [1, 3]
+
+def test_between_filters_by_date(frame):
+    """Test inclusive date filtering."""
+    subset = frame.between("2024-03-05", "2024-03-10")
+    
+    assert subset.total() == 32500
+    assert subset.group_by("merchant")[0].label == "United"
+
+def test_unknown_group_key(frame):
+    """Test that an unsupported key is rejected."""
+    with pytest.raises(ValueError):
+        frame.group_by("color")
+
+def test_builder_accepts_pages():
+    """Test building a frame page by page, including an empty frame."""
+    builder = SpendingFrameBuilder()
+    assert len(builder.build()) == 0
+    assert builder.build().group_by("week") == []
+    
+    builder.append(TRANSACTIONS[0])
+    builder.extend(TRANSACTIONS[1:3])
+    for transaction in TRANSACTIONS[3:]:
+        builder.append(transaction)
+    
+    assert len(builder) == 5
+    frame = builder.build()
+    assert frame.total() == 46800
+    assert frame.labels["merchant"] == ["Cafe", "United", "Hilton", "Kiosk"]
+
+def test_large_frame_matches_python_totals():
+    """Test vectorized group-by against a plain Python reduction over many rows."""
+    rng = np.random.default_rng(7)
+    amounts = rng.integers(1, 50000, size=100000)
+    categories = ["cat_{}".format(code) for code in rng.integers(0, 40, size=100000)]
+    transactions = [
+        {"amount": int(amount), "date": "2024-01-01", "category": category}
+        for amount, category in zip(amounts, categories)
+    ]
+    expected = {}
+    for transaction in transactions:
+        expected[transaction["category"]] = expected.get(transaction["category"], 0) + transaction["amount"]
+    
+    groups = SpendingFrame.from_transactions(transactions).group_by("category")
+    
+    assert {group.label: group.total for group in groups} == expected
@@ -0,0 +1,67 @@
+"""
+Unit tests for the SpendingRollups class.
+"""
+import pytest
+from src.spending_rollups import SpendingRollups
+
+TRANSACTIONS = [
+    {"id": "txn_1", "amount": 1000, "date": "2024-03-01T10:00:00Z", "category": "Travel", "virtualCardId": "vc_1"},
+    {"id": "txn_2", "amount": 2000, "date": "2024-03-01", "category": "Meals", "virtualCardId": "vc_2"},
+    {"id": "txn_3", "amount": 4000, "date": "2024-03-05", "category": "travel", "virtualCardId": "vc_2"},
+    {"id": "txn_4", "amount": 8000, "date": "2024-04-02", "category": "Travel", "virtualCardId": "vc_1"},
+]
+
+@pytest.fixture
+def rollups():
+    """Create rollups over a few transactions."""
+    rollups = SpendingRollups()
+    rollups.apply(TRANSACTIONS)
+    return rollups
+
+def test_range_totals(rollups):
+    """Test totals and counts over inclusive date ranges."""
+    assert rollups.summarize("2024-03-01", "2024-03-31") == (7000, 3)
+    assert rollups.summarize("2024-03-02", "2024-04-02") == (12000, 2)
+    assert rollups.summarize("2024-05-01", "2024-05-31") == (0, 0)
+
+def test_category_and_card_filters(rollups):
+    """Test that category (case-insensitive) and card filters use the per-cell totals."""
+    assert rollups.summarize("2024-03-01", "2024-03-31", category="Travel") == (5000, 2)
+    assert rollups.summarize("2024-03-01", "2024-04-30", card_id="vc_1") == (9000, 2)
+    assert rollups.summarize("2024-03-01", "2024-04-30", category="travel", card_id="vc_2") == (4000, 1)
+
+def test_amount_change_is_corrected(rollups):
+    """Test that a new version of a transaction replaces its old contribution."""
+    version = rollups.version
+    rollups.apply([dict(TRANSACTIONS[0], amount=1500)])
+    
+    assert rollups.summarize("2024-03-01", "2024-03-01") == (3500, 2)
+    assert rollups.version == version + 1
+
+def test_moved_transaction_leaves_old_day(rollups):
+    """Test that changing a transaction's date or category moves its contribution."""
+    rollups.apply([dict(TRANSACTIONS[1], date="2024-03-05", category="Travel")])
+    
+    assert rollups.summarize("2024-03-01", "2024-03-01") == (1000, 1)
+    assert rollups.summarize("2024-03-05", "2024-03-05", category="travel") == (6000, 2)
+
+def test_reversal_removes_contribution(rollups):
+    """Test that reversed or declined transactions stop counting."""
+    rollups.apply([dict(TRANSACTIONS[3], status="REVERSED")])
+    
+    assert rollups.summarize("2024-04-01", "2024-04-30") == (0, 0)
+    assert len(rollups) == 3
+
+def test_unchanged_transaction_is_a_no_op(rollups):
+    """Test that re-applying identical data does not change the version."""
+    version = rollups.version
+    rollups.apply(TRANSACTIONS)
+    
+    assert rollups.version == version
+    assert rollups.summarize("2024-01-01", "2024-12-31") == (15000, 4)
+
+def test_remove(rollups):
+    """Test removing transactions by id, including unknown ids."""
+    rollups.remove(["txn_2", "txn_missing"])
+    
+    assert rollups.summarize("2024-03-01", "2024-03-01") == (1000, 1)
@@ -0,0 +1,85 @@
+"""
+Unit tests for the TimePeriodParser class.
+"""
+import pytest
+from datetime import date
+from src.time_periods import TimePeriodParser, month_end
+
+TODAY = date(2024, 3, 15)  # A Friday in a leap year
+
+@pytest.fixture
+def parser():
+    """Create a parser with a fixed clock."""
+    return TimePeriodParser(clock=lambda: TODAY)
+
+def period(parser, command, today=None):
+    result = parser.parse(command, today)
+    return result and (result["start_date"], result["end_date"], result["description"])
+
+@pytest.mark.parametrize("command, expected", [
+    ("how much today", ("2024-03-15", "2024-03-15", "today")),
+    ("spending yesterday", ("2024-03-14", "2024-03-14", "yesterday")),
+    ("this week", ("2024-03-11", "2024-03-15", "this week")),
+    ("last week", ("2024-03-04", "2024-03-10", "last week")),
+    ("this month", ("2024-03-01", "2024-03-15", "this month")),
+    ("last month", ("2024-02-01", "2024-02-29", "last month")),
+    ("in the last 7 days", ("2024-03-09", "2024-03-15", "in the last 7 days")),
+    ("over the past thirty days", ("2024-02-15", "2024-03-15", "in the last 30 days")),
+    ("this quarter", ("2024-01-01", "2024-03-15", "this quarter")),
+    ("last quarter", ("2023-10-01", "2023-12-31", "last quarter")),
+    ("in Q1", ("2024-01-01", "2024-03-15", "in Q1")),
+    ("third quarter", ("2023-07-01", "2023-09-30", "in Q3 2023")),
+    ("q2 2022", ("2022-04-01", "2022-06-30", "in Q2 2022")),
+    ("year to date", ("2024-01-01", "2024-03-15", "this year")),
+    ("last year", ("2023-01-01", "2023-12-31", "last year")),
+    ("in february", ("2024-02-01", "2024-02-29", "in February")),
+    ("in december", ("2023-12-01", "2023-12-31", "in December 2023")),
+    ("since january", ("2024-01-01", "2024-03-15", "since January")),
+    ("for may 2023", ("2023-05-01", "2023-05-31", "in May 2023")),
+])
+def test_parses_periods(parser, command, expected):
+    """Test that each supported phrase resolves to the right inclusive range."""
+    assert period(parser, command) == expected
+
+@pytest.mark.parametrize("today, expected", [
+    (date(2024, 1, 10), ("2023-12-01", "2023-12-31")),
+    (date(2023, 3, 31), ("2023-02-01", "2023-02-28")),
+    (date(2024, 5, 31), ("2024-04-01", "2024-04-30")),
+])
+def test_last_month_uses_real_month_lengths(parser, today, expected):
+    """Test that last month covers whole calendar months across years and leap years."""
+    assert period(parser, "last month", today)[:2] == expected
+
+def test_ambiguous_month_needs_context(parser):
+    """Test that "may" only counts as a month with a preposition or year."""
+    assert parser.parse("may I see my spending") is None
+    assert period(parser, "may I see my spending in march")[2] == "in March"
+
+def test_no_period(parser):
+    """Test that commands without a period return None."""
+    assert parser.parse("show my transactions") is None
+
+def test_out_of_range_periods_are_ignored(parser):
+    """Test that day counts and years outside the calendar yield no period instead of raising."""
+    assert parser.parse("spending in the past 1000000 days") is None
+    assert parser.parse("spending in q1 0000") is None
+    assert period(parser, "spending in the past 1000000 days in march")[2] == "in March"
+
+def test_ranges_are_cached_per_day():
+    """Test that ranges are resolved once per day and re-resolved when the date changes."""
+    days = [date(2024, 3, 15)]
+    parser = TimePeriodParser(clock=lambda: days[0])
+    
+    first = parser.parse("this month")
+    first["start_date"] = "mutated"
+    assert parser.parse("spent this   month")["start_date"] == "2024-03-01"
+    assert len(parser._ranges) == 1
+    
+    days[0] = date(2024, 4, 2)
+    assert parser.parse("this month")["start_date"] == "2024-04-01"
+
+def test_month_end():
+    """Test month end dates including February in leap and common years."""
+    assert month_end(2024, 2) == date(2024, 2, 29)
+    assert month_end(2023, 2) == date(2023, 2, 28)
+    assert month_end(2023, 12) == date(2023, 12, 31)
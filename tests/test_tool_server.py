@@ -0,0 +1,276 @@
+"""
+Unit tests for the ToolServer class, driven by a local stand-in for Vapi.
+"""
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+from unittest.mock import AsyncMock, MagicMock
+from src.metrics import Metrics
+from src.session_manager import SessionManager
+from src.tool_server import ToolServer, tool_definitions
+
+def make_sessions(**kwargs):
+    """Build a SessionManager whose calls get stand-in processors over a mocked integration."""
+    integration = MagicMock()
+    integration.get_virtual_cards = AsyncMock(return_value=[{"id": "vc_1", "lastFour": "1234"}])
+    integration.handle_event = MagicMock(return_value=("transactions",))
+    integration.get_cache_stats = MagicMock(return_value={"hits": 4, "hit_ratio": 0.5})
+    integration.single_flight.stats = MagicMock(return_value={"coalesced": 2})
+    integration.scheduler.stats = MagicMock(return_value={"queued": 0})
+    
+    def make_processor(integration):
+        processor = MagicMock()
+        processor.extend_integration = integration
+        processor.process_command = AsyncMock(side_effect=lambda command: "You asked: {}".format(command))
+        return processor
+    
+    return SessionManager(integration, speculate=False, processor_factory=make_processor, **kwargs)
+
+def tool_calls(*calls, call_id="call_a"):
+    """Build a Vapi tool-calls message from one call."""
+    return {"type": "tool-calls", "call": {"id": call_id}, "toolCallList": list(calls)}
+
+def tool_call(call_id, name, arguments):
+    """Build a Vapi tool-call entry."""
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+
+class VapiStandIn:
+    """Posts Vapi server messages to a running tool server over one keep-alive session."""
+    def __init__(self, server, secret=None):
+        self.server = server
+        self.headers = {"X-Vapi-Secret": secret} if secret else {}
+        self.session = ClientSession()
+    
+    async def send(self, message, path="/vapi", headers=None):
+        body = {"message": message} if path == "/vapi" else message
+        async with self.session.post(self.server.make_url(path), json=body, headers=headers or self.headers) as response:
+            return response.status, (await response.json() if response.status == 200 else None)
+    
+    async def close(self):
+        await self.session.close()
+
+@pytest_asyncio.fixture
+async def serve():
+    """Start tool servers on local ports and stop them after the test."""
+    started = []
+    
+    async def start(tool_server):
+        server = TestServer(tool_server.build_app())
+        await server.start_server()
+        vapi = VapiStandIn(server, tool_server.secret)
+        started.append((server, vapi))
+        return vapi
+    
+    yield start
+    for server, vapi in started:
+        await vapi.close()
+        await server.close()
+
+@pytest.mark.asyncio
+async def test_tool_calls_are_answered_in_order(serve):
+    """Test that each tool call's result is returned under its toolCallId."""
+    vapi = await serve(ToolServer(make_sessions()))
+    
+    status, body = await vapi.send(tool_calls(
+        tool_call("call_1", "process_command", {"command": "How much did I spend today?"}),
+        tool_call("call_2", "get_virtual_cards", "{}"),
+        tool_call("call_3", "launch_rockets", {}),
+    ))
+    
+    assert status == 200
+    assert body["results"][0] == {"toolCallId": "call_1", "result": "You asked: How much did I spend today?"}
+    assert body["results"][1]["toolCallId"] == "call_2"
+    assert json.loads(body["results"][1]["result"]) == [{"id": "vc_1", "lastFour": "1234"}]
+    assert body["results"][2] == {"toolCallId": "call_3", "error": "Unknown tool: launch_rockets"}
+
+@pytest.mark.asyncio
+async def test_tool_call_deadline(serve):
+    """Test that a slow tool call is answered with a spoken fallback at its deadline."""
+    sessions = make_sessions()
+    
+    async def slow(command):
+        await asyncio.sleep(1)
+    
+    sessions.open("call_a").processor.process_command = slow
+    vapi = await serve(ToolServer(sessions, deadline=0.05))
+    
+    status, body = await vapi.send(tool_calls(
+        tool_call("call_1", "process_command", {"command": "List my transactions"}),
+    ))
+    
+    assert status == 200
+    assert "in time" in body["results"][0]["result"]
+
+@pytest.mark.asyncio
+async def test_transcripts_drive_speculation(serve):
+    """Test that partial transcripts start prefetching and final tool calls commit it."""
+    sessions = make_sessions()
+    speculation = MagicMock()
+    speculation.on_partial = AsyncMock()
+    speculation.on_final = AsyncMock(return_value="You spent $5.00 today.")
+    sessions.open("call_a").speculation = speculation
+    vapi = await serve(ToolServer(sessions))
+    
+    call = {"id": "call_a"}
+    await vapi.send({"type": "transcript", "call": call, "role": "user", "transcriptType": "partial", "transcript": "How much did I"})
+    await vapi.send({"type": "transcript", "call": call, "role": "assistant", "transcriptType": "partial", "transcript": "Sure"})
+    status, body = await vapi.send(tool_calls(
+        tool_call("call_1", "process_command", {"command": "How much did I spend today?"}),
+    ))
+    await vapi.send({"type": "end-of-call-report", "call": call})
+    
+    speculation.on_partial.assert_awaited_once_with("How much did I")
+    speculation.on_final.assert_awaited_once_with("How much did I spend today?")
+    assert body["results"][0]["result"] == "You spent $5.00 today."
+    speculation.cancel.assert_called_once()
+    assert "call_a" not in sessions
+
+@pytest.mark.asyncio
+async def test_extend_events_reach_the_integration(serve):
+    """Test that Extend webhook events are passed to handle_event."""
+    sessions = make_sessions()
+    vapi = await serve(ToolServer(sessions, event_secret="hook"))
+    
+    status, body = await vapi.send(
+        {"type": "transaction.created", "data": {"id": "txn_1"}}, path="/extend/events", headers={"X-Webhook-Secret": "hook"}
+    )
+    
+    assert status == 200
+    assert body == {"invalidated": ["transactions"]}
+    sessions.extend_integration.handle_event.assert_called_once_with("transaction.created", {"id": "txn_1"})
+
+@pytest.mark.asyncio
+async def test_extend_events_need_the_event_secret(serve):
+    """Test that events are refused without a configured secret or with the wrong one."""
+    event = {"type": "transaction.created", "data": {"id": "txn_1", "amount": 100}}
+    unconfigured = make_sessions()
+    vapi = await serve(ToolServer(unconfigured))
+    
+    status, _ = await vapi.send(event, path="/extend/events")
+    assert status == 403
+    
+    configured = make_sessions()
+    vapi = await serve(ToolServer(configured, event_secret="hook"))
+    status, _ = await vapi.send(event, path="/extend/events", headers={"X-Webhook-Secret": "wrong"})
+    assert status == 401
+    
+    unconfigured.extend_integration.handle_event.assert_not_called()
+    configured.extend_integration.handle_event.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_secret_is_required_when_configured(serve):
+    """Test that requests without the shared secret are rejected."""
+    sessions = make_sessions()
+    vapi = await serve(ToolServer(sessions, secret="s3cret"))
+    
+    status, _ = await vapi.send(tool_calls())
+    assert status == 200
+    
+    status, _ = await vapi.send(
+        tool_calls(tool_call("call_1", "process_command", {"command": "Hi"}), call_id="call_b"),
+        headers={"X-Vapi-Secret": "wrong"}
+    )
+    assert status == 401
+    assert "call_b" not in sessions
+
+@pytest.mark.asyncio
+async def test_each_call_gets_its_own_session(serve):
+    """Test that concurrent calls are answered by separate processors."""
+    sessions = make_sessions(max_sessions=2)
+    vapi = await serve(ToolServer(sessions))
+    
+    for call_id in ("call_a", "call_b", "call_a"):
+        await vapi.send(tool_calls(tool_call("t", "process_command", {"command": call_id}), call_id=call_id))
+    status, body = await vapi.send(tool_calls(tool_call("t", "process_command", {"command": "hi"}), call_id="call_c"))
+    
+    assert sessions.get("call_a").processor.process_command.await_count == 2
+    assert sessions.get("call_b").processor.process_command.await_count == 1
+    assert "a lot of callers" in body["results"][0]["result"]
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_pending_tool_calls(serve):
+    """Test that draining refuses new requests but lets pending tool calls finish."""
+    sessions = make_sessions()
+    release = asyncio.Event()
+    
+    async def slow(command):
+        await release.wait()
+        return "Done."
+    
+    sessions.open("call_a").processor.process_command = slow
+    tool_server = ToolServer(sessions)
+    vapi = await serve(tool_server)
+    
+    pending = asyncio.ensure_future(vapi.send(tool_calls(tool_call("call_1", "process_command", {"command": "hi"}))))
+    while not tool_server.in_flight:
+        await asyncio.sleep(0.001)
+    
+    drained = asyncio.ensure_future(tool_server.drain(1))
+    await asyncio.sleep(0.01)
+    assert not drained.done()
+    status, _ = await vapi.send({"type": "status-update"})
+    assert status == 503
+    
+    release.set()
+    assert await drained
+    status, body = await pending
+    assert body["results"][0]["result"] == "Done."
+    assert await ToolServer(make_sessions()).drain(0)
+
+@pytest.mark.asyncio
+async def test_drain_gives_up_at_its_deadline(serve):
+    """Test that a drain reports the tool calls it could not wait for."""
+    sessions = make_sessions()
+    
+    async def stuck(command):
+        await asyncio.Event().wait()
+    
+    sessions.open("call_a").processor.process_command = stuck
+    tool_server = ToolServer(sessions)
+    vapi = await serve(tool_server)
+    
+    pending = asyncio.ensure_future(vapi.send(tool_calls(tool_call("call_1", "process_command", {"command": "hi"}))))
+    while not tool_server.in_flight:
+        await asyncio.sleep(0.001)
+    
+    assert not await tool_server.drain(0.01)
+    pending.cancel()
+    await asyncio.gather(pending, return_exceptions=True)
+
+@pytest.mark.asyncio
+async def test_call_end_is_reported(serve):
+    """Test that the end of a call is passed to the on_call_ended callback."""
+    ended = []
+    vapi = await serve(ToolServer(make_sessions(), on_call_ended=ended.append))
+    
+    await vapi.send({"type": "status-update", "status": "ended", "call": {"id": "call_a"}})
+    
+    assert ended == ["call_a"]
+
+@pytest.mark.asyncio
+async def test_metrics_are_served_in_prometheus_format(serve):
+    """Test that /metrics serves turn histograms and component counters as text."""
+    metrics = Metrics(enabled=True)
+    with metrics.turn():
+        metrics.tag_turn("transactions")
+    vapi = await serve(ToolServer(make_sessions(), secret="s3cret", metrics=metrics))
+    
+    async with vapi.session.get(vapi.server.make_url("/metrics")) as response:
+        text = await response.text()
+    
+    assert response.status == 200
+    assert response.content_type == "text/plain"
+    assert 'extend_voice_turn_seconds_count{intent="transactions"} 1' in text
+    assert "extend_voice_cache_hit_ratio 0.5" in text
+    assert "extend_voice_single_flight_coalesced 2" in text
+    assert "extend_voice_sessions_active 0" in text
+
+def test_tool_definitions_point_at_the_server():
+    """Test that every advertised tool is routed to the tool server URL."""
+    tools = tool_definitions("https://example.com/vapi")
+    
+    assert {tool["function"]["name"] for tool in tools} >= {"process_command", "get_transactions"}
+    assert all(tool["server"]["url"] == "https://example.com/vapi" for tool in tools)
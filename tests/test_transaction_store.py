@@ -0,0 +1,71 @@
+"""
+Unit tests for the TransactionStore class.
+"""
+import pytest
+from datetime import datetime
+from src.transaction_store import TransactionStore, date_key
+
+@pytest.fixture
+def store():
+    """Create an in-memory TransactionStore for testing."""
+    store = TransactionStore()
+    yield store
+    store.close()
+
+@pytest.fixture
+def stored_transactions():
+    """Transactions spread over a few days, categories and cards."""
+    return [
+        {"id": "txn_1", "amount": 2500, "category": "Food", "date": "2024-03-01T09:00:00Z", "virtualCardId": "card_1"},
+        {"id": "txn_2", "amount": 5000, "category": "Office", "date": "2024-03-02", "virtualCardId": "card_2"},
+        {"id": "txn_3", "amount": 15000, "category": "Travel", "date": "2024-03-05", "virtualCardId": "card_1"},
+        {"id": "txn_4", "amount": 1000, "category": "Food", "date": "2024-03-05", "virtualCardId": "card_2"},
+    ]
+
+def test_date_key_normalizes_dates():
+    """Test that dates of different types normalize to YYYY-MM-DD."""
+    assert date_key("2024-03-01T09:00:00Z") == "2024-03-01"
+    assert date_key(datetime(2024, 3, 1, 9, 30)) == "2024-03-01"
+    assert date_key(None) is None
+
+def test_upsert_and_query_by_date_range(store, stored_transactions):
+    """Test querying a date range returns matching transactions newest first."""
+    assert store.upsert(stored_transactions) == 4
+    
+    result = [t["id"] for t in store.query({"startDate": "2024-03-02", "endDate": "2024-03-05"})]
+    
+    assert result == ["txn_3", "txn_4", "txn_2"]
+
+def test_query_by_category_and_card(store, stored_transactions):
+    """Test that category matching is case-insensitive and card filters apply."""
+    store.upsert(stored_transactions)
+    
+    assert [t["id"] for t in store.query({"category": "food"})] == ["txn_4", "txn_1"]
+    assert [t["id"] for t in store.query({"virtualCardId": "card_1"})] == ["txn_3", "txn_1"]
+
+def test_upsert_replaces_existing_transaction(store, stored_transactions):
+    """Test that re-syncing a transaction updates it instead of duplicating it."""
+    store.upsert(stored_transactions)
+    store.upsert([dict(stored_transactions[0], amount=9900)])
+    
+    assert store.summarize() == (9900 + 5000 + 15000 + 1000, 4)
+
+def test_summarize_with_filters(store, stored_transactions):
+    """Test totals for a filtered range."""
+    store.upsert(stored_transactions)
+    
+    assert store.summarize({"category": "Food", "startDate": "2024-03-01", "endDate": "2024-03-31"}) == (3500, 2)
+
+def test_can_answer_only_within_coverage(store):
+    """Test that only fully synced ranges with supported filters are answerable."""
+    assert not store.can_answer({"startDate": "2024-03-01", "endDate": "2024-03-05"})
+    
+    store.set_coverage("2024-01-01", "2024-03-10")
+    
+    assert store.get_coverage() == ("2024-01-01", "2024-03-10")
+    assert store.can_answer({"startDate": "2024-03-01", "endDate": "2024-03-05", "category": "food"})
+    assert not store.can_answer({"startDate": "2023-12-01", "endDate": "2024-03-05"})
+    assert not store.can_answer({"startDate": "2024-03-01", "endDate": "2024-03-11"})
+    assert not store.can_answer({"startDate": "2024-03-01", "endDate": "2024-03-10"})
+    assert not store.can_answer({"category": "food"})
+    assert not store.can_answer({"startDate": "2024-03-01", "endDate": "2024-03-05", "merchant": "x"})
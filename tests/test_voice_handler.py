@@ -67,4 +67,17 @@ def test_stop_call(mock_vapi_client):
         handler.stop_call()
         
         # Verify that stop was called
-        mock_vapi_client.stop.assert_called_once() 
\ No newline at end of file
+        mock_vapi_client.stop.assert_called_once() 
+
+def test_start_call_points_tools_at_server_url(mock_vapi_client):
+    """Test that a configured server URL routes the assistant's tool calls to it."""
+    with patch.dict(os.environ, {'VAPI_API_KEY': 'test_api_key', 'VAPI_SERVER_URL': 'https://example.com/vapi'}):
+        handler = VoiceHandler()
+        handler.client = mock_vapi_client
+        
+        handler.start_call()
+        
+        assistant = mock_vapi_client.start.call_args[1]['assistant']
+        assert assistant['serverUrl'] == 'https://example.com/vapi'
+        assert assistant['model']['model'] == 'gpt-4'
+        assert any(tool['function']['name'] == 'process_command' for tool in assistant['model']['tools'])